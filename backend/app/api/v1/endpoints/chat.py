@@ -1,31 +1,75 @@
 # backend/app/api/v1/endpoints/chat.py
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from ....services.llm_gateway import LLMQueueFull
 from ....services.rag_pipeline import RAGPipeline
-from ....services.vector_store import VectorStoreManager
+from ....services.vector_store import STORE_COMPONENTS, VectorStoreManager
+from ..readiness import wait_for_components
 from ..schemas import ChatRequest, ChatResponse
+from ..streaming import ndjson_response
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-def get_rag_pipeline() -> RAGPipeline:
+async def get_rag_pipeline() -> RAGPipeline:
     vsm = VectorStoreManager()
+    # Truy hồi cần cả Chroma lẫn chỉ mục từ khóa: chờ có giới hạn khi hệ thống vừa khởi động
+    await wait_for_components(STORE_COMPONENTS)
     return RAGPipeline(vector_store_manager=vsm)
 
+def _resolve_scope(pipeline: RAGPipeline, request: ChatRequest, session_id: Optional[str]) -> Optional[List[str]]:
+    try:
+        return pipeline.resolve_scope(
+            session_id, document_id=request.document_id, document_ids=request.document_ids, collection_id=request.collection_id
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 @router.post("/chat", response_model=ChatResponse)
 async def handle_chat(
     request: ChatRequest, 
+    session_id: Optional[str] = Header(None, alias="X-Session-ID"),
     pipeline: RAGPipeline = Depends(get_rag_pipeline)
 ):
     """
     Endpoint để xử lý các yêu cầu chat.
-    Nhận câu hỏi và document_id (tùy chọn) để trả lời.
+    Nhận câu hỏi và phạm vi tài liệu (tùy chọn: document_id, document_ids hoặc collection_id) để trả lời.
     """
     if not request.query or not request.query.strip():
         raise HTTPException(status_code=400, detail="Câu hỏi không được để trống.")
+    document_ids = _resolve_scope(pipeline, request, session_id)
     
     try:
-        # Truyền document_id từ request vào pipeline
-        answer = pipeline.ask(request.query, document_id=request.document_id)
-        return ChatResponse(answer=answer)
+        # Truyền phạm vi tài liệu đã xác định vào pipeline
+        result = await pipeline.ask(request.query, document_ids=document_ids)
+        return ChatResponse(answer=result["answer"], cached=result["cached"])
+    except LLMQueueFull:
+        raise # main.py trả về 429 kèm Retry-After
+    except Exception as e:
+        logger.exception(f"Lỗi trong quá trình xử lý chat: {e}")
+        raise HTTPException(status_code=500, detail="Đã có lỗi xảy ra trong hệ thống.")
+
+@router.post("/chat/stream")
+async def handle_chat_stream(
+    request: ChatRequest,
+    session_id: Optional[str] = Header(None, alias="X-Session-ID"),
+    pipeline: RAGPipeline = Depends(get_rag_pipeline)
+):
+    """
+    Phiên bản stream của /chat: trả về NDJSON gồm nguồn tham khảo,
+    từng token của câu trả lời và thời gian tới token đầu tiên ở sự kiện cuối.
+    """
+    if not request.query or not request.query.strip():
+        raise HTTPException(status_code=400, detail="Câu hỏi không được để trống.")
+    document_ids = _resolve_scope(pipeline, request, session_id)
+
+    try:
+        events = await pipeline.ask_stream(request.query, document_ids=document_ids)
+    except LLMQueueFull:
+        raise # main.py trả về 429 kèm Retry-After
     except Exception as e:
-        print(f"Lỗi trong quá trình xử lý chat: {e}")
+        logger.exception(f"Lỗi trong quá trình xử lý chat: {e}")
         raise HTTPException(status_code=500, detail="Đã có lỗi xảy ra trong hệ thống.")
+    return ndjson_response(events)
@@ -0,0 +1,111 @@
+# backend/app/api/v1/endpoints/collections.py
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from ....services.rag_pipeline import RAGPipeline
+from ....services.vector_store import VectorStoreManager
+from ..schemas import CollectionCreateRequest, CollectionDocumentsRequest, CollectionInfo, CollectionListResponse, SessionScope
+
+router = APIRouter()
+
+def get_vsm() -> VectorStoreManager:
+    return VectorStoreManager()
+
+def get_rag_pipeline() -> RAGPipeline:
+    vsm = VectorStoreManager()
+    return RAGPipeline(vector_store_manager=vsm)
+
+def _check_documents_exist(vsm: VectorStoreManager, document_ids: List[str]):
+    missing = [document_id for document_id in document_ids if vsm.document_registry.get(document_id) is None]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy tài liệu: {', '.join(missing)}")
+
+def _get_collection_or_404(vsm: VectorStoreManager, collection_id: str) -> dict:
+    collection = vsm.document_registry.get_collection(collection_id)
+    if collection is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy bộ sưu tập.")
+    return collection
+
+@router.get("/collections", response_model=CollectionListResponse)
+async def list_collections(vsm: VectorStoreManager = Depends(get_vsm)):
+    """Endpoint để liệt kê các bộ sưu tập (mới nhất trước)."""
+    collections = await run_in_threadpool(vsm.document_registry.list_collections)
+    return CollectionListResponse(total=len(collections), collections=[CollectionInfo(**c) for c in collections])
+
+@router.post("/collections", response_model=CollectionInfo, status_code=201)
+async def create_collection(request: CollectionCreateRequest, vsm: VectorStoreManager = Depends(get_vsm)):
+    """Endpoint để tạo một bộ sưu tập (notebook) từ các tài liệu đã tải lên."""
+    def create():
+        _check_documents_exist(vsm, request.document_ids)
+        return vsm.document_registry.create_collection(str(uuid.uuid4()), request.name, request.document_ids)
+    return CollectionInfo(**await run_in_threadpool(create))
+
+@router.get("/collections/{collection_id}", response_model=CollectionInfo)
+async def get_collection(collection_id: str, vsm: VectorStoreManager = Depends(get_vsm)):
+    return CollectionInfo(**await run_in_threadpool(_get_collection_or_404, vsm, collection_id))
+
+@router.post("/collections/{collection_id}/documents", response_model=CollectionInfo)
+async def add_documents_to_collection(
+    collection_id: str,
+    request: CollectionDocumentsRequest,
+    vsm: VectorStoreManager = Depends(get_vsm)
+):
+    """Endpoint để thêm tài liệu vào bộ sưu tập (tài liệu đã có sẵn được bỏ qua)."""
+    def add():
+        _get_collection_or_404(vsm, collection_id)
+        _check_documents_exist(vsm, request.document_ids)
+        vsm.document_registry.add_to_collection(collection_id, request.document_ids)
+        return vsm.document_registry.get_collection(collection_id)
+    return CollectionInfo(**await run_in_threadpool(add))
+
+@router.delete("/collections/{collection_id}/documents/{document_id}", response_model=CollectionInfo)
+async def remove_document_from_collection(collection_id: str, document_id: str, vsm: VectorStoreManager = Depends(get_vsm)):
+    """Endpoint để bỏ một tài liệu khỏi bộ sưu tập (tài liệu vẫn được giữ trong thư viện)."""
+    def remove():
+        _get_collection_or_404(vsm, collection_id)
+        vsm.document_registry.remove_from_collection(collection_id, document_id)
+        return vsm.document_registry.get_collection(collection_id)
+    return CollectionInfo(**await run_in_threadpool(remove))
+
+@router.delete("/collections/{collection_id}", status_code=204)
+async def delete_collection(
+    collection_id: str,
+    vsm: VectorStoreManager = Depends(get_vsm),
+    pipeline: RAGPipeline = Depends(get_rag_pipeline)
+):
+    """Endpoint để xóa bộ sưu tập (không xóa các tài liệu bên trong)."""
+    def delete():
+        _get_collection_or_404(vsm, collection_id)
+        vsm.document_registry.delete_collection(collection_id)
+        pipeline.sessions.forget_collection(collection_id)
+    await run_in_threadpool(delete)
+
+@router.get("/session", response_model=SessionScope)
+async def get_session_scope(
+    session_id: Optional[str] = Header(None, alias="X-Session-ID"),
+    pipeline: RAGPipeline = Depends(get_rag_pipeline)
+):
+    """Endpoint để xem phạm vi mặc định (tài liệu hoặc bộ sưu tập) của phiên hiện tại."""
+    state = pipeline.sessions.get(session_id)
+    return SessionScope(document_id=state.document_id, collection_id=state.collection_id) if state else SessionScope()
+
+@router.put("/session", response_model=SessionScope)
+async def set_session_scope(
+    scope: SessionScope,
+    session_id: Optional[str] = Header(None, alias="X-Session-ID"),
+    vsm: VectorStoreManager = Depends(get_vsm),
+    pipeline: RAGPipeline = Depends(get_rag_pipeline)
+):
+    """Endpoint để đặt phạm vi mặc định của phiên; cần header X-Session-ID."""
+    if not session_id:
+        raise HTTPException(status_code=400, detail="Thiếu header X-Session-ID.")
+
+    def validate():
+        if scope.collection_id:
+            _get_collection_or_404(vsm, scope.collection_id)
+        if scope.document_id:
+            _check_documents_exist(vsm, [scope.document_id])
+    await run_in_threadpool(validate)
+    pipeline.sessions.set(session_id, document_id=scope.document_id, collection_id=scope.collection_id)
+    return scope
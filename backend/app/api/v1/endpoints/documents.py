@@ -1,92 +1,235 @@
 # backend/app/api/v1/endpoints/documents.py
-from fastapi import APIRouter, UploadFile, File, BackgroundTasks, HTTPException, Depends
+import logging
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Header, Query
+from fastapi.concurrency import run_in_threadpool
 import shutil
 import uuid
 import os
 from pathlib import Path
+from typing import List, Optional
 from ....core.config import settings
-from ....services.vector_store import VectorStoreManager
+from ....core.telemetry import INGESTION_DOCUMENTS
+from ....services.vector_store import STORE_COMPONENTS, VectorStoreManager
 from ....services.rag_pipeline import RAGPipeline
-from ..schemas import DocumentUploadResponse, DocumentDeleteResponse, ClearAllResponse
+from ....services.ingestion_queue import IngestionQueue, get_ingestion_queue
+from ..readiness import wait_for_components
+from ..schemas import DocumentUploadResponse, DocumentDeleteResponse, ClearAllResponse, DocumentStatusResponse, DocumentInfo, DocumentListResponse
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Trạng thái trong sổ đăng ký -> trạng thái job tương ứng của /documents/{id}/status
+REGISTRY_JOB_STATUS = {"queued": "queued", "indexing": "running", "ready": "completed", "failed": "failed"}
+
 def get_vsm() -> VectorStoreManager:
     return VectorStoreManager()
 
+async def get_ready_vsm() -> VectorStoreManager:
+    """Như get_vsm nhưng chờ (có giới hạn) tới khi Chroma và chỉ mục từ khóa tải xong."""
+    vsm = VectorStoreManager()
+    await wait_for_components(STORE_COMPONENTS)
+    return vsm
+
 def get_rag_pipeline() -> RAGPipeline:
     vsm = VectorStoreManager()
     return RAGPipeline(vector_store_manager=vsm)
 
-def process_document_in_background(file_path: str, document_id: str, vsm: VectorStoreManager):
-    print(f"Tác vụ nền: Bắt đầu xử lý tài liệu {document_id}")
+def process_document(file_path: str, document_id: str, progress_callback):
+    """
+    Hàm xử lý job của hàng đợi nạp tài liệu. Dùng chung cho tải lên mới và cập nhật:
+    update_document chỉ embedding các chunk thay đổi và tự dọn dữ liệu còn sót lại
+    nếu đây là lần thử lại sau một lần chạy lỗi giữa chừng.
+    """
+    vsm = VectorStoreManager()
     try:
-        vsm.add_document(file_path, document_id)
-        print(f"Tác vụ nền: Hoàn tất xử lý tài liệu {document_id}")
+        vsm.update_document(file_path, document_id, progress_callback=progress_callback)
     except Exception as e:
-        print(f"Tác vụ nền: Lỗi khi xử lý tài liệu {document_id}: {e}")
+        vsm.document_registry.set_status(document_id, "failed", error=str(e))
+        INGESTION_DOCUMENTS.inc(status="failed")
+        raise
+
+def _clean_filename(filename: str) -> str:
+    original_filename = Path(filename).name
+    if original_filename.lower().endswith('.doc.doc'):
+        return original_filename[:-4]
+    elif original_filename.lower().endswith('.docx.docx'):
+        return original_filename[:-5]
+    return original_filename
+
+def _find_uploaded_files(vsm: VectorStoreManager, document_id: str) -> List[str]:
+    """Đường dẫn file gốc của tài liệu, lấy từ sổ đăng ký (không cần quét thư mục upload)."""
+    document = vsm.document_registry.get(document_id)
+    if document is None or not document["file_path"]:
+        return []
+    return [document["file_path"]] if os.path.exists(document["file_path"]) else []
+
+@router.get("/documents", response_model=DocumentListResponse)
+async def list_documents(
+    limit: int = Query(100, gt=0, le=1000),
+    offset: int = Query(0, ge=0),
+    vsm: VectorStoreManager = Depends(get_vsm)
+):
+    """Endpoint để liệt kê các tài liệu đã tải lên (mới nhất trước)."""
+    documents = await run_in_threadpool(vsm.document_registry.list, limit, offset)
+    total = await run_in_threadpool(vsm.document_registry.count)
+    return DocumentListResponse(total=total, documents=[DocumentInfo(**document) for document in documents])
 
 @router.post("/documents", response_model=DocumentUploadResponse, status_code=202)
 async def upload_document(
-    background_tasks: BackgroundTasks, 
     file: UploadFile = File(...),
-    vsm: VectorStoreManager = Depends(get_vsm),
-    pipeline: RAGPipeline = Depends(get_rag_pipeline)
+    session_id: Optional[str] = Header(None, alias="X-Session-ID"),
+    ingestion_queue: IngestionQueue = Depends(get_ingestion_queue),
+    pipeline: RAGPipeline = Depends(get_rag_pipeline),
+    vsm: VectorStoreManager = Depends(get_vsm)
 ):
     try:
-        original_filename = Path(file.filename).name
-        if original_filename.lower().endswith('.doc.doc'):
-            cleaned_filename = original_filename[:-4]
-        elif original_filename.lower().endswith('.docx.docx'):
-             cleaned_filename = original_filename[:-5]
-        else:
-            cleaned_filename = original_filename
-        
+        cleaned_filename = _clean_filename(file.filename)
         document_id = str(uuid.uuid4())
         final_filename = f"{document_id}_{cleaned_filename}"
         file_path = Path(settings.UPLOAD_PATH) / final_filename
         
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        background_tasks.add_task(process_document_in_background, str(file_path), document_id, vsm)
-        
-        # Gọi hàm để thiết lập file mặc định mới
-        pipeline.set_last_uploaded_document_id(document_id)
+        def save_and_enqueue():
+            os.makedirs(settings.UPLOAD_PATH, exist_ok=True)
+            with open(file_path, "wb") as buffer:
+                shutil.copyfileobj(file.file, buffer)
+            vsm.document_registry.register(document_id, cleaned_filename, str(file_path))
+            ingestion_queue.enqueue(document_id, str(file_path))
+            # Tài liệu vừa tải lên trở thành mặc định của phiên hiện tại
+            pipeline.set_session_document(session_id, document_id)
+
+        # Ghi file và SQLite là thao tác chặn, không chạy trực tiếp trên event loop
+        await run_in_threadpool(save_and_enqueue)
 
         return DocumentUploadResponse(
-            message="Tệp đã được chấp nhận và đang được xử lý trong nền.",
+            message="Tệp đã được chấp nhận và đang chờ xử lý trong hàng đợi.",
             document_id=document_id,
             filename=cleaned_filename
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Không thể lưu file: {e}")
 
-@router.delete("/documents/{document_id}", response_model=DocumentDeleteResponse)
-async def delete_document(
+@router.put("/documents/{document_id}", response_model=DocumentUploadResponse, status_code=202)
+async def update_document(
     document_id: str,
+    file: UploadFile = File(...),
+    ingestion_queue: IngestionQueue = Depends(get_ingestion_queue),
     vsm: VectorStoreManager = Depends(get_vsm)
 ):
+    """
+    Endpoint để cập nhật một tài liệu đã tải lên bằng phiên bản mới của file.
+    Tài liệu giữ nguyên document_id; chỉ các chunk có nội dung thay đổi được embedding lại.
+    """
+    cleaned_filename = _clean_filename(file.filename)
+    file_path = Path(settings.UPLOAD_PATH) / f"{document_id}_{cleaned_filename}"
+
+    def replace_and_enqueue():
+        document = vsm.document_registry.get(document_id)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Không tìm thấy tài liệu.")
+        if document["status"] == "indexing":
+            raise HTTPException(status_code=409, detail="Tài liệu đang được xử lý, vui lòng thử lại sau.")
+        os.makedirs(settings.UPLOAD_PATH, exist_ok=True)
+        temp_path = file_path.with_name(file_path.name + ".uploading")
+        with open(temp_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+
+        def replace_file():
+            for old_path in _find_uploaded_files(vsm, document_id):
+                os.remove(old_path)
+            os.replace(temp_path, file_path)
+            vsm.document_registry.register(document_id, cleaned_filename, str(file_path))
+
+        # Worker có thể đã nhận job nhưng chưa đặt trạng thái indexing trong sổ: kiểm tra lại
+        # và thay file trong cùng lần giữ khóa hàng đợi, giống remove_if_idle của DELETE
+        if not ingestion_queue.enqueue_if_idle(document_id, str(file_path), prepare=replace_file):
+            os.remove(temp_path)
+            raise HTTPException(status_code=409, detail="Tài liệu đang được xử lý, vui lòng thử lại sau.")
+
     try:
+        await run_in_threadpool(replace_and_enqueue)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Không thể lưu file: {e}")
+    return DocumentUploadResponse(
+        message="Tệp mới đã được chấp nhận, tài liệu sẽ được cập nhật trong hàng đợi.",
+        document_id=document_id,
+        filename=cleaned_filename
+    )
+
+@router.get("/documents/{document_id}/status", response_model=DocumentStatusResponse)
+async def get_document_status(
+    document_id: str,
+    ingestion_queue: IngestionQueue = Depends(get_ingestion_queue),
+    vsm: VectorStoreManager = Depends(get_vsm)
+):
+    """
+    Endpoint để kiểm tra tiến độ xử lý của một tài liệu đã tải lên.
+    Tài liệu không còn job trong hàng đợi (đăng ký bù từ dữ liệu cũ, job đã bị xóa) lấy trạng thái từ sổ đăng ký.
+    """
+    job = await run_in_threadpool(ingestion_queue.get_status, document_id)
+    if job is None:
+        document = await run_in_threadpool(vsm.document_registry.get, document_id)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Không tìm thấy tài liệu.")
+        status = REGISTRY_JOB_STATUS.get(document["status"], document["status"])
+        return DocumentStatusResponse(
+            document_id=document_id,
+            status=status,
+            stage=None,
+            processed_chunks=document["chunk_count"],
+            attempts=0,
+            error=document["error"],
+            searchable=status == "completed",
+        )
+    return DocumentStatusResponse(
+        document_id=document_id,
+        status=job["status"],
+        stage=job["stage"],
+        processed_chunks=job["processed_chunks"],
+        attempts=job["attempts"],
+        error=job["error"],
+        searchable=job["status"] == "completed",
+    )
+
+@router.delete("/documents/{document_id}", response_model=DocumentDeleteResponse)
+async def delete_document(
+    document_id: str,
+    vsm: VectorStoreManager = Depends(get_ready_vsm),
+    ingestion_queue: IngestionQueue = Depends(get_ingestion_queue)
+):
+    def delete_all_traces():
+        # Worker đang nạp tài liệu sẽ tiếp tục ghi chunk sau khi xóa: giống PUT, yêu cầu thử lại sau
+        document = vsm.document_registry.get(document_id)
+        if (document is not None and document["status"] == "indexing") or not ingestion_queue.remove_if_idle(document_id):
+            raise HTTPException(status_code=409, detail="Tài liệu đang được xử lý, vui lòng thử lại sau.")
+        uploaded_files = _find_uploaded_files(vsm, document_id)
         vsm.delete_document(document_id)
-        for filename in os.listdir(settings.UPLOAD_PATH):
-            if filename.startswith(document_id):
-                os.remove(os.path.join(settings.UPLOAD_PATH, filename))
-                print(f"Đã xóa file gốc: {filename}")
-                break
-        
+        for file_path in uploaded_files:
+            os.remove(file_path)
+            logger.info(f"Đã xóa file gốc: {os.path.basename(file_path)}")
+
+    try:
+        await run_in_threadpool(delete_all_traces)
         return DocumentDeleteResponse(
             message="Tài liệu đã được xóa thành công.",
             document_id=document_id
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Lỗi khi xóa tài liệu: {e}")
 
 @router.delete("/clear-all", response_model=ClearAllResponse)
-async def clear_all_documents(vsm: VectorStoreManager = Depends(get_vsm)):
+async def clear_all_documents(
+    vsm: VectorStoreManager = Depends(get_ready_vsm),
+    ingestion_queue: IngestionQueue = Depends(get_ingestion_queue)
+):
     """Endpoint để xóa toàn bộ dữ liệu trong vector store và các file đã tải lên."""
     try:
-        result = vsm.clear_all_data()
+        await run_in_threadpool(ingestion_queue.clear)
+        result = await run_in_threadpool(vsm.clear_all_data)
         return ClearAllResponse(
             message="Toàn bộ dữ liệu đã được xóa thành công.",
             deleted_collections=result["deleted_collections"],
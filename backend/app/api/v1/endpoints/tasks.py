@@ -1,50 +1,124 @@
 # backend/app/api/v1/endpoints/tasks.py
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from ....services.artifact_cache import ArtifactCache
+from ....services.llm_gateway import LLMQueueFull
 from ....services.rag_pipeline import RAGPipeline
-from ....services.vector_store import VectorStoreManager
-from ..schemas import TaskRequest, GenerateQuestionsRequest, TaskResponse
+from ....services.vector_store import STORE_COMPONENTS, VectorStoreManager
+from ..readiness import wait_for_components
+from ..schemas import TaskRequest, GenerateQuestionsRequest, TaskResponse, TaskCacheStatsResponse
+from ..streaming import ndjson_response
 
 router = APIRouter()
 
-def get_rag_pipeline() -> RAGPipeline:
+async def get_rag_pipeline() -> RAGPipeline:
     vsm = VectorStoreManager()
+    # Truy hồi cần cả Chroma lẫn chỉ mục từ khóa: chờ có giới hạn khi hệ thống vừa khởi động
+    await wait_for_components(STORE_COMPONENTS)
     return RAGPipeline(vector_store_manager=vsm)
 
+def get_artifact_cache() -> ArtifactCache:
+    """Cache kết quả tác vụ không cần Chroma/chỉ mục từ khóa nên không chờ các thành phần đang tải ở nền."""
+    return RAGPipeline(vector_store_manager=VectorStoreManager()).artifact_cache
+
+def _target_document(pipeline: RAGPipeline, request: TaskRequest, session_id: Optional[str]) -> Optional[str]:
+    """Tài liệu của yêu cầu, nếu trống thì dùng tài liệu mặc định của phiên."""
+    return request.document_id or pipeline.default_document_id(session_id)
+
+@router.get("/tasks/cache/stats", response_model=TaskCacheStatsResponse)
+async def get_task_cache_stats(artifact_cache: ArtifactCache = Depends(get_artifact_cache)):
+    """Endpoint để xem thống kê hit/miss của cache kết quả tác vụ."""
+    return TaskCacheStatsResponse(**artifact_cache.stats())
+
 @router.post("/tasks/summarize", response_model=TaskResponse)
 async def summarize_document(
     request: TaskRequest, 
+    session_id: Optional[str] = Header(None, alias="X-Session-ID"),
     pipeline: RAGPipeline = Depends(get_rag_pipeline)
 ):
     """Endpoint để tóm tắt toàn bộ một tài liệu."""
     try:
-        summary = pipeline.summarize_document(document_id=request.document_id)
+        summary = await pipeline.summarize_document(document_id=_target_document(pipeline, request, session_id))
         return TaskResponse(result=summary)
+    except LLMQueueFull:
+        raise # main.py trả về 429 kèm Retry-After
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/tasks/generate-questions", response_model=TaskResponse)
 async def generate_review_questions(
     request: GenerateQuestionsRequest,
+    session_id: Optional[str] = Header(None, alias="X-Session-ID"),
     pipeline: RAGPipeline = Depends(get_rag_pipeline)
 ):
     """Endpoint để tạo các câu hỏi ôn tập từ một tài liệu."""
     try:
-        questions = pipeline.generate_questions(
+        questions = await pipeline.generate_questions(
             num_questions=request.num_questions,
-            document_id=request.document_id
+            document_id=_target_document(pipeline, request, session_id)
         )
         return TaskResponse(result=questions)
+    except LLMQueueFull:
+        raise # main.py trả về 429 kèm Retry-After
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/tasks/extract-keywords", response_model=TaskResponse)
 async def extract_keywords(
     request: TaskRequest,
+    session_id: Optional[str] = Header(None, alias="X-Session-ID"),
     pipeline: RAGPipeline = Depends(get_rag_pipeline)
 ):
     """Endpoint để trích xuất từ khóa và chủ đề chính từ một tài liệu."""
     try:
-        keywords_and_topics = pipeline.extract_keywords_and_topics(document_id=request.document_id)
+        keywords_and_topics = await pipeline.extract_keywords_and_topics(document_id=_target_document(pipeline, request, session_id))
         return TaskResponse(result=keywords_and_topics)
+    except LLMQueueFull:
+        raise # main.py trả về 429 kèm Retry-After
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/tasks/summarize/stream")
+async def summarize_document_stream(
+    request: TaskRequest,
+    session_id: Optional[str] = Header(None, alias="X-Session-ID"),
+    pipeline: RAGPipeline = Depends(get_rag_pipeline)
+):
+    """Phiên bản stream (NDJSON) của /tasks/summarize."""
+    try:
+        return ndjson_response(await pipeline.summarize_document_stream(document_id=_target_document(pipeline, request, session_id)))
+    except LLMQueueFull:
+        raise # main.py trả về 429 kèm Retry-After
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/tasks/generate-questions/stream")
+async def generate_review_questions_stream(
+    request: GenerateQuestionsRequest,
+    session_id: Optional[str] = Header(None, alias="X-Session-ID"),
+    pipeline: RAGPipeline = Depends(get_rag_pipeline)
+):
+    """Phiên bản stream (NDJSON) của /tasks/generate-questions."""
+    try:
+        return ndjson_response(await pipeline.generate_questions_stream(
+            num_questions=request.num_questions,
+            document_id=_target_document(pipeline, request, session_id)
+        ))
+    except LLMQueueFull:
+        raise # main.py trả về 429 kèm Retry-After
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/tasks/extract-keywords/stream")
+async def extract_keywords_stream(
+    request: TaskRequest,
+    session_id: Optional[str] = Header(None, alias="X-Session-ID"),
+    pipeline: RAGPipeline = Depends(get_rag_pipeline)
+):
+    """Phiên bản stream (NDJSON) của /tasks/extract-keywords."""
+    try:
+        return ndjson_response(await pipeline.extract_keywords_and_topics_stream(document_id=_target_document(pipeline, request, session_id)))
+    except LLMQueueFull:
+        raise # main.py trả về 429 kèm Retry-After
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
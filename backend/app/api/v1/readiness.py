@@ -0,0 +1,25 @@
+# backend/app/api/v1/readiness.py
+import asyncio
+import math
+from typing import Iterable
+from fastapi import HTTPException
+from ...core.config import settings
+from ...services.warmup import ComponentNotReady, get_warmup
+
+async def wait_for_components(names: Iterable[str]):
+    """
+    Chờ các thành phần đang được tải ở nền (tối đa STARTUP_WAIT_TIMEOUT_SECONDS).
+    Quá thời gian hoặc thành phần khởi tạo lỗi thì trả về 503 kèm header Retry-After.
+    """
+    warmup = get_warmup()
+    names = list(names)
+    if warmup.is_ready(names):
+        return
+    try:
+        await asyncio.to_thread(warmup.wait, names, settings.STARTUP_WAIT_TIMEOUT_SECONDS)
+    except ComponentNotReady as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Hệ thống đang khởi động: {e}",
+            headers={"Retry-After": str(max(1, math.ceil(settings.STARTUP_WAIT_TIMEOUT_SECONDS)))},
+        )
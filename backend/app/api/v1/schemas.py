@@ -1,15 +1,21 @@
 # backend/app/api/v1/schemas.py
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class ChatRequest(BaseModel):
-    """Cấu trúc cho body của yêu cầu chat."""
+    """
+    Cấu trúc cho body của yêu cầu chat. Phạm vi tìm kiếm: document_ids > collection_id > document_id;
+    nếu không chỉ định gì sẽ dùng phạm vi mặc định của phiên (header X-Session-ID), rồi đến toàn bộ kho.
+    """
     query: str = Field(..., min_length=1)
     document_id: Optional[str] = Field(None)
+    document_ids: Optional[List[str]] = Field(None, description="Tìm kiếm trong nhiều tài liệu")
+    collection_id: Optional[str] = Field(None, description="Tìm kiếm trong một bộ sưu tập")
 
 class ChatResponse(BaseModel):
     """Cấu trúc cho body của phản hồi chat."""
     answer: str
+    cached: bool = Field(False, description="True nếu câu trả lời được lấy từ cache ngữ nghĩa")
 
 class DocumentUploadResponse(BaseModel):
     """Cấu trúc cho phản hồi sau khi tải file lên."""
@@ -17,6 +23,59 @@ class DocumentUploadResponse(BaseModel):
     document_id: str
     filename: str
 
+class DocumentStatusResponse(BaseModel):
+    """Cấu trúc cho phản hồi trạng thái xử lý của tài liệu."""
+    document_id: str
+    status: str = Field(..., description="queued | running | completed | failed")
+    stage: Optional[str] = Field(None, description="Giai đoạn hiện tại: parse | embed | index")
+    processed_chunks: int
+    attempts: int
+    error: Optional[str] = None
+    searchable: bool
+
+class DocumentInfo(BaseModel):
+    """Thông tin một tài liệu trong sổ đăng ký."""
+    document_id: str
+    filename: str
+    size_bytes: int
+    chunk_count: int
+    status: str = Field(..., description="queued | indexing | ready | failed")
+    error: Optional[str] = None
+    created_at: float
+    ingested_at: Optional[float] = None
+
+class DocumentListResponse(BaseModel):
+    """Cấu trúc cho phản hồi danh sách tài liệu."""
+    total: int
+    documents: List[DocumentInfo]
+
+class CollectionCreateRequest(BaseModel):
+    """Cấu trúc yêu cầu tạo bộ sưu tập (notebook)."""
+    name: str = Field(..., min_length=1)
+    document_ids: List[str] = Field(default_factory=list)
+
+class CollectionDocumentsRequest(BaseModel):
+    """Danh sách tài liệu cần thêm vào bộ sưu tập."""
+    document_ids: List[str] = Field(..., min_length=1)
+
+class CollectionInfo(BaseModel):
+    """Thông tin một bộ sưu tập."""
+    collection_id: str
+    name: str
+    document_ids: List[str]
+    created_at: float
+    updated_at: float
+
+class CollectionListResponse(BaseModel):
+    """Cấu trúc cho phản hồi danh sách bộ sưu tập."""
+    total: int
+    collections: List[CollectionInfo]
+
+class SessionScope(BaseModel):
+    """Phạm vi mặc định của một phiên (dùng khi yêu cầu không chỉ định tài liệu)."""
+    document_id: Optional[str] = None
+    collection_id: Optional[str] = None
+
 class DocumentDeleteResponse(BaseModel):
     """Cấu trúc cho phản hồi sau khi xóa file."""
     message: str
@@ -31,7 +90,7 @@ class ClearAllResponse(BaseModel):
 # Schema cho các tác vụ mới
 class TaskRequest(BaseModel):
     """Cấu trúc yêu cầu chung cho các tác vụ."""
-    document_id: Optional[str] = Field(None, description="ID của tài liệu muốn xử lý, nếu để trống sẽ dùng file mặc định")
+    document_id: Optional[str] = Field(None, description="ID của tài liệu muốn xử lý, nếu để trống sẽ dùng tài liệu mặc định của phiên")
 
 class GenerateQuestionsRequest(TaskRequest):
     """Cấu trúc yêu cầu cho việc tạo câu hỏi."""
@@ -40,3 +99,10 @@ class GenerateQuestionsRequest(TaskRequest):
 class TaskResponse(BaseModel):
     """Cấu trúc phản hồi chung cho các tác vụ."""
     result: str
+
+class TaskCacheStatsResponse(BaseModel):
+    """Thống kê cache kết quả tác vụ."""
+    entries: int
+    hits: int
+    misses: int
+    hit_rate: float
@@ -0,0 +1,19 @@
+# backend/app/api/v1/streaming.py
+import json
+from typing import Any, AsyncIterator, Dict
+from fastapi.responses import StreamingResponse
+
+def ndjson_response(events: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """
+    Trả về các sự kiện của pipeline dưới dạng NDJSON (mỗi dòng một đối tượng JSON).
+    Các sự kiện: metadata (nguồn tham khảo), token, error và done (kèm time_to_first_token_ms).
+    """
+    async def encode() -> AsyncIterator[str]:
+        async for event in events:
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        encode(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
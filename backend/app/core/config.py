@@ -14,23 +14,116 @@ class Settings(BaseSettings):
     # Thêm chú thích kiểu `: str` cho tất cả các trường
     VECTOR_STORE_PATH: str = Field(default=os.path.join(PROJECT_ROOT, "data/vector_store"))
     UPLOAD_PATH: str = Field(default=os.path.join(PROJECT_ROOT, "data/uploaded_docs"))
+    KEYWORD_STORE_PATH: str = Field(default=os.path.join(PROJECT_ROOT, "data/keyword_store"))
     
     EMBEDDING_MODEL_NAME: str = "paraphrase-multilingual-mpnet-base-v2" #"all-MiniLM-L12-v2"
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "gemma3:1b" #    Đổi sang mô hình bạn đang sử dụng
+    LLM_MAX_CONCURRENCY: int = 2 # Số yêu cầu LLM được gửi đồng thời tới Ollama
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_QUEUE_MAX_DEPTH: int = 32 # Số lời gọi LLM được chờ slot; vượt quá thì API trả 429
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 120.0 # Chờ slot lâu hơn ngần này cũng trả 429
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 300.0 # Timeout đọc của mỗi lời gọi (với stream: giữa hai token)
+    LLM_MAX_RETRIES: int = 2 # Số lần thử lại khi lỗi kết nối/timeout/5xx
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    RETRIEVAL_WORKERS: int = 4 # Số luồng cho tìm kiếm Chroma/BM25
+
+    # Khởi động: các thành phần nặng được tải song song ở nền
+    STARTUP_WORKERS: int = 4
+    STARTUP_WAIT_TIMEOUT_SECONDS: float = 10.0 # Yêu cầu cần thành phần đang tải sẽ chờ tối đa ngần này rồi trả 503
+
+    # Quan sát hệ thống: log theo mức, /metrics (định dạng Prometheus) và header Server-Timing
+    LOG_LEVEL: str = "INFO" # "DEBUG" để bật log chi tiết trên đường nóng (từng truy vấn, từng chunk)
+    METRICS_ENABLED: bool = True
+    SERVER_TIMING_ENABLED: bool = False # Thêm thời gian từng giai đoạn vào header Server-Timing của response
+
+    # Tìm kiếm lai: số ứng viên lấy từ mỗi bộ truy hồi và cách hợp nhất kết quả
+    SEMANTIC_SEARCH_DEPTH: int = 10
+    KEYWORD_SEARCH_DEPTH: int = 10
+    FUSION_METHOD: str = "rrf" # "rrf" hoặc "weighted"
+    FUSION_RRF_K: float = 60
+    FUSION_NORMALIZATION: str = "minmax" # Dùng cho "weighted": "minmax", "max" hoặc "none"
+    FUSION_SEMANTIC_WEIGHT: float = 1.0
+    FUSION_KEYWORD_WEIGHT: float = 1.0
+
+    # Re-ranking bằng cross-encoder (tùy chọn, chạy trên CPU)
+    RERANKER_ENABLED: bool = False
+    RERANKER_MODEL_NAME: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+    RERANKER_BATCH_SIZE: int = 16
+    RERANKER_MAX_CANDIDATES: int = 20
+    RERANKER_TIME_BUDGET_MS: float = 1500
+    RERANKER_CACHE_SIZE: int = 10_000
+
+    # Số chunk ngữ cảnh đưa vào prompt RAG (có thể giảm khi bật re-ranking)
+    RAG_TOP_K: int = 5
+    # Ngân sách token cho phần NGỮ CẢNH của prompt RAG (sau khi gộp các chunk chồng lấn).
+    # Mặc định đủ cho RAG_TOP_K chunk đầy (5 * CHUNK_SIZE 2000 ký tự / ~3 ký tự mỗi token ≈ 3334 token);
+    # giảm xuống thì prompt ngắn và nhanh hơn nhưng các chunk xếp hạng thấp sẽ bị bỏ. Cộng với câu hỏi
+    # và câu trả lời, giá trị này phải nhỏ hơn num_ctx của mô hình trên Ollama.
+    RAG_CONTEXT_TOKEN_BUDGET: int = 3500
+    # Tokenizer (Hugging Face) dùng để đếm token; để trống sẽ ước lượng theo số ký tự
+    TOKENIZER_NAME: str = ""
+
+    # Tóm tắt map-reduce cho tài liệu lớn (tóm tắt, tạo câu hỏi, trích xuất từ khóa)
+    MAP_REDUCE_TOKEN_BUDGET: int = 3000 # Nên nhỏ hơn num_ctx của mô hình trên Ollama
+    MAP_REDUCE_MAX_PARALLEL: int = 2
+    SUMMARY_CACHE_PATH: str = Field(default=os.path.join(PROJECT_ROOT, "data/summary_cache.sqlite3"))
+
+    # Cache kết quả tác vụ theo tài liệu
+    ARTIFACT_CACHE_PATH: str = Field(default=os.path.join(PROJECT_ROOT, "data/artifact_cache.sqlite3"))
+    ARTIFACT_WARMUP_ENABLED: bool = False # Tính trước tóm tắt/từ khóa/câu hỏi ngay sau khi nạp xong tài liệu
+
+    # Phạm vi mặc định (tài liệu/bộ sưu tập) theo từng phiên, định danh bằng header X-Session-ID
+    SESSION_STORE_PATH: str = Field(default=os.path.join(PROJECT_ROOT, "data/session_store.sqlite3"))
+    SESSION_TTL_SECONDS: float = 24 * 3600
+    SESSION_MAX_ENTRIES: int = 10_000
+
+    # Cache câu trả lời theo ngữ nghĩa cho /chat
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    ANSWER_CACHE_TTL_SECONDS: float = 3600
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
     
     # Thêm chú thích kiểu `: int` cho các trường số
     CHUNK_SIZE: int = 2000
     CHUNK_OVERLAP: int = 400
 
+    # Đọc PDF theo từng trang; file lớn được chia trang cho nhiều tiến trình
+    PDF_PARSE_WORKERS: int = 2 # <= 1 để luôn đọc tuần tự
+    PDF_PARALLEL_MIN_PAGES: int = 50
+    PDF_PAGES_PER_TASK: int = 8
+    PDF_SLOW_PAGE_SECONDS: float = 2.0 # Cảnh báo các trang đọc lâu hơn ngưỡng này
+
+    # Pipeline embedding khi nạp tài liệu
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_WORKERS: int = 2
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = Field(default=os.path.join(PROJECT_ROOT, "data/embedding_cache.sqlite3"))
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+
+    # Hàng đợi nạp tài liệu
+    DOCUMENT_REGISTRY_PATH: str = Field(default=os.path.join(PROJECT_ROOT, "data/document_registry.sqlite3"))
+    INGESTION_QUEUE_PATH: str = Field(default=os.path.join(PROJECT_ROOT, "data/ingestion_queue.sqlite3"))
+    INGESTION_WORKERS: int = 1
+    INGESTION_MAX_ATTEMPTS: int = 3
+    INGESTION_RETRY_DELAY_SECONDS: float = 5.0
+
+    # Kho chỉ mục từ khóa dạng segment (append-only)
+    KEYWORD_SEGMENT_MAX_BYTES: int = 8 * 1024 * 1024
+    KEYWORD_COMPACTION_MIN_SEGMENTS: int = 4
+    # Bộ tách từ cho BM25 (dùng chung lúc lập chỉ mục và lúc truy vấn): "vi" | "whitespace"
+    KEYWORD_TOKENIZER: str = "vi"
+    KEYWORD_FOLD_DIACRITICS: bool = False
+    KEYWORD_SYLLABLE_BIGRAMS: bool = True
+    KEYWORD_REMOVE_STOPWORDS: bool = True
+
     class Config:
         # Đường dẫn đến file .env, nằm ở thư mục backend
         env_file = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")), ".env")
         env_file_encoding = 'utf-8'
 
 # Tạo một thực thể (instance) duy nhất của Settings để sử dụng trong toàn bộ ứng dụng
+# (các thư mục dữ liệu được tạo bởi service sử dụng chúng, không tạo khi import)
 settings = Settings()
-
-# Đảm bảo các thư mục cần thiết tồn tại khi ứng dụng khởi động
-os.makedirs(settings.VECTOR_STORE_PATH, exist_ok=True)
-os.makedirs(settings.UPLOAD_PATH, exist_ok=True)
@@ -0,0 +1,13 @@
+# backend/app/core/logging_config.py
+import logging
+from .config import settings
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s [%(name)s] %(message)s"
+
+def setup_logging():
+    """
+    Cấu hình logging cho ứng dụng (gọi một lần khi khởi động).
+    Logger của ứng dụng ("app.*") theo LOG_LEVEL; thư viện bên ngoài chỉ ghi từ mức WARNING.
+    """
+    logging.basicConfig(level=logging.WARNING, format=LOG_FORMAT)
+    logging.getLogger("app").setLevel(settings.LOG_LEVEL.upper())
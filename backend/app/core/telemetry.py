@@ -0,0 +1,219 @@
+# backend/app/core/telemetry.py
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Biên các bucket (giây) cho histogram thời gian, từ vài ms (BM25) tới hàng chục giây (LLM)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} cần các nhãn {self.labelnames}, nhận được {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}", *self.samples()]
+
+class Counter(_Metric):
+    """Bộ đếm chỉ tăng (số yêu cầu, số chunk đã nạp...)."""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(_Metric):
+    """Giá trị tức thời có thể tăng/giảm (độ dài hàng đợi, số yêu cầu đang chạy...)."""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(_Metric):
+    """Phân bố giá trị (thời gian) theo bucket cố định, kèm tổng và số lần quan sát."""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Mỗi bộ nhãn: [đếm theo từng bucket (không cộng dồn)..., đếm > bucket lớn nhất], tổng
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._label_values(labels), ()))
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        lines = []
+        bucket_labelnames = self.labelnames + ("le",)
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labelnames, key + (_format_value(bound),))} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Tập các metric của tiến trình, xuất ra định dạng văn bản của Prometheus cho /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} đã được đăng ký với kiểu/nhãn khác")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+# --- Metric dùng chung của ứng dụng ---
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_duration_seconds",
+    "Thời gian từng giai đoạn xử lý câu hỏi (embed_query, vector_query, keyword_query, fusion, rerank, prompt_build, llm_queue_wait, llm_ttft, llm_total).",
+    ["stage"],
+)
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "Số yêu cầu HTTP theo route và mã trạng thái.", ["method", "route", "status"])
+HTTP_REQUEST_SECONDS = REGISTRY.histogram("http_request_duration_seconds", "Thời gian xử lý yêu cầu HTTP (tới khi bắt đầu gửi response).", ["method", "route"])
+INGESTION_STAGE_SECONDS = REGISTRY.histogram(
+    "ingestion_stage_duration_seconds", "Thời gian từng giai đoạn nạp một tài liệu (parse, embed, index, total).", ["stage"]
+)
+INGESTION_CHUNKS = REGISTRY.counter(
+    "ingestion_chunks_total", "Số chunk đã xử lý khi nạp tài liệu (added, kept, removed, metadata_updated).", ["result"]
+)
+INGESTION_DOCUMENTS = REGISTRY.counter("ingestion_documents_total", "Số lần nạp tài liệu theo kết quả.", ["status"])
+LLM_QUEUE_WAIT_SECONDS = REGISTRY.histogram("llm_queue_wait_seconds", "Thời gian chờ slot gọi LLM (complete hoặc stream).", ["mode"])
+LLM_QUEUE_DEPTH = REGISTRY.gauge("llm_queue_depth", "Số lời gọi LLM đang chờ slot.")
+LLM_IN_FLIGHT = REGISTRY.gauge("llm_in_flight", "Số lời gọi LLM đang chạy.")
+LLM_REQUESTS = REGISTRY.counter("llm_requests_total", "Số lời gọi LLM theo chế độ và kết quả (ok, error, rejected).", ["mode", "outcome"])
+LLM_RETRIES = REGISTRY.counter("llm_retries_total", "Số lần thử lại lời gọi LLM do lỗi tạm thời.")
+LLM_COALESCED = REGISTRY.counter("llm_coalesced_requests_total", "Số yêu cầu dùng chung kết quả của một lời gọi LLM giống hệt đang chạy.")
+
+# --- Tracing theo yêu cầu ---
+# Mỗi yêu cầu HTTP có một dict {giai đoạn: số giây}; các span ghi vào cả histogram lẫn dict này
+_current_trace: ContextVar[Optional[Dict[str, float]]] = ContextVar("rag_trace", default=None)
+
+def start_trace() -> Dict[str, float]:
+    """Bắt đầu thu thập span cho ngữ cảnh hiện tại (một yêu cầu HTTP)."""
+    trace: Dict[str, float] = {}
+    _current_trace.set(trace)
+    return trace
+
+def record_stage(stage: str, seconds: float):
+    """Ghi thời gian của một giai đoạn đã đo sẵn (vd. thời gian tới token đầu tiên)."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace[stage] = trace.get(stage, 0.0) + seconds
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Đo thời gian một khối lệnh như một giai đoạn của pipeline."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+def server_timing_header(trace: Dict[str, float]) -> str:
+    """Giá trị header Server-Timing (ms), vd. "vector_query;dur=12.3, fusion;dur=0.1"."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in trace.items())
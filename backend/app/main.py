@@ -1,8 +1,19 @@
 # backend/app/main.py
-from fastapi import FastAPI
+import logging
+import asyncio
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .api.v1.endpoints import chat, documents, tasks
+from fastapi.responses import JSONResponse, PlainTextResponse
+from .api.v1.endpoints import chat, collections, documents, tasks
 from .core.config import settings
+from .core.logging_config import setup_logging
+from .core.telemetry import HTTP_REQUEST_SECONDS, HTTP_REQUESTS, REGISTRY, server_timing_header, start_trace
+from .services.llm_gateway import LLMQueueFull
+from .services.warmup import get_warmup
+
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Khởi tạo ứng dụng FastAPI
 app = FastAPI(
@@ -21,31 +32,93 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """
+    Thu thập span của từng yêu cầu, ghi metric HTTP và (tùy chọn) header Server-Timing.
+    Với response dạng stream, header chỉ gồm các giai đoạn xong trước khi bắt đầu stream;
+    thời gian LLM nằm trong sự kiện "done" và trong /metrics.
+    """
+    trace = start_trace()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    # Dùng mẫu route (vd. /api/v1/documents/{document_id}) làm nhãn để số chuỗi metric không tăng theo id
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    HTTP_REQUESTS.inc(method=request.method, route=route, status=str(response.status_code))
+    HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, route=route)
+    if settings.SERVER_TIMING_ENABLED:
+        trace["total"] = elapsed
+        response.headers["Server-Timing"] = server_timing_header(trace)
+        response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
+@app.exception_handler(LLMQueueFull)
+async def llm_queue_full_handler(request: Request, exc: LLMQueueFull):
+    """Hàng đợi LLM đã đầy: trả 429 để client (hoặc load balancer) thử lại sau thay vì chờ vô hạn."""
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
 # Thêm các router từ các module endpoint
 app.include_router(chat.router, prefix="/api/v1", tags=["1. Chat"])
 app.include_router(documents.router, prefix="/api/v1", tags=["2. Documents"])
 app.include_router(tasks.router, prefix="/api/v1", tags=["3. Tasks"]) # Thêm router mới
+app.include_router(collections.router, prefix="/api/v1", tags=["4. Collections"])
 
 @app.on_event("startup")
 async def startup_event():
     """
     Các hành động cần thực hiện khi ứng dụng khởi động.
-    Đây là nơi tốt để khởi tạo các tài nguyên nặng.
+    Chỉ khởi tạo phần nhẹ ở đây; mô hình embedding, Chroma, chỉ mục từ khóa và re-ranker
+    được tải song song ở nền (xem Warmup), nên API trả lời ngay còn /health/ready báo tiến độ.
     """
-    print("--- Ứng dụng đang khởi động ---")
+    logger.info("--- Ứng dụng đang khởi động ---")
     # Mẫu Singleton trong các service đảm bảo chúng chỉ được khởi tạo một lần
-    from .services.vector_store import VectorStoreManager
+    from .services.vector_store import STORE_COMPONENTS, VectorStoreManager
     from .services.rag_pipeline import RAGPipeline
+    from .services.ingestion_queue import get_ingestion_queue
     
     # Lệnh gọi này sẽ kích hoạt việc khởi tạo các instance singleton
     vsm = VectorStoreManager()
-    RAGPipeline(vector_store_manager=vsm)
+    pipeline = RAGPipeline(vector_store_manager=vsm)
+    pipeline.event_loop = asyncio.get_running_loop()
+
+    # Khởi động các worker nạp tài liệu (tiếp tục cả các job còn dở từ lần chạy trước)
+    # sau khi các store đã tải xong
+    get_warmup().submit(
+        "ingestion_workers",
+        lambda: get_ingestion_queue().start(documents.process_document),
+        depends_on=STORE_COMPONENTS,
+    )
     
-    print(f"Mô hình LLM đang sử dụng: {settings.OLLAMA_MODEL}")
-    print(f"Mô hình Embedding đang sử dụng: {settings.EMBEDDING_MODEL_NAME}")
-    print("--- Khởi động hoàn tất, API đã sẵn sàng ---")
+    logger.info(f"Mô hình LLM đang sử dụng: {settings.OLLAMA_MODEL}")
+    logger.info(f"Mô hình Embedding đang sử dụng: {settings.EMBEDDING_MODEL_NAME}")
+    logger.info("--- API đã sẵn sàng nhận yêu cầu, các thành phần nặng đang được tải ở nền ---")
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Dừng các worker nạp tài liệu khi ứng dụng tắt."""
+    from .services.ingestion_queue import get_ingestion_queue
+    get_ingestion_queue().stop()
 
 @app.get("/", tags=["Root"])
 def read_root():
     """Endpoint gốc để kiểm tra API có đang chạy không."""
     return {"message": "Chào mừng đến với API RAG Offline!"}
+
+@app.get("/metrics", tags=["Root"], include_in_schema=False)
+def metrics():
+    """Metric của tiến trình ở định dạng văn bản Prometheus."""
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("Metrics đang tắt.\n", status_code=404)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/health/live", tags=["Root"])
+def liveness():
+    """Liveness: tiến trình còn chạy (không phụ thuộc trạng thái tải các thành phần)."""
+    return {"status": "alive"}
+
+@app.get("/health/ready", tags=["Root"])
+def readiness():
+    """Readiness: trạng thái và thời gian tải của từng thành phần; 503 khi thành phần bắt buộc chưa sẵn sàng."""
+    status = get_warmup().status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
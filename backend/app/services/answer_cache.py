@@ -0,0 +1,116 @@
+# backend/app/services/answer_cache.py
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Khóa dùng cho các câu hỏi tìm kiếm trên toàn bộ kho tài liệu (không chỉ định document_id)
+ALL_DOCUMENTS_KEY = "__all__"
+# Khóa của phạm vi nhiều tài liệu là các document_id (đã sắp xếp) nối bằng ký tự này
+SCOPE_SEPARATOR = "|"
+
+@dataclass
+class CachedAnswer:
+    document_key: str
+    query: str
+    embedding: np.ndarray
+    answer: str
+    sources: List[Dict[str, Any]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+
+class SemanticAnswerCache:
+    """
+    Cache câu trả lời theo ngữ nghĩa cho RAGPipeline.ask.
+    Một câu hỏi mới trùng cache khi cùng phạm vi tài liệu và có độ tương đồng cosine giữa
+    embedding câu hỏi với một câu hỏi đã trả lời >= similarity_threshold.
+    Bản ghi hết hạn sau ttl_seconds, và bị loại theo LRU khi vượt max_entries.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._by_document: Dict[str, List[int]] = {}
+        self._next_id = 0
+
+    @staticmethod
+    def _normalize(embedding: Any) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    @staticmethod
+    def _document_key(document_ids: Optional[Sequence[str]]) -> str:
+        if document_ids is None:
+            return ALL_DOCUMENTS_KEY
+        return SCOPE_SEPARATOR.join(sorted(set(document_ids)))
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        ids = self._by_document.get(entry.document_key)
+        if ids is not None:
+            ids.remove(entry_id)
+            if not ids:
+                del self._by_document[entry.document_key]
+
+    def lookup(self, document_ids: Optional[Sequence[str]], query_embedding: Any) -> Optional[CachedAnswer]:
+        document_key = self._document_key(document_ids)
+        query_vector = self._normalize(query_embedding)
+        now = time.time()
+        with self._lock:
+            for entry_id in [i for i in self._by_document.get(document_key, []) if now - self._entries[i].created_at > self.ttl_seconds]:
+                self._remove(entry_id)
+            candidate_ids = self._by_document.get(document_key, [])
+            if candidate_ids:
+                matrix = np.stack([self._entries[i].embedding for i in candidate_ids])
+                similarities = matrix @ query_vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    entry_id = candidate_ids[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return self._entries[entry_id]
+            self.misses += 1
+            return None
+
+    def store(self, document_ids: Optional[Sequence[str]], query: str, query_embedding: Any, answer: str, sources: List[Dict[str, Any]]):
+        document_key = self._document_key(document_ids)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = CachedAnswer(document_key, query, self._normalize(query_embedding), answer, sources)
+            self._by_document.setdefault(document_key, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_document(self, document_id: str):
+        """Xóa cache của mọi phạm vi chứa tài liệu, cùng các câu trả lời trên toàn kho (vì kho vừa thay đổi)."""
+        with self._lock:
+            for document_key in list(self._by_document):
+                if document_key == ALL_DOCUMENTS_KEY or document_id in document_key.split(SCOPE_SEPARATOR):
+                    for entry_id in list(self._by_document.get(document_key, [])):
+                        self._remove(entry_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_document.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,76 @@
+# backend/app/services/artifact_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class ArtifactCache:
+    """
+    Cache bền vững (SQLite) cho kết quả các tác vụ trên từng tài liệu: bản tóm tắt,
+    câu hỏi ôn tập, từ khóa/chủ đề. Khóa gồm (document_id, tác vụ, tham số, mô hình,
+    phiên bản prompt), nên đổi mô hình hoặc prompt sẽ tự động không dùng lại kết quả cũ.
+    """
+
+    def __init__(self, db_path: str, model_name: str, prompt_version: str):
+        self.model_name = model_name
+        self.prompt_version = prompt_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "artifact_key TEXT PRIMARY KEY, document_id TEXT NOT NULL, task TEXT NOT NULL, "
+            "result TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_document ON artifacts(document_id)")
+        self._conn.commit()
+
+    def _key(self, document_id: str, task: str, params: Dict[str, Any]) -> str:
+        raw = json.dumps([document_id, task, params, self.model_name, self.prompt_version], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, document_id: str, task: str, params: Dict[str, Any]) -> Optional[str]:
+        key = self._key(document_id, task, params)
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM artifacts WHERE artifact_key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, document_id: str, task: str, params: Dict[str, Any], result: str):
+        key = self._key(document_id, task, params)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (artifact_key, document_id, task, result, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, document_id, task, result, time.time()),
+            )
+            self._conn.commit()
+
+    def invalidate_document(self, document_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM artifacts WHERE document_id = ?", (document_id,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM artifacts")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
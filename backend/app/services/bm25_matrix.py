@@ -0,0 +1,257 @@
+# backend/app/services/bm25_matrix.py
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .keyword_index import KeywordIndex
+
+# Số tập tài liệu (bộ sưu tập) được giữ sẵn mặt nạ slot và thống kê BM25 riêng
+SUBSET_CACHE_SIZE = 64
+
+# Chunk thêm sau khi chụp ma trận: (chunk_id, document_id, {term: tf}, độ dài)
+DeltaChunk = Tuple[str, str, Mapping[str, int], int]
+
+class MatrixDelta:
+    """
+    Thay đổi của KeywordIndex kể từ lúc chụp một BM25Matrix, theo chunk_id (không phụ thuộc
+    slot nên vẫn đúng sau compaction): chunk đã xóa/thay thế (tombstone) và chunk mới thêm.
+    Ma trận cũ cộng với delta cho kết quả như ma trận dựng lại, trong lúc chờ dựng lại ở nền.
+    """
+
+    def __init__(self):
+        self.removed: set = set()
+        self.added: Dict[str, Tuple[str, Mapping[str, int], int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.removed) + len(self.added)
+
+    def record_add(self, chunk_id: str, document_id: str, term_freqs: Mapping[str, int], length: int):
+        self.added[chunk_id] = (document_id, dict(term_freqs), length)
+
+    def record_remove(self, chunk_id: str):
+        self.added.pop(chunk_id, None)
+        self.removed.add(chunk_id)
+
+    def copy(self) -> Tuple[List[str], List[DeltaChunk]]:
+        """Bản sao (tombstone, chunk mới) để chấm điểm ngoài khóa của chỉ mục."""
+        return list(self.removed), [(chunk_id, *entry) for chunk_id, entry in self.added.items()]
+
+class BM25Matrix:
+    """
+    Ảnh chụp chỉ đọc của KeywordIndex dưới dạng ma trận thưa term x chunk kiểu CSR
+    (indptr/slots/weights), với trọng số BM25 của từng posting đã được tính sẵn theo
+    thống kê toàn kho. Truy vấn chỉ cần cộng các lát cắt của những term trong câu hỏi
+    (np.bincount) rồi lấy top-k bằng argpartition, không có vòng lặp Python theo posting.
+    Lọc theo một tập tài liệu dùng mặt nạ boolean trên các slot (được cache theo tập);
+    khi đó trọng số được tính lại (vector hóa) theo thống kê riêng của tập tài liệu,
+    tương đương với việc dựng BM25 trên riêng các chunk đó.
+    Các thay đổi sau lúc chụp được truyền vào search dưới dạng delta (xem MatrixDelta).
+    """
+
+    def __init__(
+        self,
+        k1: float,
+        b: float,
+        slot_chunk_ids: List[Optional[str]],
+        slot_lengths: Sequence[int],
+        slot_documents: Sequence[int],
+        document_numbers: Dict[str, int],
+        terms: List[str],
+        posting_counts: np.ndarray,
+        postings: bytes,
+    ):
+        """
+        posting_counts[i] là số phần tử (slot, tf nằm xen kẽ) của term i trong postings.
+        Postings có slot >= len(slot_chunk_ids) (chunk được thêm trong lúc chụp) bị bỏ qua.
+        """
+        self.k1, self.b = k1, b
+        self.slot_chunk_ids = slot_chunk_ids
+        num_slots = len(self.slot_chunk_ids)
+        self.live = np.fromiter((chunk_id is not None for chunk_id in self.slot_chunk_ids), dtype=bool, count=num_slots)
+        self.lengths = np.array(slot_lengths, dtype=np.float32)
+        self.documents = np.array(slot_documents, dtype=np.uint32)
+        self.document_numbers = document_numbers
+        self.term_ids: Dict[str, int] = {term: term_id for term_id, term in enumerate(terms)}
+        self.chunk_slots: Dict[str, int] = {chunk_id: slot for slot, chunk_id in enumerate(self.slot_chunk_ids) if chunk_id is not None}
+
+        # Postings xen kẽ (slot, tf) của mọi term nằm liền trong một mảng duy nhất
+        counts = posting_counts // 2
+        flat = np.frombuffer(postings, dtype=np.uint32)
+        slots, tfs = flat[0::2], flat[1::2]
+
+        # Bỏ postings của chunk đã xóa nhưng chưa được compaction và của chunk thêm sau lúc chụp
+        keep = slots < num_slots
+        keep[keep] = self.live[slots[keep]]
+        if not keep.all():
+            term_of_posting = np.repeat(np.arange(len(counts)), counts)
+            counts = np.bincount(term_of_posting[keep], minlength=len(counts))
+            slots, tfs = slots[keep], tfs[keep]
+        self.indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.indptr[1:])
+        self.slots = np.ascontiguousarray(slots)
+        self.tfs = tfs.astype(np.float32)
+        self.doc_freqs = counts
+
+        self.num_chunks = int(self.live.sum())
+        self.total_length = float(self.lengths[self.live].sum())
+        avgdl = self.total_length / self.num_chunks if self.num_chunks else 1.0
+        self.weights = self._tf_weights(self.tfs, self.lengths[self.slots], avgdl or 1.0)
+        self.idf = self._idf(self.num_chunks, counts)
+        self._subset_lock = threading.Lock()
+        self._subsets: "OrderedDict[Tuple[int, ...], Tuple[np.ndarray, int, float]]" = OrderedDict()
+
+    @classmethod
+    def from_index(cls, index: "KeywordIndex") -> "BM25Matrix":
+        """Dựng trực tiếp từ chỉ mục (người gọi phải đảm bảo không có ghi đồng thời)."""
+        return cls(
+            index.k1, index.b, list(index.slot_chunk_ids), index.slot_lengths, index.slot_documents,
+            dict(index.document_ids.ids), index.term_dictionary.terms,
+            np.fromiter(map(len, index.postings), dtype=np.int64, count=len(index.postings)), b"".join(index.postings),
+        )
+
+    def _tf_weights(self, tfs: np.ndarray, lengths: np.ndarray, avgdl: float) -> np.ndarray:
+        k1, b = self.k1, self.b
+        return (tfs * (k1 + 1) / (tfs + k1 * (1 - b + b * lengths / avgdl))).astype(np.float32)
+
+    @staticmethod
+    def _idf(num_chunks: int, doc_freqs: np.ndarray) -> np.ndarray:
+        # Dạng IDF của Lucene (giống KeywordIndex trước đây): luôn dương
+        return np.log((num_chunks - doc_freqs + 0.5) / (doc_freqs + 0.5) + 1.0)
+
+    def search(
+        self,
+        term_counts: Dict[str, int],
+        k: int,
+        document_ids: Optional[Iterable[str]] = None,
+        removed: Sequence[str] = (),
+        added: Sequence[DeltaChunk] = (),
+    ) -> List[Tuple[str, float]]:
+        """removed/added là delta của chỉ mục kể từ lúc chụp ma trận (xem MatrixDelta.copy)."""
+        if removed or added:
+            return self._search_with_delta(term_counts, k, document_ids, removed, added)
+        if k <= 0 or not self.num_chunks:
+            return []
+        query_terms = [(self.term_ids[term], query_tf) for term, query_tf in term_counts.items() if term in self.term_ids]
+        if not query_terms:
+            return []
+        if document_ids is None:
+            return self._search_all(query_terms, k)
+        subset = self._subset(document_ids)
+        if subset is None:
+            return []
+        return self._search_subset(query_terms, k, *subset)
+
+    def _subset(self, document_ids: Iterable[str]) -> Optional[Tuple[np.ndarray, int, float]]:
+        """(mặt nạ slot, số chunk, avgdl) của một tập tài liệu; None nếu tập không có chunk nào."""
+        numbers = tuple(sorted({self.document_numbers[d] for d in document_ids if d in self.document_numbers}))
+        if not numbers:
+            return None
+        with self._subset_lock:
+            subset = self._subsets.get(numbers)
+            if subset is not None:
+                self._subsets.move_to_end(numbers)
+                return subset
+        if len(numbers) == 1:
+            mask = self.live & (self.documents == numbers[0])
+        else:
+            mask = self.live & np.isin(self.documents, np.array(numbers, dtype=np.uint32))
+        num_chunks = int(mask.sum())
+        if not num_chunks:
+            return None
+        subset = (mask, num_chunks, float(self.lengths[mask].sum()) / num_chunks or 1.0)
+        with self._subset_lock:
+            self._subsets[numbers] = subset
+            while len(self._subsets) > SUBSET_CACHE_SIZE:
+                self._subsets.popitem(last=False)
+        return subset
+
+    def _search_all(self, query_terms: List[Tuple[int, int]], k: int) -> List[Tuple[str, float]]:
+        slot_parts, weight_parts = [], []
+        for term_id, query_tf in query_terms:
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            if start == end:
+                continue
+            slot_parts.append(self.slots[start:end])
+            weight_parts.append(self.weights[start:end] * np.float32(self.idf[term_id] * query_tf))
+        return self._top_k(self._scores(slot_parts, weight_parts), k, self.slot_chunk_ids)
+
+    def _search_subset(self, query_terms: List[Tuple[int, int]], k: int, mask: np.ndarray, num_chunks: int, avgdl: float) -> List[Tuple[str, float]]:
+        # N, avgdl và df chỉ tính trên các chunk của tập tài liệu, như khi dựng BM25 trên tập đã lọc
+        slot_parts, weight_parts = [], []
+        for term_id, query_tf in query_terms:
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            slots = self.slots[start:end]
+            selected = mask[slots]
+            doc_freq = int(selected.sum())
+            if not doc_freq:
+                continue
+            slots = slots[selected]
+            weights = self._tf_weights(self.tfs[start:end][selected], self.lengths[slots], avgdl)
+            slot_parts.append(slots)
+            weight_parts.append(weights * np.float32(self._idf(num_chunks, doc_freq) * query_tf))
+        return self._top_k(self._scores(slot_parts, weight_parts), k, self.slot_chunk_ids)
+
+    def _search_with_delta(
+        self,
+        term_counts: Dict[str, int],
+        k: int,
+        document_ids: Optional[Iterable[str]],
+        removed: Sequence[str],
+        added: Sequence[DeltaChunk],
+    ) -> List[Tuple[str, float]]:
+        """
+        Chấm điểm trên (ma trận - tombstone) + chunk mới: N, avgdl và df được tính trên đúng tập
+        chunk đó (vector hóa cho phần ma trận, vòng lặp Python cho phần delta vốn nhỏ).
+        """
+        if k <= 0:
+            return []
+        mask = self.live.copy()
+        mask[[self.chunk_slots[chunk_id] for chunk_id in removed if chunk_id in self.chunk_slots]] = False
+        if document_ids is not None:
+            wanted = set(document_ids)
+            numbers = [self.document_numbers[d] for d in wanted if d in self.document_numbers]
+            mask &= np.isin(self.documents, np.array(numbers, dtype=np.uint32))
+            added = [chunk for chunk in added if chunk[1] in wanted]
+        num_chunks = int(mask.sum()) + len(added)
+        if not num_chunks:
+            return []
+        added_lengths = np.array([chunk[3] for chunk in added], dtype=np.float32)
+        avgdl = (float(self.lengths[mask].sum()) + float(added_lengths.sum())) / num_chunks or 1.0
+
+        slot_parts, weight_parts = [], []
+        added_scores = np.zeros(len(added), dtype=np.float32)
+        for term, query_tf in term_counts.items():
+            added_tfs = np.array([chunk[2].get(term, 0) for chunk in added], dtype=np.float32)
+            doc_freq = int(np.count_nonzero(added_tfs))
+            term_id = self.term_ids.get(term)
+            if term_id is not None:
+                start, end = self.indptr[term_id], self.indptr[term_id + 1]
+                slots = self.slots[start:end]
+                selected = mask[slots]
+                doc_freq += int(selected.sum())
+            if not doc_freq:
+                continue
+            idf = np.float32(self._idf(num_chunks, doc_freq) * query_tf)
+            if term_id is not None and selected.any():
+                slots = slots[selected]
+                slot_parts.append(slots)
+                weight_parts.append(self._tf_weights(self.tfs[start:end][selected], self.lengths[slots], avgdl) * idf)
+            if len(added):
+                added_scores += self._tf_weights(added_tfs, added_lengths, avgdl) * idf
+        scores = self._scores(slot_parts, weight_parts)
+        return self._top_k(np.concatenate([scores, added_scores]), k, self.slot_chunk_ids + [chunk[0] for chunk in added])
+
+    def _scores(self, slot_parts: List[np.ndarray], weight_parts: List[np.ndarray]) -> np.ndarray:
+        if not slot_parts:
+            return np.zeros(len(self.slot_chunk_ids))
+        return np.bincount(np.concatenate(slot_parts), weights=np.concatenate(weight_parts), minlength=len(self.slot_chunk_ids))
+
+    def _top_k(self, scores: np.ndarray, k: int, chunk_ids: List[Optional[str]]) -> List[Tuple[str, float]]:
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(chunk_ids[slot], float(scores[slot])) for slot in candidates]
@@ -0,0 +1,174 @@
+# backend/app/services/content_store.py
+import logging
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Mỗi bản ghi: [độ dài id (uint32)][id][độ dài nội dung (uint32)][nội dung UTF-8]
+_HEADER = struct.Struct("<I")
+_TOMBSTONE = 0xFFFFFFFF
+
+class ChunkContentStore:
+    """
+    Kho nội dung chunk dạng nhị phân append-only, đọc qua mmap.
+    Trong bộ nhớ chỉ giữ {chunk_id: (offset, length)}; nội dung được giải mã khi cần
+    (kết quả tìm kiếm, lấy toàn văn tài liệu) nên không chiếm RAM của tiến trình.
+    Khi phần dữ liệu chết (bị xóa/ghi đè) vượt quá phần còn sống, file được ghi lại.
+    """
+
+    def __init__(self, path: str, compaction_min_bytes: int = 16 * 1024 * 1024):
+        self.path = path
+        self.compaction_min_bytes = compaction_min_bytes
+        self._lock = threading.RLock()
+        self._locations: Dict[str, Tuple[int, int]] = {}
+        self._live_bytes = 0
+        self._dead_bytes = 0
+        self._mmap: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+        self._file_size = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'ab').close()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._locations
+
+    def _load(self):
+        """Dựng lại bảng vị trí bằng cách đọc phần header của từng bản ghi (không giải mã nội dung)."""
+        size = os.path.getsize(self.path)
+        valid_size = 0
+        if size:
+            with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                position = 0
+                while position + _HEADER.size <= size:
+                    (id_length,) = _HEADER.unpack_from(mm, position)
+                    id_end = position + _HEADER.size + id_length
+                    if id_end + _HEADER.size > size:
+                        break
+                    chunk_id = mm[position + _HEADER.size:id_end].decode('utf-8')
+                    (content_length,) = _HEADER.unpack_from(mm, id_end)
+                    content_start = id_end + _HEADER.size
+                    if content_length == _TOMBSTONE:
+                        self._forget(chunk_id)
+                        position = content_start
+                    else:
+                        if content_start + content_length > size:
+                            break
+                        self._forget(chunk_id)
+                        self._locations[chunk_id] = (content_start, content_length)
+                        self._live_bytes += content_length
+                        position = content_start + content_length
+                    valid_size = position
+        if valid_size < size:
+            logger.warning(f"Phát hiện bản ghi ghi dở trong {os.path.basename(self.path)}, đang cắt bỏ.")
+            with open(self.path, 'rb+') as f:
+                f.truncate(valid_size)
+        self._file_size = valid_size
+
+    def _forget(self, chunk_id: str):
+        location = self._locations.pop(chunk_id, None)
+        if location is not None:
+            self._live_bytes -= location[1]
+            self._dead_bytes += location[1]
+
+    def _view(self) -> mmap.mmap:
+        """mmap của file, được map lại khi file đã lớn thêm kể từ lần map trước."""
+        if self._mmap is None or self._mapped_size != self._file_size:
+            self._close_view()
+            with open(self.path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_size = self._file_size
+        return self._mmap
+
+    # --- Đọc ---
+    def get(self, chunk_id: str) -> Optional[str]:
+        with self._lock:
+            location = self._locations.get(chunk_id)
+            if location is None:
+                return None
+            offset, length = location
+            return self._view()[offset:offset + length].decode('utf-8')
+
+    def get_many(self, chunk_ids: Iterable[str]) -> List[Optional[str]]:
+        with self._lock:
+            return [self.get(chunk_id) for chunk_id in chunk_ids]
+
+    # --- Ghi ---
+    def _append(self, items: List[Tuple[str, Optional[str]]]):
+        if not items:
+            return
+        with self._lock, open(self.path, 'ab') as f:
+            position = f.tell()
+            for chunk_id, content in items:
+                id_bytes = chunk_id.encode('utf-8')
+                self._forget(chunk_id)
+                if content is None:
+                    record = _HEADER.pack(len(id_bytes)) + id_bytes + _HEADER.pack(_TOMBSTONE)
+                    self._dead_bytes += len(record)
+                    f.write(record)
+                    position += len(record)
+                    continue
+                content_bytes = content.encode('utf-8')
+                header = _HEADER.pack(len(id_bytes)) + id_bytes + _HEADER.pack(len(content_bytes))
+                f.write(header)
+                f.write(content_bytes)
+                self._locations[chunk_id] = (position + len(header), len(content_bytes))
+                self._live_bytes += len(content_bytes)
+                position += len(header) + len(content_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+            self._file_size = position
+
+    def put_many(self, contents: Dict[str, str]):
+        self._append(list(contents.items()))
+
+    def delete_many(self, chunk_ids: Iterable[str]):
+        with self._lock:
+            self._append([(chunk_id, None) for chunk_id in chunk_ids if chunk_id in self._locations])
+            if self._dead_bytes > max(self._live_bytes, self.compaction_min_bytes):
+                self.compact()
+
+    def clear(self):
+        with self._lock:
+            self._close_view()
+            open(self.path, 'wb').close()
+            self._file_size = 0
+            self._locations = {}
+            self._live_bytes = self._dead_bytes = 0
+
+    def _close_view(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = None
+        self._mapped_size = 0
+
+    def compact(self):
+        """Ghi lại file chỉ với các bản ghi còn sống rồi thay thế nguyên tử."""
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            view = self._view() if self._file_size else None
+            locations: Dict[str, Tuple[int, int]] = {}
+            with open(tmp_path, 'wb') as f:
+                position = 0
+                for chunk_id, (offset, length) in self._locations.items():
+                    id_bytes = chunk_id.encode('utf-8')
+                    header = _HEADER.pack(len(id_bytes)) + id_bytes + _HEADER.pack(length)
+                    f.write(header)
+                    f.write(view[offset:offset + length])
+                    locations[chunk_id] = (position + len(header), length)
+                    position += len(header) + length
+                f.flush()
+                os.fsync(f.fileno())
+            self._close_view()
+            os.replace(tmp_path, self.path)
+            self._file_size = position
+            self._locations = locations
+            logger.info(f"Đã compaction kho nội dung chunk ({len(locations)} bản ghi, bỏ {self._dead_bytes} byte dữ liệu chết).")
+            self._dead_bytes = 0
@@ -0,0 +1,132 @@
+# backend/app/services/context_builder.py
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from .token_budget import count_tokens
+
+# Độ dài tối thiểu của phần chồng lấn để coi hai chunk là nối tiếp nhau (tránh trùng ngẫu nhiên)
+MIN_OVERLAP_CHARS = 20
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+@dataclass
+class ContextPassage:
+    """Một đoạn ngữ cảnh, có thể gộp từ nhiều chunk liền kề của cùng một trang tài liệu."""
+    content: str
+    chunks: List[Dict[str, Any]]
+    rank: int
+    tokens: int = 0
+
+@dataclass
+class ContextResult:
+    passages: List[str] = field(default_factory=list)
+    chunks: List[Dict[str, Any]] = field(default_factory=list)
+    original_tokens: int = 0
+    context_tokens: int = 0
+    merged_chunks: int = 0
+    dropped_chunks: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(0, self.original_tokens - self.context_tokens)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "original_tokens": self.original_tokens,
+            "context_tokens": self.context_tokens,
+            "saved_tokens": self.saved_tokens,
+            "merged_chunks": self.merged_chunks,
+            "dropped_chunks": self.dropped_chunks,
+        }
+
+def _chunk_position(chunk: Dict[str, Any]) -> Optional[int]:
+    """Vị trí của chunk trong tài liệu: metadata chunk_index nếu có, nếu không thì hậu tố của id ({document_id}_{i})."""
+    position = chunk["metadata"].get("chunk_index")
+    if position is not None:
+        return int(position)
+    suffix = str(chunk["id"]).rsplit("_", 1)[-1]
+    return int(suffix) if suffix.isdigit() else None
+
+def find_overlap(left: str, right: str, max_overlap: int) -> int:
+    """Độ dài phần cuối của left trùng với phần đầu của right (0 nếu không có)."""
+    tail = left[-max_overlap:] if max_overlap > 0 else left
+    probe = right[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    start = tail.find(probe)
+    while start != -1:
+        # Vị trí xuất hiện sớm nhất cho phần chồng lấn dài nhất
+        if right.startswith(tail[start:]):
+            return len(tail) - start
+        start = tail.find(probe, start + 1)
+    return 0
+
+def _merge_group(chunks: List[Tuple[int, Dict[str, Any]]], max_overlap: int) -> Tuple[List[ContextPassage], int]:
+    """Gộp các chunk của cùng (tài liệu, trang) nối tiếp nhau; trả về (các đoạn, số chunk đã gộp vào đoạn khác)."""
+    ordered = sorted(chunks, key=lambda item: (_chunk_position(item[1]) is None, _chunk_position(item[1]) or 0, item[0]))
+    passages: List[ContextPassage] = []
+    merged = 0
+    previous_position = None
+    for rank, chunk in ordered:
+        content = chunk["content"]
+        position = _chunk_position(chunk)
+        if passages:
+            current = passages[-1]
+            if content in current.content:
+                # Chunk trùng lặp hoàn toàn với nội dung đã có
+                current.chunks.append(chunk)
+                current.rank = min(current.rank, rank)
+                merged += 1
+                continue
+            overlap = find_overlap(current.content, content, max_overlap)
+            adjacent = position is not None and previous_position is not None and position == previous_position + 1
+            if overlap or adjacent:
+                current.content += content[overlap:] if overlap else "\n" + content
+                current.chunks.append(chunk)
+                current.rank = min(current.rank, rank)
+                previous_position = position
+                merged += 1
+                continue
+        passages.append(ContextPassage(content=content, chunks=[chunk], rank=rank))
+        previous_position = position
+    return passages, merged
+
+def build_context(chunks: List[Dict[str, Any]], token_budget: int, max_overlap: int) -> ContextResult:
+    """
+    Dựng ngữ cảnh cho prompt RAG từ các chunk đã xếp hạng:
+    - Gộp các chunk liền kề/chồng lấn của cùng tài liệu và trang, bỏ phần chồng lấn bị lặp.
+    - Xếp các đoạn theo thứ hạng tốt nhất của các chunk bên trong, rồi chọn tham lam
+      cho tới khi hết token_budget (đoạn không vừa thì bỏ qua, thử đoạn tiếp theo;
+      riêng đoạn đầu tiên quá lớn sẽ bị cắt bớt cho vừa nên ngữ cảnh không bao giờ trống).
+    """
+    result = ContextResult(original_tokens=sum(count_tokens(chunk["content"]) for chunk in chunks))
+    groups: Dict[Tuple[Any, Any], List[Tuple[int, Dict[str, Any]]]] = {}
+    for rank, chunk in enumerate(chunks):
+        key = (chunk["metadata"].get("document_id"), chunk["metadata"].get("page"))
+        groups.setdefault(key, []).append((rank, chunk))
+
+    passages: List[ContextPassage] = []
+    for group in groups.values():
+        group_passages, merged = _merge_group(group, max_overlap)
+        passages.extend(group_passages)
+        result.merged_chunks += merged
+    passages.sort(key=lambda passage: passage.rank)
+
+    separator_tokens = count_tokens(CONTEXT_SEPARATOR)
+    used = 0
+    for passage in passages:
+        passage.tokens = count_tokens(passage.content)
+        cost = passage.tokens + (separator_tokens if result.passages else 0)
+        if not result.passages:
+            # Đoạn tốt nhất lớn hơn cả ngân sách: cắt bớt thay vì để ngữ cảnh trống. Số token sau khi cắt
+            # không tỉ lệ đúng với số ký tự (tokenizer thật), nên cắt lặp lại tới khi vừa; đoạn đầu luôn được nhận.
+            while cost > token_budget and len(passage.content) > 1:
+                keep = min(len(passage.content) - 1, len(passage.content) * token_budget // cost)
+                passage.content = passage.content[:max(1, keep)]
+                cost = count_tokens(passage.content)
+        elif used + cost > token_budget:
+            result.dropped_chunks += len(passage.chunks)
+            continue
+        result.passages.append(passage.content)
+        result.chunks.extend(passage.chunks)
+        used += cost
+    result.context_tokens = used
+    return result
@@ -1,11 +1,44 @@
 # backend/app/services/document_parser.py
+import logging
+import multiprocessing
 import os
 import sys
-from typing import List
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
 from langchain.schema.document import Document
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, UnstructuredWordDocumentLoader
+from langchain_community.document_loaders import TextLoader, UnstructuredWordDocumentLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from ..core.config import settings
+from .pdf_pages import count_pdf_pages, extract_pdf_pages, iter_pdf_pages
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ParseStats:
+    """Thống kê một lần đọc tài liệu, gồm thời gian trích xuất của từng trang."""
+    pages: int = 0
+    chunks: int = 0
+    elapsed_seconds: float = 0.0
+    page_seconds: Dict[int, float] = field(default_factory=dict)
+
+    def slowest_pages(self, n: int = 5) -> List[Tuple[int, float]]:
+        return sorted(self.page_seconds.items(), key=lambda item: item[1], reverse=True)[:n]
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """Process pool dùng chung cho việc đọc PDF lớn, chỉ tạo khi cần lần đầu."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # spawn: không fork tiến trình chính đang chạy nhiều thread (chromadb, torch)
+            _pdf_pool = ProcessPoolExecutor(max_workers=settings.PDF_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pdf_pool
 
 # --- BẮT ĐẦU CẬP NHẬT: Thêm logic xử lý riêng cho file .doc trên Windows ---
 def _load_doc_with_win32(file_path: str) -> List[Document]:
@@ -27,7 +60,7 @@ def _load_doc_with_win32(file_path: str) -> List[Document]:
         # Tạo một đối tượng Document của LangChain từ nội dung đã đọc
         return [Document(page_content=content, metadata={"source": os.path.basename(file_path)})]
     except Exception as e:
-        print(f"Lỗi khi dùng win32com để đọc file .doc: {e}")
+        logger.warning(f"Lỗi khi dùng win32com để đọc file .doc: {e}")
         # Đảm bảo Word được đóng lại nếu có lỗi
         if 'word' in locals() and word is not None:
             word.Quit()
@@ -35,21 +68,59 @@ def _load_doc_with_win32(file_path: str) -> List[Document]:
 
 # --- KẾT THÚC CẬP NHẬT ---
 
-def load_and_split_document(file_path: str) -> List[Document]:
+def _iter_pdf_page_texts(file_path: str, total_pages: int) -> Iterator[Tuple[int, str, float]]:
+    """Trả về lần lượt (trang, nội dung, thời gian) theo đúng thứ tự trang."""
+    per_task = max(1, settings.PDF_PAGES_PER_TASK)
+    if settings.PDF_PARSE_WORKERS <= 1 or total_pages < settings.PDF_PARALLEL_MIN_PAGES:
+        yield from iter_pdf_pages(file_path, 0, total_pages)
+        return
+
+    logger.info(f"Đọc song song {total_pages} trang PDF trên {settings.PDF_PARSE_WORKERS} tiến trình...")
+    pool = _get_pdf_pool()
+    starts = iter(range(0, total_pages, per_task))
+    # Giới hạn số nhóm trang đang xử lý để bộ nhớ không tăng theo kích thước file
+    max_in_flight = settings.PDF_PARSE_WORKERS * 2
+    in_flight = deque()
+
+    def submit_next():
+        start = next(starts, None)
+        if start is not None:
+            in_flight.append(pool.submit(extract_pdf_pages, file_path, start, start + per_task))
+
+    try:
+        for _ in range(max_in_flight):
+            submit_next()
+        while in_flight:
+            pages = in_flight.popleft().result()
+            submit_next()
+            yield from pages
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+def _iter_pdf_pages(file_path: str, stats: ParseStats) -> Iterator[Document]:
+    for page_number, text, seconds in _iter_pdf_page_texts(file_path, count_pdf_pages(file_path)):
+        stats.page_seconds[page_number] = seconds
+        if seconds > settings.PDF_SLOW_PAGE_SECONDS:
+            logger.warning(f"trang {page_number} của {os.path.basename(file_path)} mất {seconds:.2f}s để trích xuất.")
+        yield Document(page_content=text, metadata={"source": file_path, "page": page_number})
+
+def iter_document_pages(file_path: str, stats: Optional[ParseStats] = None) -> Iterator[Document]:
     """
-    Tải một tài liệu từ đường dẫn file, chọn loader phù hợp dựa trên
-    phần mở rộng của file và chia nhỏ nó thành các chunk.
+    Đọc một tài liệu theo từng trang (generator), chọn cách đọc phù hợp dựa trên
+    phần mở rộng của file. PDF được trích xuất từng trang nên không cần giữ cả file trong bộ nhớ.
     """
+    stats = stats if stats is not None else ParseStats()
     file_extension = os.path.splitext(file_path)[1].lower()
-    print(f"Đang xử lý file có phần mở rộng: {file_extension}")
-    
-    documents = []
-    
+    logger.debug("Đang xử lý file có phần mở rộng: %s", file_extension)
+
     # --- BẮT ĐẦU CẬP NHẬT: Thêm luồng xử lý riêng cho .doc ---
     # Chọn loader phù hợp
     if file_extension == ".pdf":
-        loader = PyPDFLoader(file_path, extract_images=False)
-        documents = loader.load()
+        for page in _iter_pdf_pages(file_path, stats):
+            stats.pages += 1
+            yield page
+        return
     elif file_extension == ".txt":
         loader = TextLoader(file_path, encoding='utf-8')
         documents = loader.load()
@@ -60,20 +131,28 @@ def load_and_split_document(file_path: str) -> List[Document]:
     elif file_extension == ".doc":
         # Nếu là Windows, ưu tiên dùng pywin32
         if sys.platform == "win32":
-            print("Phát hiện Windows, đang thử đọc file .doc bằng MS Word...")
+            logger.info("Phát hiện Windows, đang thử đọc file .doc bằng MS Word...")
             documents = _load_doc_with_win32(os.path.abspath(file_path))
         else:
             # Nếu không phải Windows, dùng cách cũ (cần LibreOffice)
-            print("Đang thử đọc file .doc bằng Unstructured (yêu cầu LibreOffice)...")
+            logger.info("Đang thử đọc file .doc bằng Unstructured (yêu cầu LibreOffice)...")
             loader = UnstructuredWordDocumentLoader(file_path)
             documents = loader.load()
     else:
         raise ValueError(f"Loại file không được hỗ trợ: {file_extension}")
     # --- KẾT THÚC CẬP NHẬT ---
 
-    if not documents:
-        print(f"Cảnh báo: Không có nội dung nào được trích xuất từ {file_path}")
-        return []
+    stats.pages += len(documents)
+    yield from documents
+
+def iter_document_chunks(file_path: str, stats: Optional[ParseStats] = None) -> Iterator[Document]:
+    """
+    Đọc và chia nhỏ tài liệu thành các chunk theo kiểu stream: mỗi trang được chia
+    ngay khi được trích xuất, nên các giai đoạn embedding/indexing phía sau có thể
+    bắt đầu trước khi đọc xong file.
+    """
+    stats = stats if stats is not None else ParseStats()
+    start = time.perf_counter()
 
     # Khởi tạo công cụ chia nhỏ văn bản
     text_splitter = RecursiveCharacterTextSplitter(
@@ -81,9 +160,26 @@ def load_and_split_document(file_path: str) -> List[Document]:
         chunk_overlap=settings.CHUNK_OVERLAP,
         length_function=len,
     )
-    
-    # Thực hiện chia nhỏ
-    chunks = text_splitter.split_documents(documents)
-    
-    print(f"Đã tải và chia tài liệu {os.path.basename(file_path)} thành {len(chunks)} chunks.")
+
+    for page in iter_document_pages(file_path, stats):
+        for chunk in text_splitter.split_documents([page]):
+            stats.chunks += 1
+            yield chunk
+
+    stats.elapsed_seconds = time.perf_counter() - start
+    if not stats.chunks:
+        logger.warning(f"Không có nội dung nào được trích xuất từ {file_path}")
+        return
+    logger.info(f"Đã đọc {stats.pages} trang của {os.path.basename(file_path)} ({stats.chunks} chunks, {stats.elapsed_seconds:.2f}s).")
+    if stats.page_seconds:
+        logger.info("Các trang đọc lâu nhất: " + ", ".join(f"trang {page}={seconds:.2f}s" for page, seconds in stats.slowest_pages()))
+
+def load_and_split_document(file_path: str) -> List[Document]:
+    """
+    Tải một tài liệu từ đường dẫn file và chia nhỏ nó thành các chunk.
+    Giữ lại để tương thích; luồng nạp tài liệu dùng iter_document_chunks.
+    """
+    chunks = list(iter_document_chunks(file_path))
+    if chunks:
+        logger.info(f"Đã tải và chia tài liệu {os.path.basename(file_path)} thành {len(chunks)} chunks.")
     return chunks
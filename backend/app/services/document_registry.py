@@ -0,0 +1,200 @@
+# backend/app/services/document_registry.py
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+class DocumentRegistry:
+    """
+    Sổ đăng ký tài liệu (SQLite): document_id -> file gốc, kích thước, trạng thái,
+    thời điểm nạp và danh sách chunk id theo thứ tự trong tài liệu.
+    Giúp xóa/lọc/lấy toàn văn một tài liệu tốn thời gian tỉ lệ với tài liệu đó
+    thay vì với toàn bộ thư viện. Trạng thái: queued | indexing | ready | failed.
+    Sổ cũng lưu các bộ sưu tập (notebook): nhóm tài liệu có tên, dùng làm phạm vi tìm kiếm.
+    """
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "document_id TEXT PRIMARY KEY, filename TEXT NOT NULL, file_path TEXT NOT NULL, size_bytes INTEGER NOT NULL, "
+            "chunk_count INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL, error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, ingested_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_created ON documents(created_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS document_chunks ("
+            "document_id TEXT NOT NULL, chunk_index INTEGER NOT NULL, chunk_id TEXT NOT NULL, "
+            "PRIMARY KEY (document_id, chunk_index))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS collections ("
+            "collection_id TEXT PRIMARY KEY, name TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS collection_documents ("
+            "collection_id TEXT NOT NULL, document_id TEXT NOT NULL, added_at REAL NOT NULL, "
+            "PRIMARY KEY (collection_id, document_id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_collection_documents_document ON collection_documents(document_id)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def register(self, document_id: str, filename: str, file_path: str, status: str = "queued"):
+        """Thêm hoặc cập nhật thông tin file của một tài liệu (giữ nguyên created_at và danh sách chunk)."""
+        now = time.time()
+        size_bytes = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO documents (document_id, filename, file_path, size_bytes, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(document_id) DO UPDATE SET filename = excluded.filename, file_path = excluded.file_path, "
+                "size_bytes = excluded.size_bytes, status = excluded.status, error = NULL, updated_at = excluded.updated_at",
+                (document_id, filename, file_path, size_bytes, status, now, now),
+            )
+            self._conn.commit()
+
+    def set_status(self, document_id: str, status: str, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE documents SET status = ?, error = ?, updated_at = ? WHERE document_id = ?",
+                (status, error, time.time(), document_id),
+            )
+            self._conn.commit()
+
+    def set_chunks(self, document_id: str, chunks: Iterable[Tuple[int, str]]) -> bool:
+        """
+        Ghi lại danh sách (chunk_index, chunk_id) sau khi nạp xong và đánh dấu tài liệu sẵn sàng.
+        Trả về False (không ghi gì) nếu tài liệu đã bị xóa khỏi sổ trong lúc nạp.
+        """
+        rows = [(document_id, chunk_index, chunk_id, document_id) for chunk_index, chunk_id in chunks]
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM document_chunks WHERE document_id = ?", (document_id,))
+            self._conn.executemany(
+                "INSERT INTO document_chunks (document_id, chunk_index, chunk_id) "
+                "SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM documents WHERE document_id = ?)",
+                rows,
+            )
+            updated = self._conn.execute(
+                "UPDATE documents SET chunk_count = ?, status = 'ready', error = NULL, ingested_at = ?, updated_at = ? WHERE document_id = ?",
+                (len(rows), now, now, document_id),
+            ).rowcount
+            self._conn.commit()
+        return updated > 0
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_chunk_ids(self, document_id: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM document_chunks WHERE document_id = ? ORDER BY chunk_index", (document_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def list(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Danh sách tài liệu, mới nhất trước."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM documents ORDER BY created_at DESC LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            (total,) = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()
+        return total
+
+    def remove(self, document_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM document_chunks WHERE document_id = ?", (document_id,))
+            self._conn.execute("DELETE FROM collection_documents WHERE document_id = ?", (document_id,))
+            self._conn.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+            self._conn.commit()
+
+    def clear(self):
+        """Xóa mọi tài liệu và bộ sưu tập (giữ bảng meta)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM document_chunks")
+            self._conn.execute("DELETE FROM collection_documents")
+            self._conn.execute("DELETE FROM collections")
+            self._conn.execute("DELETE FROM documents")
+            self._conn.commit()
+
+    # --- Bộ sưu tập ---
+    def create_collection(self, collection_id: str, name: str, document_ids: Iterable[str] = ()) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO collections (collection_id, name, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (collection_id, name, now, now),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO collection_documents (collection_id, document_id, added_at) VALUES (?, ?, ?)",
+                [(collection_id, document_id, now) for document_id in document_ids],
+            )
+            self._conn.commit()
+        return self.get_collection(collection_id)
+
+    def get_collection(self, collection_id: str) -> Optional[Dict[str, Any]]:
+        """Thông tin bộ sưu tập kèm danh sách document_id (theo thứ tự thêm vào)."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM collections WHERE collection_id = ?", (collection_id,)).fetchone()
+            if row is None:
+                return None
+            document_ids = [r[0] for r in self._conn.execute(
+                "SELECT document_id FROM collection_documents WHERE collection_id = ? ORDER BY added_at, document_id", (collection_id,)
+            )]
+        return dict(row, document_ids=document_ids)
+
+    def get_collection_document_ids(self, collection_id: str) -> Optional[List[str]]:
+        """Danh sách document_id của bộ sưu tập, None nếu bộ sưu tập không tồn tại."""
+        collection = self.get_collection(collection_id)
+        return collection["document_ids"] if collection is not None else None
+
+    def list_collections(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            collection_ids = [row[0] for row in self._conn.execute("SELECT collection_id FROM collections ORDER BY created_at DESC")]
+        return [collection for collection in map(self.get_collection, collection_ids) if collection is not None]
+
+    def add_to_collection(self, collection_id: str, document_ids: Iterable[str]):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO collection_documents (collection_id, document_id, added_at) VALUES (?, ?, ?)",
+                [(collection_id, document_id, now) for document_id in document_ids],
+            )
+            self._conn.execute("UPDATE collections SET updated_at = ? WHERE collection_id = ?", (now, collection_id))
+            self._conn.commit()
+
+    def remove_from_collection(self, collection_id: str, document_id: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM collection_documents WHERE collection_id = ? AND document_id = ?", (collection_id, document_id)
+            )
+            self._conn.execute("UPDATE collections SET updated_at = ? WHERE collection_id = ?", (time.time(), collection_id))
+            self._conn.commit()
+
+    def delete_collection(self, collection_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM collection_documents WHERE collection_id = ?", (collection_id,))
+            self._conn.execute("DELETE FROM collections WHERE collection_id = ?", (collection_id,))
+            self._conn.commit()
@@ -0,0 +1,105 @@
+# backend/app/services/embedding_cache.py
+import logging
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+class EmbeddingCache:
+    """
+    Cache embedding theo địa chỉ nội dung, lưu trên SQLite.
+    Khóa là hash của (tên mô hình embedding, nội dung chunk đã chuẩn hóa); vector
+    được lưu dạng blob float32. Khi vượt quá số bản ghi cho phép, các bản ghi ít
+    được dùng gần đây nhất (LRU) sẽ bị loại bỏ.
+    """
+
+    def __init__(self, db_path: str, model_name: str, max_entries: int = 200_000):
+        self.db_path = db_path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "content_hash TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        self._invalidate_if_model_changed()
+        self._conn.commit()
+
+    def _invalidate_if_model_changed(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'model_name'").fetchone()
+        if row and row[0] == self.model_name:
+            return
+        if row:
+            logger.info(f"Mô hình embedding đã đổi ({row[0]} -> {self.model_name}), xóa cache embedding.")
+        self._conn.execute("DELETE FROM embeddings")
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('model_name', ?)", (self.model_name,))
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+    def content_hash(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{self.normalize(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Trả về embedding cho từng text, None nếu chưa có trong cache."""
+        hashes = [self.content_hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE content_hash IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE content_hash = ?", [(now, h) for h in found])
+                self._conn.commit()
+            self.hits += sum(1 for h in hashes if h in found)
+            self.misses += sum(1 for h in hashes if h not in found)
+        return [np.frombuffer(found[h], dtype=np.float32) if h in found else None for h in hashes]
+
+    def put_many(self, texts: List[str], embeddings: List[Any]):
+        now = time.time()
+        rows = [
+            (self.content_hash(text), np.asarray(embedding, dtype=np.float32).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (content_hash, vector, last_access) VALUES (?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE content_hash IN "
+                "(SELECT content_hash FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return {"entries": count, "hits": self.hits, "misses": self.misses}
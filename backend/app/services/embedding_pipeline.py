@@ -0,0 +1,122 @@
+# backend/app/services/embedding_pipeline.py
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from .embedding_cache import EmbeddingCache
+
+# (chunk_id, nội dung, metadata) của một chunk đã được tách
+ChunkRecord = Tuple[str, str, Dict[str, Any]]
+WriteBatchFn = Callable[[List[str], List[str], List[Dict[str, Any]], List[Any]], None]
+
+@dataclass
+class EmbeddingStats:
+    """Thống kê một lần chạy pipeline embedding cho một tài liệu."""
+    chunks: int = 0
+    batches: int = 0
+    elapsed_seconds: float = 0.0
+    parse_seconds: float = 0.0 # Thời gian chờ nguồn records (đọc file + tách chunk)
+    embed_seconds: float = 0.0 # Tổng thời gian embedding của các batch (chạy song song)
+    write_seconds: float = 0.0 # Thời gian ghi vào các store
+    cache_hits: int = 0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+class EmbeddingPipeline:
+    """
+    Giai đoạn embedding tường minh cho quá trình nạp tài liệu.
+    Các chunk được gom thành batch có kích thước cấu hình được và embedding trên
+    một thread pool, trong khi luồng gọi tiếp tục tách chunk và ghi các batch
+    đã xong vào vector store. Nhờ vậy parse, embed và ghi chạy chồng lên nhau.
+    Nếu có cache, chỉ những chunk chưa từng được embedding mới được đưa qua mô hình.
+    """
+
+    def __init__(
+        self,
+        embedding_function: Callable[[List[str]], List[Any]],
+        batch_size: int = 32,
+        num_workers: int = 2,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.embedding_function = embedding_function
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.num_workers = max(1, num_workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="embedding")
+
+    def _embed(self, contents: List[str]) -> Tuple[List[Any], float, int]:
+        start = time.perf_counter()
+        if self.cache is None:
+            return self.embedding_function(contents), time.perf_counter() - start, 0
+
+        embeddings = self.cache.get_many(contents)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            missing_contents = [contents[i] for i in missing]
+            computed = self.embedding_function(missing_contents)
+            self.cache.put_many(missing_contents, computed)
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+        return embeddings, time.perf_counter() - start, len(contents) - len(missing)
+
+    def _batches(self, records: Iterable[ChunkRecord], stats: EmbeddingStats) -> Iterable[List[ChunkRecord]]:
+        batch: List[ChunkRecord] = []
+        iterator = iter(records)
+        while True:
+            parse_start = time.perf_counter()
+            record = next(iterator, None)
+            stats.parse_seconds += time.perf_counter() - parse_start
+            if record is None:
+                break
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(
+        self,
+        records: Iterable[ChunkRecord],
+        write_batch: WriteBatchFn,
+        progress_callback: Optional[Callable[[int], None]] = None,
+    ) -> EmbeddingStats:
+        """
+        Embedding và ghi toàn bộ records theo đúng thứ tự.
+        Số batch đang chờ được giới hạn (2 x số worker) để bộ nhớ không tăng theo kích thước file.
+        """
+        stats = EmbeddingStats()
+        start = time.perf_counter()
+        max_in_flight = self.num_workers * 2
+        in_flight = deque()
+
+        def drain_one():
+            batch, future = in_flight.popleft()
+            embeddings, embed_seconds, cache_hits = future.result()
+            ids, contents, metadatas = (list(column) for column in zip(*batch))
+            write_start = time.perf_counter()
+            write_batch(ids, contents, metadatas, embeddings)
+            stats.write_seconds += time.perf_counter() - write_start
+            stats.chunks += len(batch)
+            stats.batches += 1
+            stats.embed_seconds += embed_seconds
+            stats.cache_hits += cache_hits
+            if progress_callback:
+                progress_callback(stats.chunks)
+
+        try:
+            for batch in self._batches(records, stats):
+                in_flight.append((batch, self.executor.submit(self._embed, [content for _, content, _ in batch])))
+                if len(in_flight) >= max_in_flight:
+                    drain_one()
+            while in_flight:
+                drain_one()
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+
+        stats.elapsed_seconds = time.perf_counter() - start
+        return stats
@@ -0,0 +1,71 @@
+# backend/app/services/fusion.py
+from typing import Dict, List, Tuple
+
+# Kết quả của một bộ truy hồi: danh sách (chunk_id, điểm) đã sắp xếp giảm dần theo độ liên quan
+RankedList = List[Tuple[str, float]]
+
+def normalize_scores(ranked: RankedList, method: str) -> RankedList:
+    """Chuẩn hóa điểm của một bộ truy hồi để các bộ khác nhau so sánh được với nhau."""
+    if not ranked or method == "none":
+        return ranked
+    scores = [score for _, score in ranked]
+    if method == "minmax":
+        low, high = min(scores), max(scores)
+        if high == low:
+            return [(chunk_id, 1.0) for chunk_id, _ in ranked]
+        return [(chunk_id, (score - low) / (high - low)) for chunk_id, score in ranked]
+    if method == "max":
+        high = max(scores) or 1.0
+        return [(chunk_id, score / high) for chunk_id, score in ranked]
+    raise ValueError(f"Phương pháp chuẩn hóa không được hỗ trợ: {method}")
+
+class FusionStrategy:
+    """Giai đoạn hợp nhất kết quả của nhiều bộ truy hồi thành một thứ hạng duy nhất."""
+
+    def __init__(self, weights: Dict[str, float]):
+        self.weights = weights
+
+    def fuse(self, results: Dict[str, RankedList]) -> RankedList:
+        raise NotImplementedError
+
+    @staticmethod
+    def _sorted(scores: Dict[str, float]) -> RankedList:
+        # sorted ổn định: khi bằng điểm, chunk xuất hiện trước (theo thứ tự bộ truy hồi) đứng trước
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+class ReciprocalRankFusion(FusionStrategy):
+    """RRF: điểm = tổng weight / (rank + k) trên các bộ truy hồi, chỉ dựa vào thứ hạng."""
+
+    def __init__(self, weights: Dict[str, float], k: float = 60):
+        super().__init__(weights)
+        self.k = k
+
+    def fuse(self, results: Dict[str, RankedList]) -> RankedList:
+        scores: Dict[str, float] = {}
+        for retriever, ranked in results.items():
+            weight = self.weights.get(retriever, 1.0)
+            for rank, (chunk_id, _) in enumerate(ranked):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + weight / (rank + self.k)
+        return self._sorted(scores)
+
+class WeightedScoreFusion(FusionStrategy):
+    """Cộng có trọng số các điểm đã chuẩn hóa của từng bộ truy hồi."""
+
+    def __init__(self, weights: Dict[str, float], normalization: str = "minmax"):
+        super().__init__(weights)
+        self.normalization = normalization
+
+    def fuse(self, results: Dict[str, RankedList]) -> RankedList:
+        scores: Dict[str, float] = {}
+        for retriever, ranked in results.items():
+            weight = self.weights.get(retriever, 1.0)
+            for chunk_id, score in normalize_scores(ranked, self.normalization):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + weight * score
+        return self._sorted(scores)
+
+def create_fusion_strategy(method: str, weights: Dict[str, float], rrf_k: float = 60, normalization: str = "minmax") -> FusionStrategy:
+    if method == "rrf":
+        return ReciprocalRankFusion(weights, k=rrf_k)
+    if method == "weighted":
+        return WeightedScoreFusion(weights, normalization=normalization)
+    raise ValueError(f"Phương pháp hợp nhất không được hỗ trợ: {method}")
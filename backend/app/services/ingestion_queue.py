@@ -0,0 +1,208 @@
+# backend/app/services/ingestion_queue.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Any
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# processor(file_path, document_id, progress_callback) với progress_callback(stage, processed_chunks)
+ProgressCallback = Callable[[str, int], None]
+Processor = Callable[[str, str, ProgressCallback], None]
+
+class IngestionQueue:
+    """
+    Hàng đợi nạp tài liệu bền vững, lưu trên SQLite.
+    Mỗi tài liệu tải lên là một job; một số lượng worker cố định lấy job ra xử lý,
+    có thử lại khi lỗi và ghi lại tiến độ theo từng giai đoạn (parse/embed/index).
+    Các job đang chạy dở khi server dừng sẽ được đưa lại vào hàng đợi ở lần khởi động sau.
+    Sử dụng mẫu Singleton để đảm bảo chỉ có một instance được tạo ra.
+    """
+    _instance = None
+
+    def __new__(cls, db_path: str, num_workers: int = 1, max_attempts: int = 3, retry_delay_seconds: float = 5.0):
+        if cls._instance is None:
+            cls._instance = super(IngestionQueue, cls).__new__(cls)
+            cls._instance._init_queue(db_path, num_workers, max_attempts, retry_delay_seconds)
+        return cls._instance
+
+    def _init_queue(self, db_path: str, num_workers: int, max_attempts: int, retry_delay_seconds: float):
+        logger.info("Đang khởi tạo IngestionQueue...")
+        self.num_workers = max(1, num_workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay_seconds = retry_delay_seconds
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = False
+        self._workers: List[threading.Thread] = []
+        self._processor: Optional[Processor] = None
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "document_id TEXT PRIMARY KEY, file_path TEXT NOT NULL, status TEXT NOT NULL, stage TEXT, "
+            "processed_chunks INTEGER NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, available_at REAL NOT NULL, finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, available_at)")
+        # Job đang chạy khi tiến trình bị dừng đột ngột sẽ được xếp lại hàng đợi
+        requeued = self._conn.execute(
+            "UPDATE jobs SET status = 'queued', stage = NULL, processed_chunks = 0 WHERE status = 'running'"
+        ).rowcount
+        self._conn.commit()
+        if requeued:
+            logger.info(f"Đã xếp lại {requeued} job nạp tài liệu bị gián đoạn.")
+        logger.info("IngestionQueue đã sẵn sàng.")
+
+    # --- Điều khiển worker ---
+    def start(self, processor: Processor):
+        """Khởi động các worker (gọi một lần khi ứng dụng khởi động)."""
+        with self._lock:
+            if self._workers:
+                return
+            self._processor = processor
+            self._stopping = False
+            for i in range(self.num_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"ingestion-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        logger.info(f"Đã khởi động {self.num_workers} worker nạp tài liệu.")
+
+    def stop(self, timeout: float = 5.0):
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+        self._workers = []
+
+    # --- Job ---
+    def enqueue(self, document_id: str, file_path: str):
+        with self._wakeup:
+            self._insert_job(document_id, file_path)
+
+    def enqueue_if_idle(self, document_id: str, file_path: str, prepare: Optional[Callable[[], None]] = None) -> bool:
+        """
+        Xếp lại job của tài liệu nếu worker không đang xử lý nó. Trả về False (không làm gì) nếu job đang chạy.
+        prepare (ví dụ thay file gốc) được gọi trong cùng lần giữ khóa, trước khi ghi job,
+        nên worker không thể nhận job xen giữa lúc kiểm tra và lúc file bị thay.
+        """
+        with self._wakeup:
+            row = self._conn.execute("SELECT status FROM jobs WHERE document_id = ?", (document_id,)).fetchone()
+            if row is not None and row["status"] == "running":
+                return False
+            if prepare is not None:
+                prepare()
+            self._insert_job(document_id, file_path)
+        return True
+
+    def _insert_job(self, document_id: str, file_path: str):
+        """Ghi (hoặc ghi đè) job ở trạng thái queued và đánh thức một worker; người gọi giữ self._lock."""
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO jobs (document_id, file_path, status, stage, processed_chunks, attempts, "
+            "error, created_at, updated_at, available_at, finished_at) "
+            "VALUES (?, ?, 'queued', NULL, 0, 0, NULL, ?, ?, ?, NULL)",
+            (document_id, file_path, now, now, now),
+        )
+        self._conn.commit()
+        self._wakeup.notify()
+
+    def get_status(self, document_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE document_id = ?", (document_id,)).fetchone()
+        return dict(row) if row else None
+
+    def remove(self, document_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE document_id = ?", (document_id,))
+            self._conn.commit()
+
+    def remove_if_idle(self, document_id: str) -> bool:
+        """
+        Xóa job nếu worker chưa nhận nó. Trả về False (không xóa) nếu job đang chạy;
+        kiểm tra và xóa cùng trong một lần giữ khóa nên worker không thể nhận job xen giữa.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE document_id = ?", (document_id,)).fetchone()
+            if row is not None and row["status"] == "running":
+                return False
+            self._conn.execute("DELETE FROM jobs WHERE document_id = ?", (document_id,))
+            self._conn.commit()
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs")
+            self._conn.commit()
+
+    def _update(self, document_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE document_id = ?", (*fields.values(), document_id))
+            self._conn.commit()
+
+    def _claim_next(self) -> Optional[sqlite3.Row]:
+        """Lấy job sẵn sàng cũ nhất và đánh dấu đang chạy (phải giữ self._lock)."""
+        row = self._conn.execute(
+            "SELECT * FROM jobs WHERE status = 'queued' AND available_at <= ? ORDER BY created_at LIMIT 1",
+            (time.time(),),
+        ).fetchone()
+        if row is None:
+            return None
+        self._conn.execute(
+            "UPDATE jobs SET status = 'running', stage = 'parse', processed_chunks = 0, attempts = attempts + 1, "
+            "updated_at = ? WHERE document_id = ?",
+            (time.time(), row["document_id"]),
+        )
+        self._conn.commit()
+        return row
+
+    def _worker_loop(self):
+        while True:
+            with self._wakeup:
+                job = None
+                while not self._stopping:
+                    job = self._claim_next()
+                    if job is not None:
+                        break
+                    # Chờ job mới, hoặc thức dậy định kỳ để nhặt các job đến hạn thử lại
+                    self._wakeup.wait(timeout=1.0)
+                if self._stopping:
+                    return
+            self._run_job(job)
+
+    def _run_job(self, job: sqlite3.Row):
+        document_id = job["document_id"]
+        attempt = job["attempts"] + 1
+        logger.info(f"Tác vụ nạp: Bắt đầu xử lý tài liệu {document_id} (lần {attempt}/{self.max_attempts})")
+
+        def report_progress(stage: str, processed_chunks: int):
+            self._update(document_id, stage=stage, processed_chunks=processed_chunks)
+
+        try:
+            self._processor(job["file_path"], document_id, report_progress)
+            self._update(document_id, status="completed", stage=None, error=None, finished_at=time.time())
+            logger.info(f"Tác vụ nạp: Hoàn tất xử lý tài liệu {document_id}")
+        except Exception as e:
+            logger.error(f"Tác vụ nạp: Lỗi khi xử lý tài liệu {document_id}: {e}")
+            if attempt < self.max_attempts:
+                delay = self.retry_delay_seconds * attempt
+                self._update(document_id, status="queued", error=str(e), available_at=time.time() + delay)
+            else:
+                self._update(document_id, status="failed", error=str(e), finished_at=time.time())
+
+def get_ingestion_queue() -> IngestionQueue:
+    return IngestionQueue(
+        settings.INGESTION_QUEUE_PATH,
+        num_workers=settings.INGESTION_WORKERS,
+        max_attempts=settings.INGESTION_MAX_ATTEMPTS,
+        retry_delay_seconds=settings.INGESTION_RETRY_DELAY_SECONDS,
+    )
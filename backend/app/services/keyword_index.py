@@ -0,0 +1,331 @@
+# backend/app/services/keyword_index.py
+import logging
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .bm25_matrix import BM25Matrix, MatrixDelta
+
+logger = logging.getLogger(__name__)
+
+# Dọn postings của các chunk đã xóa khi phần chết vượt phần sống (và tối thiểu ngần này)
+MIN_DEAD_POSTINGS_FOR_COMPACTION = 4096
+# Ma trận BM25 được dựng lại ở nền sau lần ghi cuối ngần này giây (gom các batch nạp liên tiếp)
+MATRIX_REBUILD_DELAY_SECONDS = 0.5
+# Số term được sao chép postings trong mỗi lần giữ khóa khi chụp ma trận
+CAPTURE_BATCH_TERMS = 65536
+
+class TermDictionary:
+    """Ánh xạ hai chiều chuỗi <-> id số nguyên; mỗi chuỗi chỉ được lưu một lần."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.terms: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def get(self, term: str) -> Optional[int]:
+        return self.ids.get(term)
+
+    def get_or_add(self, term: str) -> int:
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.ids[term] = term_id
+            self.terms.append(term)
+        return term_id
+
+class KeywordIndex:
+    """
+    Chỉ mục đảo (inverted index) cho tìm kiếm từ khóa BM25.
+    Được giữ trong bộ nhớ và cập nhật tăng dần khi thêm/xóa chunk, nên khi
+    truy vấn chỉ cần duyệt postings của các từ có trong câu hỏi thay vì
+    dựng lại BM25 trên toàn bộ kho dữ liệu.
+    Dữ liệu được lưu gọn: term và chunk được đánh số nguyên, postings của mỗi term
+    là một array('I') xen kẽ (slot của chunk, tf). Chunk bị xóa chỉ được đánh dấu,
+    postings được dọn lại khi phần chết vượt quá phần còn sống.
+    Việc chấm điểm dùng BM25Matrix (CSR + NumPy). Ma trận được dựng đồng bộ ở lần truy vấn
+    đầu tiên; sau đó mỗi lần ghi chỉ ghi lại delta (MatrixDelta) và truy vấn dùng ma trận cũ
+    cộng delta, trong khi ma trận mới được dựng ở nền (ngoài khóa, trừ các lần sao chép
+    postings ngắn theo batch) rồi thay thế nguyên tử.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, rebuild_delay_seconds: float = MATRIX_REBUILD_DELAY_SECONDS):
+        self.k1 = k1
+        self.b = b
+        self.rebuild_delay_seconds = rebuild_delay_seconds
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock() # Mỗi lúc chỉ dựng một ma trận
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self._rebuild_requested = False
+        self._reset()
+
+    def _reset(self):
+        self.term_dictionary = TermDictionary()
+        self.postings: List[array] = []
+        self.doc_freqs = array('I')
+        # Thông tin theo slot của chunk (slot của chunk đã xóa có chunk_id là None)
+        self.slot_chunk_ids: List[Optional[str]] = []
+        self.slot_lengths = array('I')
+        self.slot_documents = array('I')
+        self.slot_terms: List[Optional[array]] = []
+        self.chunk_slots: Dict[str, int] = {}
+        self.document_ids = TermDictionary()
+        self.document_chunks: Dict[str, set] = {}
+        self.document_lengths: Dict[str, int] = {}
+        self.total_length = 0
+        self.live_postings = 0
+        self.dead_postings = 0
+        # Ma trận đang phục vụ truy vấn và delta so với nó; delta của ma trận đang được dựng
+        self._matrix: Optional[BM25Matrix] = None
+        self._delta = MatrixDelta()
+        self._pending_delta: Optional[MatrixDelta] = None
+
+    def __len__(self) -> int:
+        return len(self.chunk_slots)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self.chunk_slots
+
+    def add_chunk(self, chunk_id: str, document_id: str, tokens: List[str]):
+        """Thêm (hoặc thay thế) một chunk vào chỉ mục."""
+        self.add_chunk_counts(chunk_id, document_id, Counter(tokens))
+
+    def add_chunk_counts(self, chunk_id: str, document_id: str, term_freqs: Mapping[str, int]):
+        """Như add_chunk nhưng nhận sẵn {term: tf} (dạng được lưu trong kho từ khóa)."""
+        with self._lock:
+            self._add_chunk_counts(chunk_id, document_id, term_freqs)
+
+    def _add_chunk_counts(self, chunk_id: str, document_id: str, term_freqs: Mapping[str, int]):
+        if chunk_id in self.chunk_slots:
+            self._remove_chunk(chunk_id)
+
+        slot = len(self.slot_chunk_ids)
+        term_ids = array('I')
+        length = 0
+        for term, tf in term_freqs.items():
+            term_id = self.term_dictionary.get_or_add(term)
+            if term_id == len(self.postings):
+                self.postings.append(array('I'))
+                self.doc_freqs.append(0)
+            postings = self.postings[term_id]
+            postings.append(slot)
+            postings.append(tf)
+            self.doc_freqs[term_id] += 1
+            term_ids.append(term_id)
+            length += tf
+
+        self.slot_chunk_ids.append(chunk_id)
+        self.slot_lengths.append(length)
+        self.slot_documents.append(self.document_ids.get_or_add(document_id))
+        self.slot_terms.append(term_ids)
+        self.chunk_slots[chunk_id] = slot
+        self.document_chunks.setdefault(document_id, set()).add(chunk_id)
+        self.document_lengths[document_id] = self.document_lengths.get(document_id, 0) + length
+        self.total_length += length
+        self.live_postings += len(term_ids)
+        for delta in self._active_deltas():
+            delta.record_add(chunk_id, document_id, term_freqs, length)
+        self._schedule_rebuild()
+
+    def remove_chunk(self, chunk_id: str) -> bool:
+        """Xóa một chunk khỏi chỉ mục. Trả về False nếu chunk không tồn tại."""
+        with self._lock:
+            return self._remove_chunk(chunk_id)
+
+    def _remove_chunk(self, chunk_id: str) -> bool:
+        slot = self.chunk_slots.pop(chunk_id, None)
+        if slot is None:
+            return False
+
+        for delta in self._active_deltas():
+            delta.record_remove(chunk_id)
+        self._schedule_rebuild()
+        term_ids = self.slot_terms[slot]
+        for term_id in term_ids:
+            self.doc_freqs[term_id] -= 1
+        self.live_postings -= len(term_ids)
+        self.dead_postings += len(term_ids)
+
+        document_id = self.document_ids.terms[self.slot_documents[slot]]
+        length = self.slot_lengths[slot]
+        self.slot_chunk_ids[slot] = None
+        self.slot_terms[slot] = None
+        self.slot_lengths[slot] = 0
+        self.total_length -= length
+        self.document_lengths[document_id] -= length
+        self.document_chunks[document_id].discard(chunk_id)
+        if not self.document_chunks[document_id]:
+            del self.document_chunks[document_id]
+            del self.document_lengths[document_id]
+
+        if self.dead_postings > max(self.live_postings, MIN_DEAD_POSTINGS_FOR_COMPACTION):
+            self._compact()
+        return True
+
+    def remove_document(self, document_id: str) -> List[str]:
+        """Xóa toàn bộ chunk của một tài liệu, trả về danh sách chunk_id đã xóa."""
+        with self._lock:
+            chunk_ids = list(self.document_chunks.get(document_id, ()))
+            for chunk_id in chunk_ids:
+                self._remove_chunk(chunk_id)
+        return chunk_ids
+
+    def get_document_chunk_ids(self, document_id: str) -> List[str]:
+        # Worker nạp tài liệu sửa document_chunks trong lúc các luồng request đọc: sao chép dưới khóa
+        with self._lock:
+            return list(self.document_chunks.get(document_id, ()))
+
+    def compact(self):
+        """Đánh số lại slot/term, bỏ postings của chunk đã xóa và các term không còn dùng."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        # Delta tính theo chunk_id nên ma trận hiện tại vẫn dùng được; lần chụp đang dở sẽ tự làm lại
+        live_slots = [slot for slot, chunk_id in enumerate(self.slot_chunk_ids) if chunk_id is not None]
+        new_slots = array('i', [-1]) * len(self.slot_chunk_ids)
+        for new_slot, slot in enumerate(live_slots):
+            new_slots[slot] = new_slot
+
+        term_dictionary = TermDictionary()
+        new_term_ids = array('i', [-1]) * len(self.postings)
+        postings: List[array] = []
+        for term_id, term in enumerate(self.term_dictionary.terms):
+            if not self.doc_freqs[term_id]:
+                continue
+            new_term_ids[term_id] = term_dictionary.get_or_add(term)
+            old_postings = self.postings[term_id]
+            compacted = array('I')
+            for i in range(0, len(old_postings), 2):
+                new_slot = new_slots[old_postings[i]]
+                if new_slot >= 0:
+                    compacted.append(new_slot)
+                    compacted.append(old_postings[i + 1])
+            postings.append(compacted)
+
+        self.term_dictionary = term_dictionary
+        self.postings = postings
+        self.doc_freqs = array('I', (len(p) // 2 for p in postings))
+        self.slot_terms = [array('I', (new_term_ids[term_id] for term_id in self.slot_terms[slot])) for slot in live_slots]
+        self.slot_chunk_ids = [self.slot_chunk_ids[slot] for slot in live_slots]
+        self.slot_lengths = array('I', (self.slot_lengths[slot] for slot in live_slots))
+        self.slot_documents = array('I', (self.slot_documents[slot] for slot in live_slots))
+        self.chunk_slots = {chunk_id: slot for slot, chunk_id in enumerate(self.slot_chunk_ids)}
+        self.dead_postings = 0
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    # --- MA TRẬN BM25 ---
+    def _active_deltas(self) -> List[MatrixDelta]:
+        if self._matrix is None:
+            return [self._pending_delta] if self._pending_delta is not None else []
+        return [self._delta] if self._pending_delta is None else [self._delta, self._pending_delta]
+
+    def _schedule_rebuild(self):
+        """Yêu cầu dựng lại ma trận ở nền (gọi khi đang giữ khóa). Chưa có ma trận thì để truy vấn đầu tiên dựng."""
+        if self._matrix is None:
+            return
+        self._rebuild_requested = True
+        if self._rebuild_thread is None:
+            self._rebuild_thread = threading.Thread(target=self._rebuild_loop, name="bm25-rebuild", daemon=True)
+            self._rebuild_thread.start()
+
+    def _rebuild_loop(self):
+        while True:
+            time.sleep(self.rebuild_delay_seconds)
+            with self._lock:
+                if not self._rebuild_requested:
+                    self._rebuild_thread = None
+                    return
+                self._rebuild_requested = False
+            try:
+                self.rebuild_matrix()
+            except Exception:
+                logger.exception("Lỗi khi dựng lại ma trận BM25 ở nền.")
+
+    def _capture_matrix(self) -> Optional[BM25Matrix]:
+        """
+        Chụp trạng thái hiện tại thành BM25Matrix mới và thay cho ma trận đang dùng.
+        Chỉ giữ khóa khi sao chép (theo batch term), phần tính toán chạy ngoài khóa.
+        Trả về None nếu chỉ mục bị compaction/xóa sạch giữa chừng (người gọi chụp lại).
+        """
+        start = time.perf_counter()
+        with self._lock:
+            postings = self.postings
+            num_terms = len(postings)
+            slot_chunk_ids = list(self.slot_chunk_ids)
+            slot_lengths, slot_documents = self.slot_lengths[:], self.slot_documents[:]
+            document_numbers = dict(self.document_ids.ids)
+            delta = self._pending_delta = MatrixDelta()
+        terms, counts, parts = [], [], []
+        for batch_start in range(0, num_terms, CAPTURE_BATCH_TERMS):
+            with self._lock:
+                # Postings chỉ được nối thêm ở cuối (slot mới bị BM25Matrix bỏ qua); compaction/clear thì thay cả danh sách
+                if self.postings is not postings:
+                    if self._pending_delta is delta:
+                        self._pending_delta = None
+                    return None
+                batch = postings[batch_start:min(batch_start + CAPTURE_BATCH_TERMS, num_terms)]
+                counts.append(np.fromiter(map(len, batch), dtype=np.int64, count=len(batch)))
+                parts.append(b"".join(batch))
+                terms.extend(self.term_dictionary.terms[batch_start:batch_start + len(batch)])
+        matrix = BM25Matrix(
+            self.k1, self.b, slot_chunk_ids, slot_lengths, slot_documents, document_numbers, terms,
+            np.concatenate(counts) if counts else np.zeros(0, dtype=np.int64), b"".join(parts),
+        )
+        with self._lock:
+            if self._pending_delta is not delta:
+                return None
+            self._matrix, self._delta, self._pending_delta = matrix, delta, None
+            if len(delta):
+                self._schedule_rebuild() # Có ghi trong lúc dựng lần đầu
+        logger.debug(
+            "Đã dựng ma trận BM25 (%d chunks, %d postings, %.0f ms).",
+            matrix.num_chunks, len(matrix.slots), (time.perf_counter() - start) * 1000,
+        )
+        return matrix
+
+    def rebuild_matrix(self) -> BM25Matrix:
+        """Dựng ngay ma trận của trạng thái hiện tại (không chặn ghi/truy vấn trong lúc tính toán)."""
+        with self._build_lock:
+            while True:
+                matrix = self._capture_matrix()
+                if matrix is not None:
+                    return matrix
+
+    def matrix(self) -> BM25Matrix:
+        """Ma trận đang phục vụ truy vấn (có thể cũ hơn chỉ mục, phần chênh nằm trong delta); chưa có thì dựng ngay."""
+        with self._lock:
+            matrix = self._matrix
+        return matrix if matrix is not None else self.rebuild_matrix()
+
+    @property
+    def pending_changes(self) -> int:
+        """Số chunk thêm/xóa chưa có trong ma trận đang dùng."""
+        with self._lock:
+            return len(self._delta) if self._matrix is not None else len(self.chunk_slots)
+
+    def search(self, tokens: List[str], k: int, document_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Trả về top-k (chunk_id, score) theo BM25.
+        Khi có document_ids, thống kê (N, avgdl, df) được tính trên riêng các tài liệu đó,
+        tương đương với việc dựng BM25 trên tập chunk đã lọc như trước đây.
+        """
+        if k <= 0 or not tokens:
+            return []
+        while True:
+            with self._lock:
+                matrix = self._matrix
+                if matrix is not None:
+                    removed, added = self._delta.copy()
+                    break
+            self.rebuild_matrix()
+        return matrix.search(Counter(tokens), k, document_ids, removed, added)
@@ -0,0 +1,247 @@
+# backend/app/services/keyword_store.py
+import logging
+import json
+import mmap
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "MANIFEST.json"
+# 2: bản ghi chỉ còn {term: tf} và metadata, nội dung chunk nằm trong ChunkContentStore
+STORE_FORMAT_VERSION = 2
+# Khóa trong manifest đánh dấu việc chuyển keyword_index.json đang dở
+JSON_MIGRATION_KEY = "json_migration"
+
+class KeywordSegmentStore:
+    """
+    Lưu trữ chỉ mục từ khóa theo kiểu log-structured trên đĩa.
+    - Mỗi lần ghi chỉ nối thêm (append) bản ghi mới vào segment đang hoạt động,
+      nên chi phí tỉ lệ với số chunk mới thay vì toàn bộ kho dữ liệu.
+    - Xóa được ghi bằng tombstone, dữ liệu cũ được dọn bởi compaction chạy nền.
+    - Danh sách segment nằm trong MANIFEST.json và luôn được thay thế nguyên tử
+      (ghi file tạm rồi os.replace), nên sự cố giữa chừng không làm hỏng kho.
+    """
+
+    def __init__(self, store_path: str, segment_max_bytes: int = 8 * 1024 * 1024, compaction_min_segments: int = 4):
+        self.store_path = store_path
+        self.manifest_path = os.path.join(store_path, MANIFEST_NAME)
+        self.segment_max_bytes = segment_max_bytes
+        self.compaction_min_segments = compaction_min_segments
+        self._lock = threading.RLock()
+        self._compaction_thread: Optional[threading.Thread] = None
+        os.makedirs(store_path, exist_ok=True)
+        self._manifest = self._read_manifest()
+        self._repair_active_segment()
+
+    # --- Manifest ---
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def _read_manifest(self) -> dict:
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {"version": STORE_FORMAT_VERSION, "segments": [], "next_segment_id": 1}
+
+    def _write_manifest(self, manifest: dict):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+        self._manifest = manifest
+
+    @property
+    def tokenizer_version(self) -> Optional[str]:
+        """Phiên bản bộ tách từ đã tạo ra các token đang lưu (None với kho tạo trước khi có thông tin này)."""
+        return self._manifest.get("tokenizer")
+
+    def set_tokenizer_version(self, version: str):
+        with self._lock:
+            self._write_manifest(dict(self._manifest, tokenizer=version))
+
+    def _repair_active_segment(self):
+        """Cắt bỏ bản ghi ghi dở ở cuối segment đang hoạt động (do sự cố khi đang ghi)."""
+        if not self._manifest["segments"]:
+            return
+        path = self._segment_path(self._manifest["segments"][-1])
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, 'rb+') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[-1:] == b"\n":
+                return
+            valid_size = mm.rfind(b"\n") + 1
+            logger.warning(f"Phát hiện bản ghi ghi dở trong {os.path.basename(path)}, đang cắt bỏ.")
+            mm.close()
+            f.truncate(valid_size)
+
+    def _new_segment_name(self, manifest: dict) -> str:
+        segment_id = manifest["next_segment_id"]
+        manifest["next_segment_id"] = segment_id + 1
+        return f"segment-{segment_id:08d}.jsonl"
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.store_path, name)
+
+    # --- Đọc ---
+    def _iter_segment(self, name: str) -> Iterator[dict]:
+        """Đọc từng bản ghi trong segment qua mmap, bỏ qua dòng cuối bị ghi dở."""
+        path = self._segment_path(name)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b""):
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Bỏ qua bản ghi hỏng trong segment {name}.")
+
+    @staticmethod
+    def _apply(records: Dict[str, dict], entries: Iterable[dict]):
+        for entry in entries:
+            op = entry.get("op")
+            if op == "del":
+                records.pop(entry["id"], None)
+            elif op == "patch":
+                record = records.get(entry["id"])
+                if record is not None:
+                    record.update(entry["data"])
+            else:
+                records[entry["id"]] = entry["data"]
+
+    def load(self) -> Dict[str, dict]:
+        """Dựng lại trạng thái {chunk_id: data} bằng cách phát lại các segment theo thứ tự."""
+        records: Dict[str, dict] = {}
+        with self._lock:
+            segments = list(self._manifest["segments"])
+        for name in segments:
+            self._apply(records, self._iter_segment(name))
+        return records
+
+    # --- Ghi ---
+    def _append_entries(self, entries: List[dict]):
+        if not entries:
+            return
+        payload = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode('utf-8')
+        with self._lock:
+            manifest = dict(self._manifest, segments=list(self._manifest["segments"]))
+            active = manifest["segments"][-1] if manifest["segments"] else None
+            if active is None or os.path.getsize(self._segment_path(active)) >= self.segment_max_bytes:
+                # Tạo file segment trước rồi mới công bố nó trong manifest
+                active = self._new_segment_name(manifest)
+                open(self._segment_path(active), 'ab').close()
+                manifest["segments"].append(active)
+                self._write_manifest(manifest)
+            with open(self._segment_path(active), 'ab') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+        self._maybe_schedule_compaction()
+
+    def put_many(self, records: Dict[str, dict]):
+        self._append_entries([{"op": "put", "id": chunk_id, "data": data} for chunk_id, data in records.items()])
+
+    def patch_many(self, patches: Dict[str, dict]):
+        """Cập nhật một phần bản ghi (ví dụ chỉ metadata) mà không phải ghi lại toàn bộ."""
+        self._append_entries([{"op": "patch", "id": chunk_id, "data": data} for chunk_id, data in patches.items()])
+
+    def delete_many(self, chunk_ids: Iterable[str]):
+        self._append_entries([{"op": "del", "id": chunk_id} for chunk_id in chunk_ids])
+
+    def clear(self):
+        self.wait_for_compaction()
+        with self._lock:
+            old_segments = self._manifest["segments"]
+            self._write_manifest(dict(self._manifest, version=STORE_FORMAT_VERSION, segments=[]))
+            self._remove_segments(old_segments)
+
+    def _remove_segments(self, names: Iterable[str]):
+        for name in names:
+            try:
+                os.remove(self._segment_path(name))
+            except OSError as e:
+                logger.error(f"Lỗi khi xóa segment {name}: {e}")
+
+    # --- Compaction ---
+    def _maybe_schedule_compaction(self):
+        with self._lock:
+            sealed = len(self._manifest["segments"]) - 1
+            running = self._compaction_thread is not None and self._compaction_thread.is_alive()
+            if sealed < self.compaction_min_segments or running:
+                return
+            self._compaction_thread = threading.Thread(target=self.compact, name="keyword-store-compaction", daemon=True)
+            self._compaction_thread.start()
+
+    def wait_for_compaction(self):
+        thread = self._compaction_thread
+        if thread is not None and thread.is_alive():
+            thread.join()
+
+    def compact(self):
+        """
+        Gộp các segment đã đóng (mọi segment trừ segment đang ghi) thành một segment
+        chỉ chứa bản ghi còn sống. Segment đang ghi không bị động tới nên việc ghi
+        mới vẫn tiếp tục trong lúc compaction chạy.
+        """
+        with self._lock:
+            sealed = list(self._manifest["segments"][:-1])
+            if len(sealed) < 2:
+                return
+            manifest = dict(self._manifest, segments=list(self._manifest["segments"]))
+            compacted_name = self._new_segment_name(manifest)
+            # Giữ chỗ id segment ngay để lần ghi tiếp theo không dùng trùng tên
+            self._write_manifest(dict(self._manifest, next_segment_id=manifest["next_segment_id"]))
+
+        try:
+            live: Dict[str, dict] = {}
+            for name in sealed:
+                self._apply(live, self._iter_segment(name))
+            tmp_path = self._segment_path(compacted_name + ".tmp")
+            with open(tmp_path, 'wb') as f:
+                for chunk_id, data in live.items():
+                    f.write((json.dumps({"op": "put", "id": chunk_id, "data": data}, ensure_ascii=False) + "\n").encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._segment_path(compacted_name))
+        except OSError as e:
+            logger.error(f"Lỗi khi compaction kho từ khóa: {e}")
+            return
+
+        with self._lock:
+            current = self._manifest["segments"]
+            if current[:len(sealed)] != sealed:
+                # Kho đã bị xóa/thay đổi trong lúc compaction, bỏ kết quả
+                self._remove_segments([compacted_name])
+                return
+            self._write_manifest(dict(self._manifest, segments=[compacted_name] + current[len(sealed):]))
+        self._remove_segments(sealed)
+        logger.info(f"Đã compaction {len(sealed)} segment thành {compacted_name} ({len(live)} bản ghi).")
+
+    # --- Chuyển đổi dữ liệu cũ ---
+    def migrate_from_json(self, json_path: str) -> Tuple[bool, int]:
+        """
+        Chuyển keyword_index.json (định dạng cũ) sang kho segment ở lần khởi động đầu tiên.
+        Manifest được đánh dấu đang chuyển trước khi ghi dữ liệu và chỉ bỏ dấu sau khi dữ liệu
+        đã fsync; nếu tiến trình dừng giữa chừng, lần khởi động sau xóa phần đã ghi và chuyển lại.
+        """
+        if not os.path.exists(json_path):
+            return False, 0
+        if self._manifest.get(JSON_MIGRATION_KEY) == "pending":
+            logger.warning("Lần chuyển keyword_index.json trước bị dừng giữa chừng, đang chuyển lại từ đầu.")
+            self.clear()
+        elif self.exists():
+            return False, 0
+        else:
+            self._write_manifest(dict(self._manifest, **{JSON_MIGRATION_KEY: "pending"}))
+        with open(json_path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        self.put_many(records)
+        with self._lock:
+            manifest = dict(self._manifest)
+            manifest.pop(JSON_MIGRATION_KEY, None)
+            self._write_manifest(manifest)
+        os.replace(json_path, json_path + ".migrated")
+        return True, len(records)
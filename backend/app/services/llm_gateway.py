@@ -0,0 +1,259 @@
+# backend/app/services/llm_gateway.py
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+from ..core.telemetry import (
+    LLM_COALESCED, LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT_SECONDS, LLM_REQUESTS, LLM_RETRIES, record_stage, span,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Lỗi tạm thời đáng thử lại: mất kết nối/timeout, Ollama quá tải (429) hoặc lỗi máy chủ (5xx)
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+class LLMQueueFull(Exception):
+    """Hàng đợi LLM đã đầy (hoặc chờ quá lâu): API trả về 429 kèm Retry-After."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class _Flight:
+    """Một lời gọi LLM đang chạy và số yêu cầu đang chờ kết quả của nó."""
+
+    def __init__(self, task: "asyncio.Task[str]"):
+        self.task = task
+        self.waiters = 0
+
+class LLMGateway:
+    """
+    Cổng duy nhất để gọi LLM (Ollama qua API tương thích OpenAI):
+    - pool kết nối keep-alive dùng chung, timeout kết nối/đọc cho từng lời gọi;
+    - thử lại có giới hạn với backoff lũy thừa + jitter cho các lỗi tạm thời;
+    - single-flight: các lời gọi không stream giống hệt nhau (model, messages, temperature)
+      đang chạy cùng lúc chỉ tạo một lần sinh, các yêu cầu sau dùng chung kết quả;
+    - hàng đợi có giới hạn: tối đa max_concurrency lời gọi chạy cùng lúc, tối đa max_queue_depth
+      lời gọi chờ; vượt quá (hoặc chờ lâu hơn queue_timeout_seconds) thì ném LLMQueueFull.
+    Gắn với event loop của ứng dụng (mọi phương thức phải gọi từ cùng một loop).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        max_concurrency: int = 2,
+        max_queue_depth: int = 32,
+        queue_timeout_seconds: float = 120.0,
+        max_connections: int = 20,
+        connect_timeout_seconds: float = 5.0,
+        request_timeout_seconds: float = 300.0,
+        max_retries: int = 2,
+        retry_base_delay_seconds: float = 0.5,
+        retry_max_delay_seconds: float = 8.0,
+    ):
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.max_retries = max(0, max_retries)
+        self.retry_base_delay_seconds = retry_base_delay_seconds
+        self.retry_max_delay_seconds = retry_max_delay_seconds
+        # Thử lại do gateway đảm nhận (có jitter và tính cả vào slot), nên tắt cơ chế thử lại của SDK
+        self.client = AsyncOpenAI(
+            base_url=base_url + "/v1",
+            api_key='ollama',
+            max_retries=0,
+            timeout=httpx.Timeout(request_timeout_seconds, connect=connect_timeout_seconds),
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            ),
+        )
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._waiting = 0
+        self._flights: Dict[str, _Flight] = {}
+        # Thời gian giữ slot trung bình (EWMA), dùng để ước lượng Retry-After
+        self._avg_hold_seconds = 1.0
+
+    # --- HÀNG ĐỢI ---
+    @property
+    def saturated(self) -> bool:
+        return self._slots.locked() and self._waiting >= self.max_queue_depth
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._avg_hold_seconds * (self._waiting + 1) / self.max_concurrency))
+
+    def ensure_capacity(self):
+        """
+        Kiểm tra trước khi bắt đầu một response stream (sau khi đã gửi header thì không thể trả 429 nữa).
+        Ném LLMQueueFull nếu hàng đợi đang đầy.
+        """
+        if self.saturated:
+            LLM_REQUESTS.inc(mode="stream", outcome="rejected")
+            raise LLMQueueFull("Mô hình ngôn ngữ đang quá tải, vui lòng thử lại sau.", self._retry_after())
+
+    async def _acquire_slot(self):
+        """
+        Chờ slot tối đa queue_timeout_seconds, ném asyncio.TimeoutError nếu hết giờ.
+        Không dùng asyncio.wait_for: trước Python 3.12 nó có thể hết giờ đúng lúc acquire vừa
+        thành công và làm rò một slot. asyncio.wait không hủy task, còn Semaphore tự trả lại
+        slot nếu task acquire bị hủy sau khi đã được cấp.
+        """
+        acquire = asyncio.ensure_future(self._slots.acquire())
+        try:
+            await asyncio.wait((acquire,), timeout=self.queue_timeout_seconds)
+        finally:
+            acquired = acquire.done()
+            if not acquired:
+                acquire.cancel()
+        if not acquired:
+            raise asyncio.TimeoutError()
+
+    @asynccontextmanager
+    async def _slot(self, mode: str) -> AsyncIterator[None]:
+        if self.saturated:
+            LLM_REQUESTS.inc(mode=mode, outcome="rejected")
+            raise LLMQueueFull("Mô hình ngôn ngữ đang quá tải, vui lòng thử lại sau.", self._retry_after())
+        self._waiting += 1
+        LLM_QUEUE_DEPTH.set(self._waiting)
+        start = time.perf_counter()
+        try:
+            if self._slots.locked():
+                await self._acquire_slot()
+            else:
+                # Còn slot trống: lấy ngay (không qua wait_for) để lời gọi kế tiếp thấy đúng trạng thái hàng đợi
+                await self._slots.acquire()
+        except asyncio.TimeoutError:
+            LLM_REQUESTS.inc(mode=mode, outcome="rejected")
+            raise LLMQueueFull(
+                f"Đã chờ mô hình ngôn ngữ quá {self.queue_timeout_seconds:.0f} giây, vui lòng thử lại sau.", self._retry_after()
+            )
+        finally:
+            self._waiting -= 1
+            LLM_QUEUE_DEPTH.set(self._waiting)
+        waited = time.perf_counter() - start
+        LLM_QUEUE_WAIT_SECONDS.observe(waited, mode=mode)
+        record_stage("llm_queue_wait", waited)
+        LLM_IN_FLIGHT.inc()
+        acquired_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._avg_hold_seconds = 0.8 * self._avg_hold_seconds + 0.2 * (time.perf_counter() - acquired_at)
+            LLM_IN_FLIGHT.dec()
+            self._slots.release()
+
+    # --- THỬ LẠI ---
+    def _backoff_seconds(self, attempt: int) -> float:
+        """Full jitter: ngẫu nhiên trong [0, min(trần, cơ sở * 2^lần thử)] để các yêu cầu lỗi không thử lại cùng lúc."""
+        return random.uniform(0, min(self.retry_max_delay_seconds, self.retry_base_delay_seconds * 2 ** attempt))
+
+    async def _wait_before_retry(self, attempt: int, error: Exception):
+        delay = self._backoff_seconds(attempt)
+        LLM_RETRIES.inc()
+        logger.warning("Lỗi tạm thời khi gọi LLM (%s), thử lại lần %d sau %.2fs.", error, attempt + 1, delay)
+        await asyncio.sleep(delay)
+
+    async def _with_retries(self, call: Callable[[], Awaitable[T]]) -> T:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await call()
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                await self._wait_before_retry(attempt, e)
+
+    def _request_options(self, timeout: Optional[float]) -> Dict[str, Any]:
+        return {"timeout": timeout} if timeout is not None else {}
+
+    # --- GỌI LLM ---
+    def _flight_key(self, messages: List[Dict[str, str]], temperature: float) -> str:
+        payload = json.dumps([self.model, messages, temperature], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def _generate(self, messages: List[Dict[str, str]], temperature: float, timeout: Optional[float]) -> str:
+        async def call() -> str:
+            response = await self.client.chat.completions.create(
+                model=self.model, messages=messages, temperature=temperature, **self._request_options(timeout)
+            )
+            return response.choices[0].message.content
+
+        try:
+            async with self._slot("complete"):
+                with span("llm_total"):
+                    result = await self._with_retries(call)
+        except LLMQueueFull:
+            raise
+        except Exception:
+            LLM_REQUESTS.inc(mode="complete", outcome="error")
+            raise
+        LLM_REQUESTS.inc(mode="complete", outcome="ok")
+        return result
+
+    async def complete(self, messages: List[Dict[str, str]], temperature: float, timeout: Optional[float] = None) -> str:
+        """
+        Sinh câu trả lời (không stream). Các lời gọi giống hệt nhau đang chạy được gộp làm một;
+        lời gọi chung chỉ bị hủy khi mọi yêu cầu đang chờ nó đều đã hủy.
+        """
+        key = self._flight_key(messages, temperature)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(self._generate(messages, temperature, timeout)))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, key=key, flight=flight: self._forget_flight(key, flight))
+        else:
+            LLM_COALESCED.inc()
+            logger.debug("Gộp vào lời gọi LLM giống hệt đang chạy (%s).", key[:12])
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _forget_flight(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def stream(self, messages: List[Dict[str, str]], temperature: float, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Sinh câu trả lời dạng stream, trả về từng đoạn văn bản. Chỉ thử lại khi chưa nhận được
+        token nào (sau đó người dùng đã thấy một phần câu trả lời). Stream không được gộp.
+        """
+        try:
+            async with self._slot("stream"):
+                for attempt in range(self.max_retries + 1):
+                    emitted = False
+                    try:
+                        stream = await self.client.chat.completions.create(
+                            model=self.model, messages=messages, temperature=temperature, stream=True, **self._request_options(timeout)
+                        )
+                        async for chunk in stream:
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                emitted = True
+                                yield delta
+                        break
+                    except RETRYABLE_ERRORS as e:
+                        if emitted or attempt == self.max_retries:
+                            raise
+                        await self._wait_before_retry(attempt, e)
+        except LLMQueueFull:
+            raise
+        except Exception:
+            LLM_REQUESTS.inc(mode="stream", outcome="error")
+            raise
+        LLM_REQUESTS.inc(mode="stream", outcome="ok")
@@ -0,0 +1,116 @@
+# backend/app/services/map_reduce.py
+import logging
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from .token_budget import count_tokens, group_by_token_budget
+
+logger = logging.getLogger(__name__)
+
+# Tăng phiên bản khi đổi prompt tóm tắt trung gian để không dùng lại kết quả cũ
+MAP_PROMPT_VERSION = "v1"
+MAX_REDUCE_LEVELS = 6
+
+CompleteFn = Callable[[List[Dict[str, str]], float], Awaitable[str]]
+
+class GroupSummaryCache:
+    """Cache (SQLite) các bản tóm tắt trung gian theo nội dung của từng nhóm chunk."""
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS group_summaries ("
+            "group_key TEXT PRIMARY KEY, document_id TEXT NOT NULL, summary TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_group_summaries_document ON group_summaries(document_id)")
+        self._conn.commit()
+
+    def get(self, group_key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM group_summaries WHERE group_key = ?", (group_key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, group_key: str, document_id: str, summary: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO group_summaries (group_key, document_id, summary, created_at) VALUES (?, ?, ?, ?)",
+                (group_key, document_id, summary, time.time()),
+            )
+            self._conn.commit()
+
+    def invalidate_document(self, document_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM group_summaries WHERE document_id = ?", (document_id,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM group_summaries")
+            self._conn.commit()
+
+class MapReduceSummarizer:
+    """
+    Rút gọn toàn văn tài liệu theo kiểu map-reduce phân cấp để vừa với ngân sách token.
+    - Map: các chunk được gom thành nhóm vừa token_budget, mỗi nhóm được tóm tắt
+      song song (tối đa max_parallel lời gọi cùng lúc).
+    - Reduce: các bản tóm tắt lại được gom nhóm và tóm tắt tiếp cho tới khi vừa ngân sách.
+    Bản tóm tắt của từng nhóm được cache theo nội dung, nên các tác vụ sau trên cùng
+    tài liệu (tóm tắt, tạo câu hỏi, trích xuất từ khóa) dùng lại được kết quả.
+    """
+
+    def __init__(self, complete: CompleteFn, model_name: str, token_budget: int, max_parallel: int, cache: Optional[GroupSummaryCache] = None):
+        self.complete = complete
+        self.model_name = model_name
+        self.token_budget = token_budget
+        self.max_parallel = max(1, max_parallel)
+        self.cache = cache
+
+    def _group_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{MAP_PROMPT_VERSION}\0{text}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _map_prompt(text: str) -> str:
+        return f"""Hãy tóm tắt ngắn gọn đoạn văn bản dưới đây. Giữ lại các ý chính, tên riêng, số liệu và kết luận quan trọng, không thêm thông tin mới.
+
+VĂN BẢN:
+{text}
+
+TÓM TẮT:
+"""
+
+    async def _summarize_group(self, texts: List[str], document_id: str, semaphore: asyncio.Semaphore) -> str:
+        text = "\n".join(texts)
+        group_key = self._group_key(text)
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, group_key)
+            if cached is not None:
+                return cached
+        async with semaphore:
+            summary = await self.complete([{"role": "user", "content": self._map_prompt(text)}], 0.2)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, group_key, document_id, summary)
+        return summary
+
+    async def condense(self, chunks: List[str], document_id: str) -> str:
+        """Trả về văn bản (nguyên văn hoặc đã tóm tắt) có kích thước nằm trong ngân sách token."""
+        full_text = "\n".join(chunks)
+        if count_tokens(full_text) <= self.token_budget:
+            return full_text
+
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        texts = chunks
+        for level in range(1, MAX_REDUCE_LEVELS + 1):
+            groups = group_by_token_budget(texts, self.token_budget)
+            logger.info(f"Map-reduce cấp {level}: tóm tắt {len(groups)} nhóm cho tài liệu {document_id}...")
+            texts = list(await asyncio.gather(*(self._summarize_group(group, document_id, semaphore) for group in groups)))
+            full_text = "\n".join(texts)
+            if len(texts) == 1 or count_tokens(full_text) <= self.token_budget:
+                break
+        return full_text
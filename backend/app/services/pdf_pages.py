@@ -0,0 +1,27 @@
+# backend/app/services/pdf_pages.py
+import time
+from typing import Iterator, List, Tuple
+
+# (số trang, nội dung, thời gian trích xuất tính bằng giây)
+PageText = Tuple[int, str, float]
+
+# Module này chỉ phụ thuộc pypdf để các tiến trình con khởi động nhanh.
+
+def count_pdf_pages(file_path: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(file_path).pages)
+
+def iter_pdf_pages(file_path: str, start: int, end: int) -> Iterator[PageText]:
+    """Trích xuất lần lượt văn bản các trang [start, end) của một file PDF, kèm thời gian của từng trang."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    for page_number in range(start, min(end, len(reader.pages))):
+        page_start = time.perf_counter()
+        text = reader.pages[page_number].extract_text()
+        yield page_number, text, time.perf_counter() - page_start
+
+def extract_pdf_pages(file_path: str, start: int, end: int) -> List[PageText]:
+    """Phiên bản trả về list của iter_pdf_pages, dùng trong các tiến trình con."""
+    return list(iter_pdf_pages(file_path, start, end))
@@ -1,10 +1,28 @@
 # backend/app/services/rag_pipeline.py
-import os
-import json
-from openai import OpenAI
-from typing import List, Set, Optional, Dict, Any
+import logging
+import time
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, List, Set, Optional, Dict, Any, Sequence, Tuple
 from ..core.config import settings
+from ..core.telemetry import record_stage, span
+from .llm_gateway import LLMGateway, LLMQueueFull
 from .vector_store import VectorStoreManager
+from .map_reduce import GroupSummaryCache, MapReduceSummarizer, MAP_PROMPT_VERSION
+from .artifact_cache import ArtifactCache
+from .answer_cache import SemanticAnswerCache
+from .context_builder import CONTEXT_SEPARATOR, ContextResult, build_context
+from .session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+NO_CONTEXT_ANSWER = "Tôi xin lỗi, tôi không tìm thấy bất kỳ thông tin nào liên quan trong tài liệu của bạn để trả lời câu hỏi này."
+# Tăng phiên bản khi sửa prompt của các tác vụ để bỏ qua kết quả đã cache
+TASK_PROMPT_VERSION = "v1"
+ARTIFACT_WARMUP_TASKS = [("summarize", {}), ("extract_keywords", {}), ("generate_questions", {"num_questions": 5})]
+LLM_ERROR_ANSWER = "Xin lỗi, đã có lỗi xảy ra khi kết nối với mô hình ngôn ngữ. Vui lòng đảm bảo Ollama đang chạy và thử lại."
 
 class RAGPipeline:
     _instance = None # Singleton instance
@@ -16,13 +34,52 @@ class RAGPipeline:
         return cls._instance
 
     def _init_pipeline(self, vector_store_manager: VectorStoreManager):
-        print("Đang khởi tạo RAGPipeline...")
+        logger.info("Đang khởi tạo RAGPipeline...")
         self.vector_store = vector_store_manager
         
-        self.llm_client = OpenAI(
-            base_url=settings.OLLAMA_BASE_URL + "/v1",
-            api_key='ollama'
+        # Mọi lời gọi LLM đi qua gateway: pool keep-alive, timeout, thử lại, gộp lời gọi trùng và hàng đợi có giới hạn
+        self.llm = LLMGateway(
+            settings.OLLAMA_BASE_URL,
+            settings.OLLAMA_MODEL,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            max_queue_depth=settings.LLM_QUEUE_MAX_DEPTH,
+            queue_timeout_seconds=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            connect_timeout_seconds=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+            request_timeout_seconds=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+            max_retries=settings.LLM_MAX_RETRIES,
+            retry_base_delay_seconds=settings.LLM_RETRY_BASE_DELAY_SECONDS,
+            retry_max_delay_seconds=settings.LLM_RETRY_MAX_DELAY_SECONDS,
+        )
+        # Tìm kiếm Chroma/BM25 là tác vụ chặn (blocking), chạy trên executor có giới hạn
+        self.retrieval_executor = ThreadPoolExecutor(max_workers=settings.RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+
+        # Tài liệu lớn được rút gọn bằng map-reduce trước khi đưa vào các tác vụ
+        self.summary_cache = GroupSummaryCache(settings.SUMMARY_CACHE_PATH)
+        self.map_reduce = MapReduceSummarizer(
+            self._complete,
+            model_name=settings.OLLAMA_MODEL,
+            token_budget=settings.MAP_REDUCE_TOKEN_BUDGET,
+            max_parallel=settings.MAP_REDUCE_MAX_PARALLEL,
+            cache=self.summary_cache,
+        )
+        # Kết quả tác vụ trên từng tài liệu được cache bền vững
+        self.artifact_cache = ArtifactCache(
+            settings.ARTIFACT_CACHE_PATH,
+            model_name=settings.OLLAMA_MODEL,
+            prompt_version=f"{TASK_PROMPT_VERSION}/{MAP_PROMPT_VERSION}",
         )
+        # Cache câu trả lời theo độ tương đồng ngữ nghĩa của câu hỏi
+        self.answer_cache: Optional[SemanticAnswerCache] = None
+        if settings.ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+                ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+                max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            )
+        # Event loop chính, dùng để lên lịch tính trước kết quả từ các luồng nạp tài liệu
+        self.event_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.vector_store.add_document_listener(self._on_document_event)
 
         self.conversational_keywords: Set[str] = {
             "xin chào", "chào bạn", "hello", "hi",
@@ -31,47 +88,96 @@ class RAGPipeline:
             "bạn làm được gì", "bạn có thể làm gì"
         }
         
-        self.state_file_path = os.path.join(settings.PROJECT_ROOT, "data", "state.json")
-        self.last_uploaded_document_id: Optional[str] = self._load_state()
-        if self.last_uploaded_document_id:
-            print(f"Đã tải trạng thái, tài liệu mặc định là: {self.last_uploaded_document_id}")
+        # Tài liệu/bộ sưu tập mặc định được lưu riêng cho từng phiên (header X-Session-ID)
+        self.sessions = SessionStore(
+            settings.SESSION_STORE_PATH,
+            ttl_seconds=settings.SESSION_TTL_SECONDS,
+            max_sessions=settings.SESSION_MAX_ENTRIES,
+        )
         
-        print("RAGPipeline đã sẵn sàng.")
-
-    def _load_state(self) -> Optional[str]:
-        try:
-            if os.path.exists(self.state_file_path):
-                with open(self.state_file_path, 'r') as f:
-                    state_data = json.load(f)
-                    return state_data.get("last_uploaded_document_id")
-        except (IOError, json.JSONDecodeError) as e:
-            print(f"Lỗi khi tải file trạng thái: {e}")
-        return None
-
-    def _save_state(self):
-        try:
-            with open(self.state_file_path, 'w') as f:
-                json.dump({"last_uploaded_document_id": self.last_uploaded_document_id}, f)
-        except IOError as e:
-            print(f"Lỗi khi lưu file trạng thái: {e}")
-
-    def set_last_uploaded_document_id(self, document_id: str):
-        print(f"Thiết lập tài liệu mặc định mới: {document_id}")
-        self.last_uploaded_document_id = document_id
-        self._save_state()
+        logger.info("RAGPipeline đã sẵn sàng.")
+
+    def set_session_document(self, session_id: Optional[str], document_id: str):
+        """Đặt tài liệu vừa tải lên làm mặc định cho phiên (không có phiên thì bỏ qua)."""
+        if session_id:
+            logger.debug("Thiết lập tài liệu mặc định mới cho phiên %s: %s", session_id, document_id)
+            self.sessions.set(session_id, document_id=document_id)
+
+    def default_document_id(self, session_id: Optional[str]) -> Optional[str]:
+        state = self.sessions.get(session_id)
+        return state.document_id if state else None
+
+    def resolve_scope(
+        self,
+        session_id: Optional[str],
+        document_id: Optional[str] = None,
+        document_ids: Optional[Sequence[str]] = None,
+        collection_id: Optional[str] = None,
+    ) -> Optional[List[str]]:
+        """
+        Xác định tập tài liệu cần tìm kiếm (None = toàn bộ kho). Thứ tự ưu tiên:
+        document_ids > collection_id > document_id > phạm vi mặc định của phiên.
+        Ném LookupError nếu bộ sưu tập không tồn tại.
+        """
+        if document_ids:
+            return list(dict.fromkeys(document_ids))
+        if collection_id is None and document_id is None:
+            state = self.sessions.get(session_id)
+            if state is not None:
+                collection_id, document_id = state.collection_id, state.document_id
+        if collection_id is not None:
+            collection_document_ids = self.vector_store.document_registry.get_collection_document_ids(collection_id)
+            if collection_document_ids is None:
+                raise LookupError(f"Không tìm thấy bộ sưu tập: {collection_id}")
+            return collection_document_ids
+        return [document_id] if document_id else None
+
+    def _on_document_event(self, event: str, document_id: Optional[str]):
+        if event == "deleted":
+            self.sessions.forget_document(document_id)
+            self.summary_cache.invalidate_document(document_id)
+            self.artifact_cache.invalidate_document(document_id)
+            if self.answer_cache:
+                self.answer_cache.invalidate_document(document_id)
+        elif event == "cleared":
+            self.sessions.clear()
+            self.summary_cache.clear()
+            self.artifact_cache.clear()
+            if self.answer_cache:
+                self.answer_cache.clear()
+        elif event == "indexed":
+            # Nội dung tài liệu vừa thay đổi nên kết quả cũ không còn đúng
+            self.artifact_cache.invalidate_document(document_id)
+            if self.answer_cache:
+                self.answer_cache.invalidate_document(document_id)
+            if settings.ARTIFACT_WARMUP_ENABLED and self.event_loop is not None:
+                asyncio.run_coroutine_threadsafe(self.warm_artifacts(document_id), self.event_loop)
+
+    async def _run_blocking(self, func: Callable, *args, **kwargs):
+        """Chạy một hàm chặn trên retrieval executor để không làm đứng event loop (giữ context để span gắn đúng yêu cầu)."""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.retrieval_executor, functools.partial(context.run, func, *args, **kwargs))
+
+    async def _complete(self, messages: List[Dict[str, str]], temperature: float) -> str:
+        return await self.llm.complete(messages, temperature)
 
     def _is_conversational_query(self, query: str) -> bool:
         normalized_query = query.lower().strip().replace('?', '')
         return normalized_query in self.conversational_keywords
 
-    def _generate_conversational_response(self, query: str) -> str:
-        print("Đang tạo câu trả lời giao tiếp bằng LLM...")
+    def _conversational_messages(self, query: str) -> List[Dict[str, str]]:
         system_prompt = "Bạn là một trợ lý AI thân thiện và hữu ích. Hãy trả lời câu hỏi của người dùng một cách ngắn gọn và tự nhiên."
+        return [{"role": "system", "content": system_prompt}, {"role": "user", "content": query}]
+
+    async def _generate_conversational_response(self, query: str) -> str:
+        logger.debug("Đang tạo câu trả lời giao tiếp bằng LLM...")
         try:
-            response = self.llm_client.chat.completions.create(model=settings.OLLAMA_MODEL, messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": query}], temperature=0.5)
-            return response.choices[0].message.content
+            return await self._complete(self._conversational_messages(query), 0.5)
+        except LLMQueueFull:
+            raise
         except Exception as e:
-            print(f"Lỗi khi tạo câu trả lời giao tiếp: {e}")
+            logger.error(f"Lỗi khi tạo câu trả lời giao tiếp: {e}")
             return "Xin chào! Tôi có thể giúp gì cho bạn?"
 
     # --- BẮT ĐẦU CẢI TIẾN PROMPT ---
@@ -79,7 +185,7 @@ class RAGPipeline:
         """
         Tạo câu lệnh (prompt) cho quy trình RAG với chỉ thị linh hoạt hơn.
         """
-        context_str = "\n\n---\n\n".join(context)
+        context_str = CONTEXT_SEPARATOR.join(context)
         
         prompt = f"""Bạn là một trợ lý AI chuyên gia. Sử dụng các đoạn văn bản trong phần NGỮ CẢNH dưới đây để trả lời CÂU HỎI của người dùng một cách toàn diện.
 Hãy tổng hợp và suy luận thông tin từ các đoạn văn bản để tạo ra một câu trả lời mạch lạc và hữu ích.
@@ -94,106 +200,216 @@ TRẢ LỜI:
         return prompt
     # --- KẾT THÚC CẢI TIẾN PROMPT ---
 
-    def ask(self, query: str, document_id: Optional[str] = None) -> str:
+    # --- STREAMING ---
+    async def _stream_llm_events(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        sources: List[Dict[str, Any]],
+        error_message: str,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Gửi yêu cầu tới LLM ở chế độ stream và phát ra các sự kiện:
+        metadata (nguồn tham khảo) -> token -> done (kèm thời gian tới token đầu tiên).
+        """
+        yield {"type": "metadata", "sources": sources, "cached": False}
+        start = time.perf_counter()
+        first_token_at = None
+        try:
+            async for delta in self.llm.stream(messages, temperature):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                yield {"type": "token", "content": delta}
+        except LLMQueueFull as e:
+            # Hàng đợi đầy sau khi response đã bắt đầu (không thể trả 429 nữa)
+            logger.warning(f"Bỏ qua stream câu trả lời: {e}")
+            yield {"type": "error", "message": str(e)}
+        except Exception as e:
+            logger.error(f"Lỗi khi stream câu trả lời từ LLM: {e}")
+            yield {"type": "error", "message": error_message}
+        end = time.perf_counter()
+        if first_token_at is not None:
+            record_stage("llm_ttft", first_token_at - start)
+        record_stage("llm_total", end - start)
+        yield {
+            "type": "done",
+            "time_to_first_token_ms": round((first_token_at - start) * 1000, 1) if first_token_at else None,
+            "total_ms": round((end - start) * 1000, 1),
+        }
+
+    @staticmethod
+    async def _static_events(text: str, sources: Optional[List[Dict[str, Any]]] = None, cached: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Phát một câu trả lời cố định (không cần gọi LLM) dưới dạng các sự kiện stream."""
+        yield {"type": "metadata", "sources": sources or [], "cached": cached}
+        yield {"type": "token", "content": text}
+        yield {"type": "done", "time_to_first_token_ms": 0.0, "total_ms": 0.0}
+
+    @staticmethod
+    def _sources_from_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": chunk["id"],
+                "document_id": chunk["metadata"].get("document_id"),
+                "source": chunk["metadata"].get("source"),
+                "page": chunk["metadata"].get("page"),
+            }
+            for chunk in chunks
+        ]
+
+    # --- HỎI ĐÁP ---
+    async def _retrieve_context(self, query: str, document_ids: Optional[List[str]], query_embedding: Any) -> List[Dict[str, Any]]:
+        logger.debug("Đang tìm kiếm ngữ cảnh cho câu hỏi: '%s'", query)
+        search_result = await self._run_blocking(
+            self.vector_store.search_with_stats, query, k=settings.RAG_TOP_K,
+            document_ids=document_ids, query_embedding=query_embedding
+        )
+        found_chunks = search_result.chunks
+        # Log chi tiết từng chunk nằm trên đường nóng: chỉ dựng chuỗi khi bật mức DEBUG
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Thời gian tìm kiếm: " + ", ".join(f"{stage}={ms:.1f}" for stage, ms in search_result.timings.items()))
+            logger.debug(f"--- Đã tìm thấy {len(found_chunks)} chunk liên quan ---")
+            for i, chunk in enumerate(found_chunks):
+                logger.debug(f"[Chunk {i+1} - Nguồn: {chunk['metadata'].get('source', 'N/A')}, Trang: {chunk['metadata'].get('page', 'N/A')}]")
+                logger.debug(f"Nội dung: {chunk['content'][:200]}...")
+            logger.debug("------------------------------------")
+        if not found_chunks:
+            logger.debug("Không tìm thấy ngữ cảnh nào.")
+            return []
+        return found_chunks
+
+    @staticmethod
+    def _build_context(found_chunks: List[Dict[str, Any]]) -> ContextResult:
+        context = build_context(found_chunks, settings.RAG_CONTEXT_TOKEN_BUDGET, settings.CHUNK_OVERLAP)
+        logger.debug(
+            "Ngữ cảnh: %d đoạn, %d/%d token (tiết kiệm %d token, gộp %d chunk, bỏ %d chunk).",
+            len(context.passages), context.context_tokens, settings.RAG_CONTEXT_TOKEN_BUDGET,
+            context.saved_tokens, context.merged_chunks, context.dropped_chunks,
+        )
+        return context
+
+    async def _prepare_question(self, query: str, document_ids: Optional[List[str]]) -> Tuple[Any, Optional[Any]]:
+        """
+        Tính embedding câu hỏi (một lần, dùng cho cả cache và tìm kiếm) và tra cache
+        câu trả lời trong phạm vi document_ids. Trả về (embedding, bản ghi cache).
+        """
+        if document_ids is not None:
+            logger.debug("Phạm vi tìm kiếm: %d tài liệu", len(document_ids))
+        query_embedding = await self._run_blocking(self.vector_store.embed_query, query)
+        cached = self.answer_cache.lookup(document_ids, query_embedding) if self.answer_cache else None
+        if cached is not None:
+            logger.debug("Dùng câu trả lời đã cache (câu hỏi gốc: '%s').", cached.query)
+        return query_embedding, cached
+
+    async def ask(self, query: str, document_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Trả về {"answer": ..., "cached": bool}; cached=True khi câu trả lời lấy từ cache ngữ nghĩa.
+        document_ids là phạm vi đã xác định bằng resolve_scope (None = toàn bộ kho).
+        """
         if self._is_conversational_query(query):
-            return self._generate_conversational_response(query)
+            return {"answer": await self._generate_conversational_response(query), "cached": False}
 
-        target_document_id = document_id or self.last_uploaded_document_id
-        if target_document_id:
-            print(f"Sử dụng tài liệu mặc định: {target_document_id}")
+        query_embedding, cached = await self._prepare_question(query, document_ids)
+        if cached is not None:
+            return {"answer": cached.answer, "cached": True}
 
-        print(f"Đang tìm kiếm ngữ cảnh cho câu hỏi: '{query}'")
-        found_chunks = self.vector_store.search(query, document_id=target_document_id)
-        
+        found_chunks = await self._retrieve_context(query, document_ids, query_embedding)
         if not found_chunks:
-            print("Không tìm thấy ngữ cảnh nào.")
-            return "Tôi xin lỗi, tôi không tìm thấy bất kỳ thông tin nào liên quan trong tài liệu của bạn để trả lời câu hỏi này."
-
-        print(f"--- Đã tìm thấy {len(found_chunks)} chunk liên quan ---")
-        context_for_prompt = []
-        for i, chunk in enumerate(found_chunks):
-            print(f"[Chunk {i+1} - Nguồn: {chunk['metadata'].get('source', 'N/A')}, Trang: {chunk['metadata'].get('page', 'N/A')}]")
-            print(f"Nội dung: {chunk['content'][:200]}...")
-            context_for_prompt.append(chunk['content'])
-        print("------------------------------------")
-        
-        prompt = self._format_rag_prompt(query, context_for_prompt)
-        print("Đang gửi yêu cầu RAG đến LLM...")
+            return {"answer": NO_CONTEXT_ANSWER, "cached": False}
+
+        with span("prompt_build"):
+            context = self._build_context(found_chunks)
+            prompt = self._format_rag_prompt(query, context.passages)
+        logger.debug("Đang gửi yêu cầu RAG đến LLM...")
         try:
-            response = self.llm_client.chat.completions.create(model=settings.OLLAMA_MODEL, messages=[{"role": "user", "content": prompt}], temperature=0.1)
-            answer = response.choices[0].message.content
-            print("Đã nhận được câu trả lời RAG từ LLM.")
-            return answer
+            answer = await self._complete([{"role": "user", "content": prompt}], 0.1)
+            logger.debug("Đã nhận được câu trả lời RAG từ LLM.")
+        except LLMQueueFull:
+            raise
         except Exception as e:
-            print(f"Lỗi khi giao tiếp với Ollama (RAG): {e}")
-            return "Xin lỗi, đã có lỗi xảy ra khi kết nối với mô hình ngôn ngữ. Vui lòng đảm bảo Ollama đang chạy và thử lại."
+            logger.error(f"Lỗi khi giao tiếp với Ollama (RAG): {e}")
+            return {"answer": LLM_ERROR_ANSWER, "cached": False}
+        if self.answer_cache:
+            self.answer_cache.store(document_ids, query, query_embedding, answer, self._sources_from_chunks(context.chunks))
+        return {"answer": answer, "cached": False}
 
-    def summarize_document(self, document_id: Optional[str] = None) -> str:
-        target_document_id = document_id or self.last_uploaded_document_id
-        if not target_document_id:
-            return "Vui lòng chỉ định một tài liệu để tóm tắt."
+    async def ask_stream(self, query: str, document_ids: Optional[List[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Phiên bản stream của ask: nguồn tham khảo được gửi trước, sau đó là từng token.
+        Ném LLMQueueFull trước khi bắt đầu stream nếu hàng đợi LLM đang đầy.
+        """
+        if self._is_conversational_query(query):
+            self.llm.ensure_capacity()
+            return self._stream_llm_events(self._conversational_messages(query), 0.5, [], "Xin chào! Tôi có thể giúp gì cho bạn?")
 
-        print(f"Bắt đầu tóm tắt tài liệu: {target_document_id}")
-        all_chunks = self.vector_store.get_all_chunks_for_document(target_document_id)
+        query_embedding, cached = await self._prepare_question(query, document_ids)
+        if cached is not None:
+            return self._static_events(cached.answer, cached.sources, cached=True)
 
+        found_chunks = await self._retrieve_context(query, document_ids, query_embedding)
+        if not found_chunks:
+            return self._static_events(NO_CONTEXT_ANSWER)
+
+        with span("prompt_build"):
+            context = self._build_context(found_chunks)
+            prompt = self._format_rag_prompt(query, context.passages)
+        sources = self._sources_from_chunks(context.chunks)
+        self.llm.ensure_capacity()
+        logger.debug("Đang stream yêu cầu RAG đến LLM...")
+        events = self._stream_llm_events([{"role": "user", "content": prompt}], 0.1, sources, LLM_ERROR_ANSWER)
+        if not self.answer_cache:
+            return events
+
+        async def cache_when_done():
+            parts, failed = [], False
+            async for event in events:
+                if event["type"] == "token":
+                    parts.append(event["content"])
+                elif event["type"] == "error":
+                    failed = True
+                yield event
+            if not failed:
+                self.answer_cache.store(document_ids, query, query_embedding, "".join(parts), sources)
+
+        return cache_when_done()
+
+    # --- CÁC TÁC VỤ TRÊN TOÀN BỘ TÀI LIỆU ---
+    async def _load_document_text(self, target_document_id: str, action: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Trả về (văn bản tài liệu, thông báo lỗi) cho các tác vụ cần đọc cả tài liệu.
+        Tài liệu vượt quá ngân sách token được rút gọn bằng map-reduce trước.
+        """
+        logger.info(f"Bắt đầu {action} cho tài liệu: {target_document_id}")
+        all_chunks = await self._run_blocking(self.vector_store.get_all_chunks_for_document, target_document_id)
         if not all_chunks:
-            return "Không tìm thấy nội dung cho tài liệu này để tóm tắt."
+            return None, f"Không tìm thấy nội dung cho tài liệu này để {action}."
+        try:
+            return await self.map_reduce.condense(all_chunks, target_document_id), None
+        except LLMQueueFull:
+            raise
+        except Exception as e:
+            logger.error(f"Lỗi khi rút gọn tài liệu bằng map-reduce: {e}")
+            return None, f"Lỗi khi {action} tài liệu: {e}"
 
-        full_text = "\n".join(all_chunks)
-        prompt = f"""Dựa vào toàn bộ văn bản được cung cấp dưới đây, hãy viết một bản tóm tắt chi tiết, nêu bật các ý chính, các số liệu và kết luận quan trọng.
+    def _summary_prompt(self, full_text: str) -> str:
+        return f"""Dựa vào toàn bộ văn bản được cung cấp dưới đây, hãy viết một bản tóm tắt chi tiết, nêu bật các ý chính, các số liệu và kết luận quan trọng.
 
 VĂN BẢN:
 {full_text}
 
 BẢN TÓM TẮT CHI TIẾT:
 """
-        print("Đang gửi yêu cầu tóm tắt đến LLM...")
-        try:
-            response = self.llm_client.chat.completions.create(model=settings.OLLAMA_MODEL, messages=[{"role": "user", "content": prompt}], temperature=0.2)
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"Lỗi khi tóm tắt tài liệu: {e}"
-
-    def generate_questions(self, num_questions: int, document_id: Optional[str] = None) -> str:
-        target_document_id = document_id or self.last_uploaded_document_id
-        if not target_document_id:
-            return "Vui lòng chỉ định một tài liệu để tạo câu hỏi."
-
-        print(f"Bắt đầu tạo câu hỏi cho tài liệu: {target_document_id}")
-        all_chunks = self.vector_store.get_all_chunks_for_document(target_document_id)
 
-        if not all_chunks:
-            return "Không tìm thấy nội dung cho tài liệu này để tạo câu hỏi."
-
-        full_text = "\n".join(all_chunks)
-        prompt = f"""Bạn là một giáo viên nhiều kinh nghiệm. Dựa vào toàn bộ văn bản được cung cấp dưới đây, hãy tạo ra chính xác {num_questions} câu hỏi ôn tập quan trọng để kiểm tra kiến thức.
+    def _questions_prompt(self, full_text: str, num_questions: int) -> str:
+        return f"""Bạn là một giáo viên nhiều kinh nghiệm. Dựa vào toàn bộ văn bản được cung cấp dưới đây, hãy tạo ra chính xác {num_questions} câu hỏi ôn tập quan trọng để kiểm tra kiến thức.
 
 VĂN BẢN:
 {full_text}
 
 {num_questions} CÂU HỎI ÔN TẬP:
 """
-        print(f"Đang gửi yêu cầu tạo {num_questions} câu hỏi đến LLM...")
-        try:
-            response = self.llm_client.chat.completions.create(model=settings.OLLAMA_MODEL, messages=[{"role": "user", "content": prompt}], temperature=0.7)
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"Lỗi khi tạo câu hỏi ôn tập: {e}"
-
-    def extract_keywords_and_topics(self, document_id: Optional[str] = None) -> str:
-        target_document_id = document_id or self.last_uploaded_document_id
-        if not target_document_id:
-            return "Vui lòng chỉ định một tài liệu để trích xuất từ khóa."
-
-        print(f"Bắt đầu trích xuất từ khóa cho tài liệu: {target_document_id}")
-        all_chunks = self.vector_store.get_all_chunks_for_document(target_document_id)
-
-        if not all_chunks:
-            return "Không tìm thấy nội dung cho tài liệu này để trích xuất từ khóa."
 
-        full_text = "\n".join(all_chunks)
-        
-        prompt = f"""Bạn là một chuyên gia phân tích dữ liệu. Dựa vào toàn bộ văn bản được cung cấp dưới đây, hãy thực hiện hai việc:
+    def _keywords_prompt(self, full_text: str) -> str:
+        return f"""Bạn là một chuyên gia phân tích dữ liệu. Dựa vào toàn bộ văn bản được cung cấp dưới đây, hãy thực hiện hai việc:
 1. Liệt kê 5-10 từ khóa (keywords) hoặc cụm từ quan trọng nhất.
 2. Liệt kê 3-5 chủ đề chính (main topics) mà tài liệu này đề cập.
 
@@ -204,22 +420,102 @@ VĂN BẢN:
 
 KẾT QUẢ PHÂN TÍCH:
 """
-        print("Đang gửi yêu cầu trích xuất từ khóa đến LLM...")
+
+    def _task_spec(self, task: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Mô tả (hành động, prompt, nhiệt độ, thông báo lỗi) của từng tác vụ."""
+        if task == "summarize":
+            return {"action": "tóm tắt", "build_prompt": self._summary_prompt, "temperature": 0.2,
+                    "error_prefix": "Lỗi khi tóm tắt tài liệu"}
+        if task == "generate_questions":
+            return {"action": "tạo câu hỏi", "temperature": 0.7, "error_prefix": "Lỗi khi tạo câu hỏi ôn tập",
+                    "build_prompt": lambda full_text: self._questions_prompt(full_text, params["num_questions"])}
+        if task == "extract_keywords":
+            return {"action": "trích xuất từ khóa", "build_prompt": self._keywords_prompt, "temperature": 0.0,
+                    "error_prefix": "Lỗi khi trích xuất từ khóa và chủ đề"}
+        raise ValueError(f"Tác vụ không được hỗ trợ: {task}")
+
+    async def _run_task(self, task: str, document_id: Optional[str], params: Optional[Dict[str, Any]] = None) -> str:
+        params = params or {}
+        spec = self._task_spec(task, params)
+        if not document_id:
+            return f"Vui lòng chỉ định một tài liệu để {spec['action']}."
+
+        cached = await asyncio.to_thread(self.artifact_cache.get, document_id, task, params)
+        if cached is not None:
+            logger.debug("Dùng kết quả '%s' đã cache cho tài liệu: %s", task, document_id)
+            return cached
+
+        full_text, error = await self._load_document_text(document_id, spec["action"])
+        if error:
+            return error
+        logger.debug("Đang gửi yêu cầu '%s' đến LLM...", task)
         try:
-            response = self.llm_client.chat.completions.create(
-                model=settings.OLLAMA_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.0
-            )
-            return response.choices[0].message.content
+            result = await self._complete([{"role": "user", "content": spec["build_prompt"](full_text)}], spec["temperature"])
+        except LLMQueueFull:
+            raise
         except Exception as e:
-            return f"Lỗi khi trích xuất từ khóa và chủ đề: {e}"
-        for chunk in chunks:
-            chunk_id = f"{document_id}_{i}"
-            self.keyword_corpus[chunk_id] = {
-                "tokens": chunk.page_content.split(),
-                "content": chunk.page_content,
-                "metadata": chunk.metadata
-            }
-        self._save_keyword_index()
-        
\ No newline at end of file
+            return f"{spec['error_prefix']}: {e}"
+        await asyncio.to_thread(self.artifact_cache.put, document_id, task, params, result)
+        return result
+
+    async def _run_task_stream(self, task: str, document_id: Optional[str], params: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        params = params or {}
+        spec = self._task_spec(task, params)
+        if not document_id:
+            return self._static_events(f"Vui lòng chỉ định một tài liệu để {spec['action']}.")
+
+        cached = await asyncio.to_thread(self.artifact_cache.get, document_id, task, params)
+        if cached is not None:
+            return self._static_events(cached)
+
+        full_text, error = await self._load_document_text(document_id, spec["action"])
+        if error:
+            return self._static_events(error)
+        self.llm.ensure_capacity()
+
+        events = self._stream_llm_events(
+            [{"role": "user", "content": spec["build_prompt"](full_text)}], spec["temperature"], [], f"{spec['error_prefix']}."
+        )
+
+        async def cache_when_done():
+            parts, failed = [], False
+            async for event in events:
+                if event["type"] == "token":
+                    parts.append(event["content"])
+                elif event["type"] == "error":
+                    failed = True
+                yield event
+            if not failed:
+                await asyncio.to_thread(self.artifact_cache.put, document_id, task, params, "".join(parts))
+
+        return cache_when_done()
+
+    async def summarize_document(self, document_id: Optional[str] = None) -> str:
+        return await self._run_task("summarize", document_id)
+
+    async def generate_questions(self, num_questions: int, document_id: Optional[str] = None) -> str:
+        return await self._run_task("generate_questions", document_id, {"num_questions": num_questions})
+
+    async def extract_keywords_and_topics(self, document_id: Optional[str] = None) -> str:
+        return await self._run_task("extract_keywords", document_id)
+
+    async def summarize_document_stream(self, document_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        return await self._run_task_stream("summarize", document_id)
+
+    async def generate_questions_stream(self, num_questions: int, document_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        return await self._run_task_stream("generate_questions", document_id, {"num_questions": num_questions})
+
+    async def extract_keywords_and_topics_stream(self, document_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        return await self._run_task_stream("extract_keywords", document_id)
+
+    async def warm_artifacts(self, document_id: str):
+        """Tính trước các kết quả tác vụ mặc định cho một tài liệu vừa được lập chỉ mục xong."""
+        logger.info(f"Đang tính trước kết quả tác vụ cho tài liệu: {document_id}")
+        for task, params in ARTIFACT_WARMUP_TASKS:
+            try:
+                await self._run_task(task, document_id, params)
+            except LLMQueueFull:
+                # Hàng đợi đang đầy vì yêu cầu của người dùng: bỏ qua, kết quả sẽ được tính khi có yêu cầu
+                logger.warning(f"Bỏ qua tính trước kết quả tác vụ cho tài liệu {document_id}: hàng đợi LLM đang đầy.")
+                return
+        logger.info(f"Đã tính trước kết quả tác vụ cho tài liệu: {document_id}")
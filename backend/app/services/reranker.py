@@ -0,0 +1,93 @@
+# backend/app/services/reranker.py
+import logging
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CrossEncoderReranker:
+    """
+    Giai đoạn tái xếp hạng (tùy chọn) bằng cross-encoder chạy trên CPU.
+    - Chỉ chấm điểm tối đa max_candidates ứng viên đầu tiên của thứ hạng đã hợp nhất.
+    - Các cặp (câu hỏi, chunk) được chấm theo batch; điểm được cache theo LRU.
+    - Cỡ batch được thu nhỏ theo thời gian chấm một cặp (ước lượng từ các batch trước) khi ngân sách
+      time_budget_ms sắp hết. Hết ngân sách thì chỉ sắp xếp lại phần đầu đã có điểm, phần còn lại
+      giữ nguyên thứ tự đã hợp nhất.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 16, max_candidates: int = 20, time_budget_ms: float = 1500, cache_size: int = 10_000):
+        from sentence_transformers import CrossEncoder
+
+        logger.info(f"Đang tải mô hình re-ranking: {model_name}")
+        self.model = CrossEncoder(model_name, device="cpu")
+        self.batch_size = max(1, batch_size)
+        self.max_candidates = max_candidates
+        self.time_budget_ms = time_budget_ms
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Thời gian chấm một cặp (ms, trung bình trượt), None khi chưa đo
+        self._pair_ms = None
+
+    @staticmethod
+    def _pair_key(query: str, content: str) -> Tuple[str, str]:
+        return (
+            hashlib.sha1(query.strip().lower().encode("utf-8")).hexdigest(),
+            hashlib.sha1(content.encode("utf-8")).hexdigest(),
+        )
+
+    def _cached_score(self, key: Tuple[str, str]):
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store_scores(self, items: List[Tuple[Tuple[str, str], float]]):
+        with self._lock:
+            for key, score in items:
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def rerank(self, query: str, chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Trả về (danh sách chunk đã sắp xếp lại, thống kê)."""
+        start = time.perf_counter()
+        candidates, rest = chunks[:self.max_candidates], chunks[self.max_candidates:]
+        keys = [self._pair_key(query, chunk["content"]) for chunk in candidates]
+        scores = [self._cached_score(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        stats = {"candidates": len(candidates), "cache_hits": len(candidates) - len(missing), "timed_out": False}
+
+        position = 0
+        while position < len(missing):
+            remaining_ms = self.time_budget_ms - (time.perf_counter() - start) * 1000
+            batch_size = self.batch_size
+            if self._pair_ms is not None:
+                batch_size = min(batch_size, int(remaining_ms // self._pair_ms))
+            if remaining_ms <= 0 or batch_size < 1:
+                stats["timed_out"] = True
+                break
+            batch = missing[position:position + batch_size]
+            batch_start = time.perf_counter()
+            batch_scores = self.model.predict([(query, candidates[i]["content"]) for i in batch], batch_size=batch_size)
+            pair_ms = (time.perf_counter() - batch_start) * 1000 / len(batch)
+            self._pair_ms = pair_ms if self._pair_ms is None else 0.8 * self._pair_ms + 0.2 * pair_ms
+            computed = []
+            for i, score in zip(batch, batch_scores):
+                scores[i] = float(score)
+                computed.append((keys[i], scores[i]))
+            self._store_scores(computed)
+            position += len(batch)
+
+        # Chỉ sắp xếp lại phần đầu liên tục đã có điểm (toàn bộ nếu không hết giờ)
+        scored = next((i for i, score in enumerate(scores) if score is None), len(candidates))
+        stats["scored"] = scored
+        if stats["timed_out"]:
+            logger.warning(f"Re-ranking vượt quá ngân sách thời gian, chỉ sắp xếp lại {scored}/{len(candidates)} ứng viên đầu.")
+        order = sorted(range(scored), key=lambda i: scores[i], reverse=True)
+        return [candidates[i] for i in order] + candidates[scored:] + rest, stats
@@ -0,0 +1,92 @@
+# backend/app/services/session_store.py
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+@dataclass
+class SessionState:
+    """Phạm vi mặc định của một phiên: một tài liệu hoặc một bộ sưu tập (notebook)."""
+    document_id: Optional[str] = None
+    collection_id: Optional[str] = None
+    updated_at: float = field(default_factory=time.time)
+
+class SessionStore:
+    """
+    Trạng thái theo phiên (thay cho file state.json dùng chung): mỗi phiên, định danh bằng
+    header X-Session-ID, có tài liệu/bộ sưu tập mặc định riêng nên nhiều người dùng đồng
+    thời không ghi đè lên nhau. Lưu trên SQLite nên phạm vi của phiên còn nguyên sau khi
+    khởi động lại; phiên hết hạn sau ttl_seconds không dùng và phiên ít dùng nhất bị loại
+    khi vượt max_sessions.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float = 24 * 3600, max_sessions: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, document_id TEXT, collection_id TEXT, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (total,) = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+        return total
+
+    def get(self, session_id: Optional[str]) -> Optional[SessionState]:
+        if not session_id:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT document_id, collection_id, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[2] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE sessions SET updated_at = ? WHERE session_id = ?", (now, session_id))
+            self._conn.commit()
+        return SessionState(document_id=row[0], collection_id=row[1], updated_at=now)
+
+    def set(self, session_id: str, document_id: Optional[str] = None, collection_id: Optional[str] = None) -> SessionState:
+        """Đặt phạm vi mặc định của phiên (ghi đè cả hai trường)."""
+        state = SessionState(document_id=document_id, collection_id=collection_id)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, document_id, collection_id, updated_at) VALUES (?, ?, ?, ?)",
+                (session_id, document_id, collection_id, state.updated_at),
+            )
+            self._conn.execute(
+                "DELETE FROM sessions WHERE session_id IN "
+                "(SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+            self._conn.commit()
+        return state
+
+    def forget_document(self, document_id: str):
+        """Bỏ tài liệu đã bị xóa khỏi phạm vi mặc định của mọi phiên."""
+        with self._lock:
+            self._conn.execute("UPDATE sessions SET document_id = NULL WHERE document_id = ?", (document_id,))
+            self._conn.commit()
+
+    def forget_collection(self, collection_id: str):
+        with self._lock:
+            self._conn.execute("UPDATE sessions SET collection_id = NULL WHERE collection_id = ?", (collection_id,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions")
+            self._conn.commit()
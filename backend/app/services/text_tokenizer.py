@@ -0,0 +1,103 @@
+# backend/app/services/text_tokenizer.py
+import re
+import unicodedata
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+# Từ dừng phổ biến (tiếng Việt và tiếng Anh) gần như không mang thông tin cho BM25
+DEFAULT_STOPWORDS: FrozenSet[str] = frozenset("""
+và của là các có được cho với này những trong một để không thì mà đã đang sẽ ra vào khi như từ theo về tại
+cũng lại nên nếu bị do vì hay hoặc rất đến trên dưới nhiều ít nào gì ai đó đây kia ấy thế sao bao
+còn chỉ vẫn đều cùng nhưng tuy hơn nhất việc sự cái chiếc người ta chúng tôi bạn họ nó mình
+the a an of and or to in is are was were be been for on with by as at this that these those it its from
+""".split())
+
+# Tách đoạn theo dấu câu: cụm ghép (bigram) không được vượt qua ranh giới dấu câu
+_SEGMENT_RE = re.compile(r"[^\w\s]+|_+")
+
+def _build_fold_table() -> Dict[int, str]:
+    """Bảng translate bỏ dấu tiếng Việt (á -> a, ơ -> o, đ -> d...), dựng sẵn một lần."""
+    table = {ord("đ"): "d", ord("Đ"): "D"}
+    for code_point in list(range(0x00C0, 0x0250)) + list(range(0x1E00, 0x1F00)):
+        char = chr(code_point)
+        base = "".join(c for c in unicodedata.normalize("NFD", char) if not unicodedata.combining(c))
+        if base != char and len(base) == 1:
+            table[code_point] = base
+    return table
+
+_FOLD_TABLE = _build_fold_table()
+
+class Tokenizer:
+    """Bộ tách từ dùng chung cho lúc lập chỉ mục và lúc truy vấn BM25."""
+
+    # Tăng khi đổi cách tách từ để chỉ mục cũ được dựng lại
+    name = "base"
+    revision = 1
+
+    @property
+    def version(self) -> str:
+        return f"{self.name}-{self.revision}"
+
+    def tokenize(self, text: str) -> List[str]:
+        raise NotImplementedError
+
+class WhitespaceTokenizer(Tokenizer):
+    """Cách tách cũ: chữ thường rồi tách theo khoảng trắng (dấu câu vẫn dính vào từ)."""
+
+    name = "whitespace"
+
+    def tokenize(self, text: str) -> List[str]:
+        return text.lower().split()
+
+class VietnameseTokenizer(Tokenizer):
+    """
+    Tách từ cho văn bản tiếng Việt:
+    - Chuẩn hóa Unicode NFC (dấu dựng sẵn và dấu tổ hợp cho ra cùng một từ), chữ thường.
+    - Bỏ dấu câu; tùy chọn bỏ dấu thanh/dấu mũ (fold_diacritics) để "hoc sinh" khớp "học sinh".
+    - Bỏ từ dừng; thêm bigram âm tiết ("học_sinh") để bắt được từ ghép.
+    """
+
+    name = "vi"
+    revision = 1
+
+    def __init__(self, fold_diacritics: bool = False, syllable_bigrams: bool = True, stopwords: Optional[Iterable[str]] = DEFAULT_STOPWORDS):
+        self.fold_diacritics = fold_diacritics
+        self.syllable_bigrams = syllable_bigrams
+        self.stopwords = frozenset(self.normalize(word) for word in stopwords) if stopwords else frozenset()
+
+    @property
+    def version(self) -> str:
+        return (
+            f"{self.name}-{self.revision}"
+            f":fold={int(self.fold_diacritics)}:bigrams={int(self.syllable_bigrams)}:stopwords={len(self.stopwords)}"
+        )
+
+    def normalize(self, text: str) -> str:
+        text = unicodedata.normalize("NFC", text).lower()
+        if self.fold_diacritics:
+            text = text.translate(_FOLD_TABLE)
+        return text
+
+    def tokenize(self, text: str) -> List[str]:
+        stopwords = self.stopwords
+        tokens: List[str] = []
+        for segment in _SEGMENT_RE.split(self.normalize(text)):
+            words = segment.split()
+            tokens.extend(word for word in words if word not in stopwords)
+            if self.syllable_bigrams:
+                tokens.extend(
+                    f"{first}_{second}"
+                    for first, second in zip(words, words[1:])
+                    if first not in stopwords and second not in stopwords
+                )
+        return tokens
+
+def create_tokenizer(name: str, fold_diacritics: bool = False, syllable_bigrams: bool = True, remove_stopwords: bool = True) -> Tokenizer:
+    if name == "vi":
+        return VietnameseTokenizer(
+            fold_diacritics=fold_diacritics,
+            syllable_bigrams=syllable_bigrams,
+            stopwords=DEFAULT_STOPWORDS if remove_stopwords else None,
+        )
+    if name == "whitespace":
+        return WhitespaceTokenizer()
+    raise ValueError(f"Bộ tách từ không được hỗ trợ: {name}")
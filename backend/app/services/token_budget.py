@@ -0,0 +1,60 @@
+# backend/app/services/token_budget.py
+import logging
+import threading
+from typing import List
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Ước lượng thô cho tiếng Việt/tiếng Anh với tokenizer của các mô hình nhỏ (gemma, llama)
+CHARS_PER_TOKEN = 3
+
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+def _get_tokenizer():
+    """
+    Tải (một lần) tokenizer của mô hình nếu TOKENIZER_NAME được cấu hình và thư viện
+    transformers có sẵn; nếu không thì dùng ước lượng theo số ký tự.
+    """
+    global _tokenizer, _tokenizer_loaded
+    if _tokenizer_loaded:
+        return _tokenizer
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            if settings.TOKENIZER_NAME:
+                try:
+                    from transformers import AutoTokenizer
+                    _tokenizer = AutoTokenizer.from_pretrained(settings.TOKENIZER_NAME)
+                    logger.info(f"Đã tải tokenizer {settings.TOKENIZER_NAME} để đếm token.")
+                except Exception as e:
+                    logger.warning(f"Không tải được tokenizer {settings.TOKENIZER_NAME}, dùng ước lượng theo ký tự: {e}")
+            _tokenizer_loaded = True
+    return _tokenizer
+
+def count_tokens(text: str) -> int:
+    """Đếm số token của một đoạn văn bản (bằng tokenizer của mô hình nếu có, nếu không thì ước lượng)."""
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+def group_by_token_budget(texts: List[str], budget: int, separator_tokens: int = 1) -> List[List[str]]:
+    """
+    Gom các đoạn văn bản liên tiếp thành nhóm sao cho tổng số token mỗi nhóm không vượt quá budget.
+    Một đoạn đơn lẻ lớn hơn budget sẽ nằm riêng một nhóm.
+    """
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for text in texts:
+        tokens = count_tokens(text) + separator_tokens
+        if current and current_tokens + tokens > budget:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
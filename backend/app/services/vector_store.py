@@ -1,13 +1,55 @@
 # backend/app/services/vector_store.py
+import logging
 import chromadb
 import os
 import shutil
 import json
+import time
+import functools
+import hashlib
+import sys
+import contextvars
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from chromadb.utils import embedding_functions
-from rank_bm25 import BM25Okapi # Import thư viện BM25 cho tìm kiếm từ khóa
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any, Sequence, Tuple
 from ..core.config import settings
-from .document_parser import load_and_split_document
+from ..core.telemetry import INGESTION_CHUNKS, INGESTION_DOCUMENTS, INGESTION_STAGE_SECONDS, record_stage, span
+from .document_parser import iter_document_chunks
+from .document_registry import DocumentRegistry
+from .embedding_cache import EmbeddingCache
+from .embedding_pipeline import EmbeddingPipeline, EmbeddingStats
+from .keyword_index import KeywordIndex
+from .keyword_store import KeywordSegmentStore
+from .content_store import ChunkContentStore
+from .text_tokenizer import WhitespaceTokenizer, create_tokenizer
+from .fusion import create_fusion_strategy
+from .reranker import CrossEncoderReranker
+from .warmup import get_warmup
+
+logger = logging.getLogger(__name__)
+
+# Số bản ghi tối đa cho mỗi lệnh delete/update gửi tới Chroma
+CHROMA_BATCH_SIZE = 1000
+
+# Tên các thành phần được tải ở nền (xem Warmup và /health/ready)
+VECTOR_STORE_COMPONENT = "vector_store"
+KEYWORD_INDEX_COMPONENT = "keyword_index"
+RERANKER_COMPONENT = "reranker"
+STORE_COMPONENTS = (VECTOR_STORE_COMPONENT, KEYWORD_INDEX_COMPONENT)
+
+# Cờ trong bảng meta của sổ đăng ký: đã đăng ký xong các tài liệu nạp trước khi có sổ
+REGISTRY_BACKFILL_KEY = "legacy_backfill_done"
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+@dataclass
+class SearchResult:
+    """Kết quả tìm kiếm lai kèm thời gian (ms) của từng giai đoạn."""
+    chunks: List[Dict[str, Any]]
+    timings: Dict[str, float] = field(default_factory=dict)
 
 class VectorStoreManager:
     """
@@ -24,149 +66,440 @@ class VectorStoreManager:
         return cls._instance
 
     def _init_client(self):
-        """Khởi tạo các client và tải các chỉ mục cần thiết khi ứng dụng khởi động."""
-        print("Đang khởi tạo VectorStoreManager...")
-        # --- Khởi tạo Vector Store (ChromaDB) cho tìm kiếm ngữ nghĩa ---
+        """
+        Khởi tạo phần nhẹ ngay lập tức; các thành phần nặng (mô hình embedding + Chroma,
+        chỉ mục từ khóa, re-ranker) được tải song song ở nền qua Warmup.
+        """
+        logger.info("Đang khởi tạo VectorStoreManager...")
+        self.warmup = get_warmup()
+
+        # keyword_index.json là định dạng cũ, chỉ còn dùng để chuyển đổi ở lần khởi động đầu tiên
+        self.keyword_index_path = os.path.join(settings.PROJECT_ROOT, "data", "keyword_index.json")
+        self.tokenizer = create_tokenizer(
+            settings.KEYWORD_TOKENIZER,
+            fold_diacritics=settings.KEYWORD_FOLD_DIACRITICS,
+            syllable_bigrams=settings.KEYWORD_SYLLABLE_BIGRAMS,
+            remove_stopwords=settings.KEYWORD_REMOVE_STOPWORDS,
+        )
+
+        # --- Sổ đăng ký tài liệu: document_id -> file gốc, trạng thái, danh sách chunk ---
+        self.document_registry = DocumentRegistry(settings.DOCUMENT_REGISTRY_PATH)
+
+        # --- Giai đoạn truy hồi song song và hợp nhất kết quả ---
+        self.search_executor = ThreadPoolExecutor(max_workers=settings.RETRIEVAL_WORKERS, thread_name_prefix="semantic-search")
+        self.fusion_strategy = create_fusion_strategy(
+            settings.FUSION_METHOD,
+            weights={"semantic": settings.FUSION_SEMANTIC_WEIGHT, "keyword": settings.FUSION_KEYWORD_WEIGHT},
+            rrf_k=settings.FUSION_RRF_K,
+            normalization=settings.FUSION_NORMALIZATION,
+        )
+        # Re-ranker được gắn vào khi tải xong; trước đó tìm kiếm giữ nguyên thứ tự đã hợp nhất
+        self.reranker: Optional[CrossEncoderReranker] = None
+
+        # Các hàm được gọi khi một tài liệu được lập chỉ mục/xóa, để các cache phía trên tự làm mới
+        self.document_listeners: List[Callable[[str, Optional[str]], None]] = []
+
+        self.warmup.submit(VECTOR_STORE_COMPONENT, self._init_vector_store)
+        self.warmup.submit(KEYWORD_INDEX_COMPONENT, self._init_keyword_store)
+        if settings.RERANKER_ENABLED:
+            self.warmup.submit(RERANKER_COMPONENT, self._init_reranker, required=False)
+        logger.info("VectorStoreManager đã khởi tạo, các thành phần nặng đang được tải ở nền.")
+
+    def _init_vector_store(self):
+        """Vector Store (ChromaDB) cho tìm kiếm ngữ nghĩa, kèm mô hình embedding."""
         self.client = chromadb.PersistentClient(path=settings.VECTOR_STORE_PATH)
         self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=settings.EMBEDDING_MODEL_NAME)
         self.collection = self.client.get_or_create_collection(name="rag_document_collection", embedding_function=self.embedding_function)
+        self.embedding_cache = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.embedding_cache = EmbeddingCache(
+                settings.EMBEDDING_CACHE_PATH,
+                model_name=settings.EMBEDDING_MODEL_NAME,
+                max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            )
+        self.embedding_pipeline = EmbeddingPipeline(
+            self.embedding_function,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            num_workers=settings.EMBEDDING_WORKERS,
+            cache=self.embedding_cache,
+        )
 
-        # --- Khởi tạo Keyword Store (BM25) cho tìm kiếm từ khóa ---
-        self.keyword_index_path = os.path.join(settings.PROJECT_ROOT, "data", "keyword_index.json")
+    def _init_keyword_store(self):
+        """Keyword Store (BM25) cho tìm kiếm từ khóa; dựng sẵn ma trận BM25 để truy vấn đầu tiên không phải chờ."""
+        self.keyword_store = KeywordSegmentStore(
+            settings.KEYWORD_STORE_PATH,
+            segment_max_bytes=settings.KEYWORD_SEGMENT_MAX_BYTES,
+            compaction_min_segments=settings.KEYWORD_COMPACTION_MIN_SEGMENTS,
+        )
+        self.content_store = ChunkContentStore(os.path.join(settings.KEYWORD_STORE_PATH, "content.dat"))
         self._load_keyword_index()
+        self.keyword_index.matrix()
+        self._backfill_document_registry()
+
+    def _init_reranker(self):
+        self.reranker = CrossEncoderReranker(
+            settings.RERANKER_MODEL_NAME,
+            batch_size=settings.RERANKER_BATCH_SIZE,
+            max_candidates=settings.RERANKER_MAX_CANDIDATES,
+            time_budget_ms=settings.RERANKER_TIME_BUDGET_MS,
+            cache_size=settings.RERANKER_CACHE_SIZE,
+        )
+
+    def wait_until_ready(self, timeout: Optional[float] = None):
+        """Chờ Chroma và chỉ mục từ khóa tải xong (ném ComponentNotReady nếu quá timeout hoặc lỗi)."""
+        self.warmup.wait(STORE_COMPONENTS, timeout=timeout)
 
-        print("VectorStoreManager đã sẵn sàng.")
+    def add_document_listener(self, listener: Callable[[str, Optional[str]], None]):
+        """Đăng ký listener(event, document_id) với event là "indexed", "deleted" hoặc "cleared"."""
+        self.document_listeners.append(listener)
+
+    def _notify_listeners(self, event: str, document_id: Optional[str] = None):
+        for listener in self.document_listeners:
+            try:
+                listener(event, document_id)
+            except Exception as e:
+                logger.exception(f"Lỗi trong listener của VectorStoreManager ({event}): {e}")
 
     def _load_keyword_index(self):
-        """Tải chỉ mục từ khóa từ file JSON vào bộ nhớ."""
-        self.keyword_corpus = {} # Lưu trữ {chunk_id: {"tokens": [...], "content": "...", "metadata": {...}}}
+        """Tải chỉ mục từ khóa từ kho segment vào bộ nhớ (tự chuyển đổi dữ liệu định dạng cũ nếu có)."""
+        self.chunk_metadata: Dict[str, Dict[str, Any]] = {} # Nội dung chunk nằm trong content_store, không giữ trong RAM
+        self.keyword_index = KeywordIndex()
         try:
-            if os.path.exists(self.keyword_index_path):
-                with open(self.keyword_index_path, 'r', encoding='utf-8') as f:
-                    self.keyword_corpus = json.load(f)
-                print(f"Đã tải {len(self.keyword_corpus)} chunks vào chỉ mục từ khóa.")
+            migrated, count = self.keyword_store.migrate_from_json(self.keyword_index_path)
+            if migrated:
+                logger.info(f"Đã chuyển {count} chunks từ keyword_index.json sang kho segment.")
+            records = self.keyword_store.load()
+            self._migrate_inline_records(records)
+            self._retokenize_if_needed(records)
+            for chunk_id, data in records.items():
+                metadata = data['metadata']
+                # Các chunk cùng tài liệu dùng chung một chuỗi document_id/source
+                for key in ("document_id", "source"):
+                    if isinstance(metadata.get(key), str):
+                        metadata[key] = sys.intern(metadata[key])
+                self.keyword_index.add_chunk_counts(chunk_id, metadata.get('document_id', ''), data['terms'])
+                self.chunk_metadata[chunk_id] = metadata
+            logger.info(f"Đã tải {len(self.chunk_metadata)} chunks vào chỉ mục từ khóa.")
         except (IOError, json.JSONDecodeError) as e:
-            print(f"Lỗi khi tải chỉ mục từ khóa, sẽ tạo mới: {e}")
-            self.keyword_corpus = {}
+            logger.warning(f"Lỗi khi tải chỉ mục từ khóa, sẽ tạo mới: {e}")
+            self.chunk_metadata = {}
+            self.keyword_index = KeywordIndex()
 
-    def _save_keyword_index(self):
-        """Lưu chỉ mục từ khóa từ bộ nhớ vào file JSON."""
-        try:
-            with open(self.keyword_index_path, 'w', encoding='utf-8') as f:
-                json.dump(self.keyword_corpus, f, ensure_ascii=False, indent=4)
-        except IOError as e:
-            print(f"Lỗi khi lưu chỉ mục từ khóa: {e}")
-
-    def add_document(self, file_path: str, document_id: str):
-        """Thêm một tài liệu mới vào cả hai hệ thống lưu trữ."""
-        chunks = load_and_split_document(file_path)
-        if not chunks: return
-        
-        ids = [f"{document_id}_{i}" for i in range(len(chunks))]
-        contents = [chunk.page_content for chunk in chunks]
-        metadatas = [{"document_id": document_id, "source": os.path.basename(chunk.metadata.get("source", file_path)), "page": chunk.metadata.get("page", 0)} for chunk in chunks]
-        
-        # 1. Thêm vào Vector Store
-        self.collection.add(ids=ids, documents=contents, metadatas=metadatas)
-        print(f"Đã thêm {len(contents)} chunks vào vector store.")
-        
-        # 2. Thêm vào Keyword Store
-        for i, content in enumerate(contents):
-            chunk_id = ids[i]
-            # Tokenize (tách từ) đơn giản bằng cách tách khoảng trắng
-            tokenized_text = content.lower().split()
-            self.keyword_corpus[chunk_id] = {
-                "tokens": tokenized_text,
-                "content": content,
-                "metadata": metadatas[i]
-            }
-        self._save_keyword_index()
-        print(f"Đã thêm {len(contents)} chunks vào keyword index.")
+    def _migrate_inline_records(self, records: Dict[str, dict]):
+        """Chuyển bản ghi định dạng cũ (danh sách token và nội dung nằm ngay trong bản ghi) sang dạng gọn."""
+        legacy = {chunk_id: data for chunk_id, data in records.items() if "content" in data}
+        if not legacy:
+            return
+        logger.info(f"Đang chuyển {len(legacy)} chunks sang định dạng lưu trữ gọn...")
+        self.content_store.put_many({chunk_id: data["content"] for chunk_id, data in legacy.items()})
+        compact = {
+            chunk_id: {"terms": dict(Counter(data.get("tokens", []))), "metadata": data["metadata"]}
+            for chunk_id, data in legacy.items()
+        }
+        self.keyword_store.put_many(compact)
+        records.update(compact)
 
-    def delete_document(self, document_id: str):
-        """Xóa một tài liệu khỏi cả hai hệ thống lưu trữ."""
-        # 1. Xóa khỏi Vector Store
-        self.collection.delete(where={"document_id": document_id})
-        
-        # 2. Xóa khỏi Keyword Store
-        ids_to_delete = [chunk_id for chunk_id in self.keyword_corpus if chunk_id.startswith(document_id)]
-        for chunk_id in ids_to_delete:
-            del self.keyword_corpus[chunk_id]
-        self._save_keyword_index()
-        print(f"Đã xóa các chunks của document_id: {document_id} khỏi cả hai store.")
-
-    def search(self, query: str, k: int = 5, document_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    def _term_freqs(self, content: str) -> Dict[str, int]:
+        return dict(Counter(self.tokenizer.tokenize(content)))
+
+    @staticmethod
+    def _chunk_metadata(document_id: str, file_path: str, chunk: Any, chunk_index: int) -> Dict[str, Any]:
+        return {
+            "document_id": document_id,
+            "source": os.path.basename(chunk.metadata.get("source", file_path)),
+            "page": chunk.metadata.get("page", 0),
+            "chunk_index": chunk_index,
+            "content_hash": content_hash(chunk.page_content),
+        }
+
+    def _write_chunks(self, document_id: str, ids: List[str], contents: List[str], metadatas: List[Dict[str, Any]], embeddings: List[Any]):
+        # 1. Thêm vào Vector Store với embedding đã tính sẵn
+        self.collection.add(ids=ids, documents=contents, metadatas=metadatas, embeddings=embeddings)
+
+        # 2. Thêm vào Keyword Store: nội dung vào content_store, {term: tf} vào kho segment
+        self.content_store.put_many(dict(zip(ids, contents)))
+        new_records = {}
+        for chunk_id, content, metadata in zip(ids, contents, metadatas):
+            term_freqs = self._term_freqs(content)
+            new_records[chunk_id] = {"terms": term_freqs, "metadata": metadata}
+            self.keyword_index.add_chunk_counts(chunk_id, document_id, term_freqs)
+            self.chunk_metadata[chunk_id] = metadata
+        self.keyword_store.put_many(new_records)
+
+    def _remove_chunks(self, chunk_ids: List[str]):
+        """Xóa các chunk khỏi cả hai store (ghi tombstone vào kho segment của keyword store)."""
+        if not chunk_ids:
+            return
+        for start in range(0, len(chunk_ids), CHROMA_BATCH_SIZE):
+            self.collection.delete(ids=chunk_ids[start:start + CHROMA_BATCH_SIZE])
+        for chunk_id in chunk_ids:
+            self.keyword_index.remove_chunk(chunk_id)
+            self.chunk_metadata.pop(chunk_id, None)
+        self.keyword_store.delete_many(chunk_ids)
+        self.content_store.delete_many(chunk_ids)
+
+    def _update_chunk_metadata(self, updates: List[Tuple[str, Dict[str, Any]]]):
+        """Cập nhật metadata (trang, vị trí, nguồn) của các chunk giữ nguyên nội dung, không embedding lại."""
+        for start in range(0, len(updates), CHROMA_BATCH_SIZE):
+            batch = updates[start:start + CHROMA_BATCH_SIZE]
+            self.collection.update(ids=[chunk_id for chunk_id, _ in batch], metadatas=[metadata for _, metadata in batch])
+        self.chunk_metadata.update(updates)
+        self.keyword_store.patch_many({chunk_id: {"metadata": metadata} for chunk_id, metadata in updates})
+
+    def _retokenize_if_needed(self, records: Dict[str, dict]):
+        """Dựng lại {term: tf} của toàn bộ kho khi bộ tách từ hiện tại khác bộ đã tạo ra chỉ mục."""
+        # Kho tạo trước khi ghi phiên bản tách từ đều dùng cách tách theo khoảng trắng
+        stored_version = self.keyword_store.tokenizer_version or (WhitespaceTokenizer().version if records else None)
+        if stored_version == self.tokenizer.version:
+            return
+        if records:
+            logger.info(f"Bộ tách từ đã thay đổi ({stored_version} -> {self.tokenizer.version}), đang dựng lại chỉ mục từ khóa...")
+            for chunk_id, data in records.items():
+                data['terms'] = self._term_freqs(self.content_store.get(chunk_id) or "")
+            self.keyword_store.put_many(records)
+        self.keyword_store.set_tokenizer_version(self.tokenizer.version)
+
+    def _backfill_document_registry(self):
         """
-        Thực hiện tìm kiếm lai (Hybrid Search): kết hợp Semantic và Keyword search.
+        Đăng ký các tài liệu đã nạp trước khi có sổ đăng ký. Chỉ chạy một lần: cờ được lưu trong
+        bảng meta của sổ (không dựa vào số dòng, vì tài liệu tải lên trong lúc khởi động cũng được
+        đăng ký). Tài liệu đã có trong sổ được giữ nguyên.
         """
-        # 1. TÌM KIẾM NGỮ NGHĨA (SEMANTIC SEARCH)
-        print("Bắt đầu Semantic Search...")
-        where_filter = {"document_id": document_id} if document_id else {}
+        if self.document_registry.get_meta(REGISTRY_BACKFILL_KEY):
+            return
+        uploaded_files = {}
+        if os.path.isdir(settings.UPLOAD_PATH):
+            for filename in os.listdir(settings.UPLOAD_PATH):
+                uploaded_files.setdefault(filename.split("_", 1)[0], filename)
+        backfilled = 0
+        for document_id in list(self.keyword_index.document_chunks):
+            if self.document_registry.get(document_id) is not None:
+                continue
+            filename = uploaded_files.get(document_id, "")
+            file_path = os.path.join(settings.UPLOAD_PATH, filename) if filename else ""
+            self.document_registry.register(document_id, filename.split("_", 1)[-1], file_path, status="ready")
+            chunk_ids = sorted(self.keyword_index.get_document_chunk_ids(document_id), key=lambda chunk_id: (len(chunk_id), chunk_id))
+            self.document_registry.set_chunks(document_id, enumerate(chunk_ids))
+            backfilled += 1
+        self.document_registry.set_meta(REGISTRY_BACKFILL_KEY, "1")
+        if backfilled:
+            logger.info(f"Đã đăng ký {backfilled} tài liệu có sẵn vào sổ đăng ký tài liệu.")
+
+    def add_document(self, file_path: str, document_id: str, progress_callback: Optional[Callable[[str, int], None]] = None):
+        """Thêm một tài liệu mới vào cả hai hệ thống lưu trữ (trường hợp riêng của update_document)."""
+        self.update_document(file_path, document_id, progress_callback=progress_callback)
+
+    def update_document(self, file_path: str, document_id: str, progress_callback: Optional[Callable[[str, int], None]] = None):
+        """
+        Nạp (lại) một tài liệu từ file, chỉ embedding những chunk có nội dung thay đổi.
+        - Chunk được nhận diện bằng hash nội dung: chunk đã có giữ nguyên id (chỉ cập nhật
+          metadata nếu trang/vị trí đổi), chunk mới được embedding và thêm vào với id mới,
+          chunk không còn xuất hiện bị xóa khỏi cả hai store.
+        - Chunk chỉ có ở một trong hai store (lần nạp trước bị gián đoạn) bị xóa và ghi lại.
+        Các chunk được đọc và chia theo kiểu stream, đi thẳng vào pipeline embedding.
+        progress_callback(stage, processed_chunks) được gọi khi chuyển giai đoạn parse/embed/index.
+        """
+        start = time.perf_counter()
+        report = progress_callback or (lambda stage, processed_chunks: None)
+        report("parse", 0)
+        registered = self.document_registry.get(document_id)
+        if registered is None or registered["file_path"] != file_path:
+            filename = os.path.basename(file_path)
+            self.document_registry.register(document_id, filename[len(document_id) + 1:] if filename.startswith(f"{document_id}_") else filename, file_path, status="indexing")
+        else:
+            self.document_registry.set_status(document_id, "indexing")
+
+        # Sắp theo (độ dài, id) để {document_id}_2 đứng trước {document_id}_10
+        indexed_ids = sorted(self.keyword_index.get_document_chunk_ids(document_id), key=lambda chunk_id: (len(chunk_id), chunk_id))
+        vector_ids = self.collection.get(where={"document_id": document_id}, include=[])["ids"]
+        indexed_set, vector_set = set(indexed_ids), set(vector_ids)
+        stale_ids = sorted(indexed_set ^ vector_set)
+        reusable: Dict[str, List[str]] = {}
+        for chunk_id in indexed_ids:
+            if chunk_id in vector_set:
+                chunk_hash = self.chunk_metadata[chunk_id].get("content_hash") or content_hash(self.content_store.get(chunk_id) or "")
+                reusable.setdefault(chunk_hash, []).append(chunk_id)
+        # Id mới tiếp nối id lớn nhất đã dùng để không trùng với chunk cũ
+        next_index = max((int(suffix) + 1 for suffix in (chunk_id.rsplit("_", 1)[-1] for chunk_id in indexed_set | vector_set) if suffix.isdigit()), default=0)
+        metadata_updates: List[Tuple[str, Dict[str, Any]]] = []
+        document_chunks: List[Tuple[int, str]] = []
+        kept = 0
+
+        def changed_records():
+            nonlocal next_index, kept
+            for i, chunk in enumerate(iter_document_chunks(file_path)):
+                metadata = self._chunk_metadata(document_id, file_path, chunk, i)
+                candidates = reusable.get(metadata["content_hash"])
+                if candidates:
+                    chunk_id = candidates.pop(0)
+                    document_chunks.append((i, chunk_id))
+                    kept += 1
+                    if self.chunk_metadata[chunk_id] != metadata:
+                        metadata_updates.append((chunk_id, metadata))
+                    continue
+                chunk_id = f"{document_id}_{next_index}"
+                document_chunks.append((i, chunk_id))
+                yield chunk_id, chunk.page_content, metadata
+                next_index += 1
+
+        stats = self.embedding_pipeline.run(
+            changed_records(), functools.partial(self._write_chunks, document_id), lambda processed: report("embed", processed)
+        )
+        removed_ids = stale_ids + [chunk_id for ids in reusable.values() for chunk_id in ids]
+        index_start = time.perf_counter()
+        self._remove_chunks(removed_ids)
+        self._update_chunk_metadata(metadata_updates)
+        if not self.document_registry.set_chunks(document_id, document_chunks):
+            logger.warning(f"Tài liệu {document_id} đã bị xóa khỏi sổ đăng ký trong lúc nạp.")
+        self._record_ingestion_metrics(stats, time.perf_counter() - index_start, time.perf_counter() - start, kept, len(removed_ids), len(metadata_updates))
+        if not (stats.chunks or removed_ids or metadata_updates): return
+        report("index", kept + stats.chunks)
+        self._notify_listeners("indexed", document_id)
+        logger.info(
+            f"Đã nạp tài liệu {document_id}: thêm {stats.chunks}, giữ nguyên {kept}, xóa {len(removed_ids)} chunks "
+            f"({stats.batches} batch, {time.perf_counter() - start:.2f}s, {stats.chunks_per_second:.1f} chunks/s, "
+            f"{stats.cache_hits} chunk lấy từ cache embedding)."
+        )
+
+    @staticmethod
+    def _record_ingestion_metrics(stats: EmbeddingStats, cleanup_seconds: float, total_seconds: float, kept: int, removed: int, metadata_updated: int):
+        INGESTION_STAGE_SECONDS.observe(stats.parse_seconds, stage="parse")
+        INGESTION_STAGE_SECONDS.observe(stats.embed_seconds, stage="embed")
+        INGESTION_STAGE_SECONDS.observe(stats.write_seconds + cleanup_seconds, stage="index")
+        INGESTION_STAGE_SECONDS.observe(total_seconds, stage="total")
+        INGESTION_CHUNKS.inc(stats.chunks, result="added")
+        INGESTION_CHUNKS.inc(kept, result="kept")
+        INGESTION_CHUNKS.inc(removed, result="removed")
+        INGESTION_CHUNKS.inc(metadata_updated, result="metadata_updated")
+        INGESTION_DOCUMENTS.inc(status="indexed")
+
+    def delete_document(self, document_id: str):
+        """Xóa một tài liệu khỏi cả hai hệ thống lưu trữ và khỏi sổ đăng ký."""
+        registered = self.document_registry.get(document_id)
+        # 1. Xóa khỏi Vector Store: theo danh sách chunk id nếu tài liệu đã nạp xong,
+        # nếu không (lần nạp dở dang) thì lọc theo metadata để không sót chunk nào
+        if registered is not None and registered["status"] == "ready":
+            chunk_ids = set(self.document_registry.get_chunk_ids(document_id))
+            chunk_ids.update(self.keyword_index.get_document_chunk_ids(document_id))
+            self._remove_chunks(list(chunk_ids))
+        else:
+            self.collection.delete(where={"document_id": document_id})
+            # 2. Xóa khỏi Keyword Store
+            deleted_ids = self.keyword_index.remove_document(document_id)
+            for chunk_id in deleted_ids:
+                self.chunk_metadata.pop(chunk_id, None)
+            self.keyword_store.delete_many(deleted_ids)
+            self.content_store.delete_many(deleted_ids)
+        self.document_registry.remove(document_id)
+        self._notify_listeners("deleted", document_id)
+        logger.info(f"Đã xóa các chunks của document_id: {document_id} khỏi cả hai store.")
+
+    def embed_query(self, query: str) -> Any:
+        """Tính embedding cho câu hỏi (dùng chung cho tìm kiếm ngữ nghĩa và cache câu trả lời)."""
+        with span("embed_query"):
+            return self.embedding_function([query])[0]
+
+    @staticmethod
+    def _document_filter(document_ids: Optional[Sequence[str]]) -> Optional[Dict[str, Any]]:
+        """Bộ lọc where của Chroma cho một tập tài liệu (Chroma lọc metadata trước khi tìm láng giềng)."""
+        if document_ids is None:
+            return None # Chroma mới từ chối where rỗng ({}), không lọc thì bỏ hẳn tham số
+        if len(document_ids) == 1:
+            return {"document_id": document_ids[0]}
+        return {"document_id": {"$in": list(document_ids)}}
+
+    def _semantic_search(self, query_embedding: Any, depth: int, document_ids: Optional[Sequence[str]]) -> Dict[str, Any]:
+        where_filter = self._document_filter(document_ids)
         # SỬA LỖI: Bỏ "ids" khỏi danh sách include vì nó không được hỗ trợ trong một số phiên bản
         vector_results = self.collection.query(
-            query_texts=[query], n_results=k*2, where=where_filter, include=["metadatas", "documents"]
+            query_embeddings=[query_embedding], n_results=depth, where=where_filter, include=["metadatas", "documents", "distances"]
         )
-        vector_chunks = []
+        chunks, ranked = {}, []
         if vector_results and vector_results['ids']:
             for i, chunk_id in enumerate(vector_results['ids'][0]):
-                vector_chunks.append({
+                chunks[chunk_id] = {
                     "id": chunk_id,
                     "content": vector_results['documents'][0][i],
                     "metadata": vector_results['metadatas'][0][i]
-                })
+                }
+                # Khoảng cách càng nhỏ càng liên quan, đổi sang điểm càng lớn càng tốt
+                ranked.append((chunk_id, 1.0 / (1.0 + vector_results['distances'][0][i])))
+        return {"chunks": chunks, "ranked": ranked}
 
-        # 2. TÌM KIẾM TỪ KHÓA (KEYWORD SEARCH)
-        print("Bắt đầu Keyword Search...")
-        corpus_to_search = {chunk_id: data['tokens'] for chunk_id, data in self.keyword_corpus.items() 
-                            if not document_id or data['metadata'].get('document_id') == document_id}
-        
-        keyword_chunks = []
-        if corpus_to_search:
-            tokenized_corpus = list(corpus_to_search.values())
-            chunk_ids = list(corpus_to_search.keys())
-            
-            bm25 = BM25Okapi(tokenized_corpus)
-            tokenized_query = query.lower().split()
-            
-            top_n_indices = bm25.get_top_n(tokenized_query, range(len(tokenized_corpus)), n=k*2)
-            
-            for i in top_n_indices:
-                chunk_id = chunk_ids[i]
-                original_chunk = self.keyword_corpus[chunk_id]
-                keyword_chunks.append({
-                    "id": chunk_id,
-                    "content": original_chunk['content'],
-                    "metadata": original_chunk['metadata']
-                })
+    def _keyword_search(self, query: str, depth: int, document_ids: Optional[Sequence[str]]) -> Dict[str, Any]:
+        # Chỉ duyệt postings của các từ trong câu hỏi (và của riêng tập tài liệu nếu có bộ lọc)
+        tokenized_query = self.tokenizer.tokenize(query)
+        ranked = self.keyword_index.search(tokenized_query, k=depth, document_ids=document_ids)
+        chunks = {}
+        for chunk_id, _score in ranked:
+            chunks[chunk_id] = {
+                "id": chunk_id,
+                "content": self.content_store.get(chunk_id),
+                "metadata": self.chunk_metadata[chunk_id]
+            }
+        return {"chunks": chunks, "ranked": ranked}
 
-        # 3. TÁI XẾP HẠNG (RE-RANKING)
-        print("Bắt đầu Re-ranking...")
-        ranked_results = {}
-        
-        for i, chunk in enumerate(vector_chunks):
-            ranked_results[chunk['id']] = 1 / (i + 60)
-        
-        for i, chunk in enumerate(keyword_chunks):
-            chunk_id = chunk['id']
-            score = 1 / (i + 60)
-            if chunk_id in ranked_results:
-                ranked_results[chunk_id] += score
-            else:
-                ranked_results[chunk_id] = score
-        
-        sorted_ids = sorted(ranked_results.keys(), key=lambda x: ranked_results[x], reverse=True)
-        
-        final_chunks = []
-        all_found_chunks = {c['id']: c for c in vector_chunks + keyword_chunks}
-        for chunk_id in sorted_ids:
-            if len(final_chunks) >= k:
-                break
-            if chunk_id in all_found_chunks:
-                final_chunks.append(all_found_chunks[chunk_id])
-        
-        return final_chunks
+    def search_with_stats(self, query: str, k: int = 5, document_ids: Optional[Sequence[str]] = None, query_embedding: Optional[Any] = None) -> SearchResult:
+        """
+        Thực hiện tìm kiếm lai (Hybrid Search): Semantic và Keyword search chạy song song,
+        sau đó kết quả được hợp nhất bởi fusion_strategy. Trả về kèm thời gian của từng giai đoạn (ms).
+        document_ids giới hạn tìm kiếm trong một tập tài liệu (None = toàn bộ kho).
+        """
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        if document_ids is not None:
+            document_ids = list(dict.fromkeys(document_ids))
+            if not document_ids:
+                return SearchResult(chunks=[], timings={"total_ms": 0.0})
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+            timings["embed_query_ms"] = (time.perf_counter() - start) * 1000
+
+        def timed(stage: str, func, *args):
+            stage_start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                seconds = time.perf_counter() - stage_start
+                timings[f"{stage}_ms"] = seconds * 1000
+                record_stage(stage, seconds)
+
+        # 1 + 2. TÌM KIẾM NGỮ NGHĨA và TỪ KHÓA chạy đồng thời
+        logger.debug("Bắt đầu Semantic Search và Keyword Search...")
+        # Chạy trong bản sao context hiện tại để span của luồng phụ vẫn thuộc về yêu cầu đang xử lý
+        semantic_future = self.search_executor.submit(
+            contextvars.copy_context().run,
+            timed, "vector_query", self._semantic_search, query_embedding, max(k, settings.SEMANTIC_SEARCH_DEPTH), document_ids
+        )
+        keyword_result = timed("keyword_query", self._keyword_search, query, max(k, settings.KEYWORD_SEARCH_DEPTH), document_ids)
+        semantic_result = semantic_future.result()
+
+        # 3. HỢP NHẤT KẾT QUẢ (FUSION)
+        logger.debug("Bắt đầu hợp nhất kết quả...")
+        fused = timed("fusion", self.fusion_strategy.fuse, {
+            "semantic": semantic_result["ranked"],
+            "keyword": keyword_result["ranked"],
+        })
+        all_found_chunks = {**keyword_result["chunks"], **semantic_result["chunks"]}
+        fused_chunks = [all_found_chunks[chunk_id] for chunk_id, _score in fused]
+
+        # 4. TÁI XẾP HẠNG BẰNG CROSS-ENCODER (TÙY CHỌN)
+        if self.reranker is not None and len(fused_chunks) > 1:
+            fused_chunks, _rerank_stats = timed("rerank", self.reranker.rerank, query, fused_chunks)
+        final_chunks = fused_chunks[:k]
+
+        timings["total_ms"] = (time.perf_counter() - start) * 1000
+        return SearchResult(chunks=final_chunks, timings=timings)
+
+    def search(self, query: str, k: int = 5, document_ids: Optional[Sequence[str]] = None, query_embedding: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """Tìm kiếm lai, chỉ trả về danh sách chunk (xem search_with_stats)."""
+        return self.search_with_stats(query, k=k, document_ids=document_ids, query_embedding=query_embedding).chunks
 
     def get_all_chunks_for_document(self, document_id: str) -> List[str]:
+        """Toàn văn tài liệu theo thứ tự chunk, lấy qua sổ đăng ký (tài liệu cũ chưa đăng ký thì lọc trong Chroma)."""
+        chunk_ids = self.document_registry.get_chunk_ids(document_id)
+        if chunk_ids:
+            return [content for content in self.content_store.get_many(chunk_ids) if content is not None]
         results = self.collection.get(where={"document_id": document_id})
         return results.get('documents', [])
 
@@ -178,20 +511,25 @@ class VectorStoreManager:
         except Exception: deleted_collections = 0
         
         deleted_files = 0
-        for filename in os.listdir(settings.UPLOAD_PATH):
+        for filename in os.listdir(settings.UPLOAD_PATH) if os.path.isdir(settings.UPLOAD_PATH) else []:
             file_path = os.path.join(settings.UPLOAD_PATH, filename)
             try:
                 if os.path.isfile(file_path): os.unlink(file_path)
                 deleted_files += 1
-            except Exception as e: print(f'Lỗi khi xóa {file_path}. Lý do: {e}')
+            except Exception as e: logger.error(f'Lỗi khi xóa {file_path}. Lý do: {e}')
         
+        self.keyword_store.clear()
+        self.content_store.clear()
+        self.document_registry.clear()
         for file_to_delete in [self.keyword_index_path, os.path.join(settings.PROJECT_ROOT, "data", "state.json")]:
             if os.path.exists(file_to_delete):
                 try:
                     os.remove(file_to_delete)
-                    print(f"Đã xóa file: {os.path.basename(file_to_delete)}")
+                    logger.info(f"Đã xóa file: {os.path.basename(file_to_delete)}")
                 except OSError as e:
-                    print(f"Lỗi khi xóa file {os.path.basename(file_to_delete)}: {e}")
+                    logger.error(f"Lỗi khi xóa file {os.path.basename(file_to_delete)}: {e}")
         
-        self.keyword_corpus = {}
+        self.chunk_metadata = {}
+        self.keyword_index.clear()
+        self._notify_listeners("cleared")
         return {"deleted_collections": deleted_collections, "deleted_files": deleted_files}
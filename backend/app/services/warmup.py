@@ -0,0 +1,130 @@
+# backend/app/services/warmup.py
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ComponentNotReady(Exception):
+    """Thành phần chưa sẵn sàng sau thời gian chờ cho phép (hoặc đã khởi tạo lỗi)."""
+
+    def __init__(self, component: str, state: str, error: Optional[str] = None):
+        self.component = component
+        self.state = state
+        self.error = error
+        message = f"Thành phần '{component}' chưa sẵn sàng (trạng thái: {state})"
+        super().__init__(f"{message}: {error}" if error else message)
+
+@dataclass
+class ComponentStatus:
+    name: str
+    required: bool
+    state: str = "pending" # pending | loading | ready | failed
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        seconds = None
+        if self.started_at is not None:
+            seconds = round((self.finished_at or time.monotonic()) - self.started_at, 3)
+        return {"state": self.state, "required": self.required, "seconds": seconds, "error": self.error}
+
+class Warmup:
+    """
+    Khởi động theo giai đoạn: các thành phần nặng (mô hình embedding + Chroma, chỉ mục từ khóa,
+    re-ranker...) được tải song song trên các luồng nền, nên API trả lời ngay khi tiến trình lên.
+    Mỗi thành phần có trạng thái riêng (cho /health/ready) và có thể phụ thuộc thành phần khác.
+    Thời gian tới khi sẵn sàng được ghi log theo từng thành phần, tính từ lúc bắt đầu khởi động.
+    Sử dụng mẫu Singleton để đảm bảo chỉ có một instance được tạo ra.
+    """
+    _instance = None
+
+    def __new__(cls, max_workers: int = 4):
+        if cls._instance is None:
+            cls._instance = super(Warmup, cls).__new__(cls)
+            cls._instance._init_warmup(max_workers)
+        return cls._instance
+
+    def _init_warmup(self, max_workers: int):
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._components: Dict[str, ComponentStatus] = {}
+        self._done: Dict[str, threading.Event] = {}
+        self._finished_logged = False
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="warmup")
+
+    def submit(self, name: str, loader: Callable[[], Any], depends_on: Iterable[str] = (), required: bool = True):
+        """Lên lịch tải một thành phần; loader chạy sau khi các thành phần trong depends_on đã sẵn sàng."""
+        depends_on = list(depends_on)
+        with self._lock:
+            self._components[name] = ComponentStatus(name=name, required=required)
+            self._done[name] = threading.Event()
+            self._finished_logged = False
+        self._executor.submit(self._run, name, loader, depends_on)
+
+    def _run(self, name: str, loader: Callable[[], Any], depends_on: List[str]):
+        status = self._components[name]
+        try:
+            for dependency in depends_on:
+                self.wait([dependency], timeout=None)
+            status.started_at = time.monotonic()
+            status.state = "loading"
+            loader()
+            status.finished_at = time.monotonic()
+            status.state = "ready"
+            logger.info(
+                f"Khởi động: '{name}' sẵn sàng sau {status.finished_at - status.started_at:.2f}s "
+                f"(t+{status.finished_at - self.started_at:.2f}s)."
+            )
+        except Exception as e:
+            status.finished_at = time.monotonic()
+            status.state = "failed"
+            status.error = str(e)
+            logger.error(f"Khởi động: '{name}' lỗi sau t+{status.finished_at - self.started_at:.2f}s: {e}")
+        finally:
+            self._done[name].set()
+            with self._lock:
+                finished = all(event.is_set() for event in self._done.values()) and not self._finished_logged
+                self._finished_logged = self._finished_logged or finished
+            if finished:
+                state = "sẵn sàng" if self.is_ready() else "có thành phần bắt buộc bị lỗi"
+                logger.info(f"Khởi động: hoàn tất sau {time.monotonic() - self.started_at:.2f}s ({state}).")
+
+    def wait(self, names: Iterable[str], timeout: Optional[float] = None):
+        """Chờ các thành phần sẵn sàng trong tổng thời gian timeout (None = chờ mãi); nếu không thì ném ComponentNotReady."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name in names:
+            event = self._done.get(name)
+            if event is None:
+                raise ComponentNotReady(name, "unknown")
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            event.wait(remaining)
+            status = self._components[name]
+            if status.state != "ready":
+                raise ComponentNotReady(name, status.state, status.error)
+
+    def is_ready(self, names: Optional[Iterable[str]] = None) -> bool:
+        """Các thành phần đã sẵn sàng chưa (mặc định: mọi thành phần bắt buộc)."""
+        with self._lock:
+            if names is None:
+                components = [c for c in self._components.values() if c.required]
+            else:
+                components = [self._components.get(name) for name in names]
+        return all(c is not None and c.state == "ready" for c in components)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            components = {name: status.to_dict() for name, status in self._components.items()}
+        return {
+            "ready": self.is_ready(),
+            "uptime_seconds": round(time.monotonic() - self.started_at, 3),
+            "components": components,
+        }
+
+def get_warmup() -> Warmup:
+    return Warmup(max_workers=settings.STARTUP_WORKERS)
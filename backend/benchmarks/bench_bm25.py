@@ -0,0 +1,94 @@
+# backend/benchmarks/bench_bm25.py
+"""
+Microbenchmark chấm điểm BM25: BM25Okapi.get_top_n (rank_bm25, dựng trên toàn bộ
+danh sách token như cách tìm kiếm từ khóa ban đầu) so với KeywordIndex.search
+(ma trận CSR + NumPy) ở nhiều kích thước kho, có và không có bộ lọc tài liệu.
+Trường hợp ghi-rồi-truy-vấn: thêm một batch chunk (như một lần nạp tài liệu) rồi truy vấn ngay.
+Cột "dựng đồng bộ" là chi phí khi truy vấn đầu tiên sau khi ghi phải dựng lại cả ma trận
+(cách làm trước đây); "ghi+câu" là truy vấn trên ma trận cũ + delta, còn "dựng nền" là thời gian
+dựng lại ở nền trước khi ma trận mới được thay vào.
+
+Chạy từ thư mục backend:  python -m benchmarks.bench_bm25 [--sizes 1000 5000 20000]
+"""
+import argparse
+import random
+import time
+
+from rank_bm25 import BM25Okapi
+
+from app.services.bm25_matrix import BM25Matrix
+from app.services.keyword_index import KeywordIndex
+from app.services.text_tokenizer import create_tokenizer
+from benchmarks.bench_keyword_memory import make_chunks
+from benchmarks.bench_tokenizer import SYLLABLES
+
+def timed(function, repeat: int) -> float:
+    """Thời gian trung bình mỗi lần gọi (ms)."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def bench_size(num_chunks: int, args, tokenizer):
+    chunks = list(make_chunks(num_chunks, args.words, args.chunks_per_document))
+    tokenized = [tokenizer.tokenize(content) for _, _, content in chunks]
+    rng = random.Random(num_chunks)
+    queries = [tokenizer.tokenize(" ".join(rng.choice(SYLLABLES) for _ in range(args.query_words))) for _ in range(args.queries)]
+    document_id = chunks[len(chunks) // 2][1]
+
+    start = time.perf_counter()
+    okapi = BM25Okapi(tokenized)
+    okapi_build = (time.perf_counter() - start) * 1000
+    okapi_queries = queries[:args.okapi_queries]
+    okapi_query = timed(lambda: [okapi.get_top_n(query, chunks, n=args.k) for query in okapi_queries], 1) / len(okapi_queries)
+
+    # Tắt dựng lại ở nền trong lúc đo để các phép đo không tranh CPU với nhau
+    index = KeywordIndex(rebuild_delay_seconds=3600)
+    for (chunk_id, chunk_document_id, _), tokens in zip(chunks, tokenized):
+        index.add_chunk(chunk_id, chunk_document_id, tokens)
+    matrix_build = timed(lambda: BM25Matrix.from_index(index), 1)
+    index.matrix() # Ma trận được dựng lười ở truy vấn đầu tiên; dựng trước để chỉ đo phần chấm điểm
+    csr_query = timed(lambda: [index.search(query, args.k) for query in queries], 1) / len(queries)
+    csr_filtered = timed(lambda: [index.search(query, args.k, [document_id]) for query in queries], 1) / len(queries)
+
+    # Ghi một batch chunk của tài liệu mới rồi truy vấn ngay
+    written = [(f"write-{chunk_id}", "write-doc", tokens) for (chunk_id, _, _), tokens in zip(chunks[:args.write_batch], tokenized)]
+    def write_batch():
+        for chunk_id, chunk_document_id, tokens in written:
+            index.add_chunk(chunk_id, chunk_document_id, tokens)
+    write_batch()
+    sync_rebuild = timed(lambda: BM25Matrix.from_index(index), 1) + csr_query
+    write_batch() # Ghi lại (thay thế) để ma trận đang dùng có delta
+    write_query = timed(lambda: [index.search(query, args.k) for query in queries], 1) / len(queries)
+    write_filtered = timed(lambda: [index.search(query, args.k, ["write-doc"]) for query in queries], 1) / len(queries)
+    background_rebuild = timed(index.rebuild_matrix, 1)
+
+    print(
+        f"{num_chunks:>8} {okapi_build:>12.0f} {okapi_query:>12.2f} {matrix_build:>12.0f} "
+        f"{csr_query:>10.2f} {csr_filtered:>10.2f} {okapi_query / csr_query:>8.0f}x "
+        f"{sync_rebuild:>13.0f} {write_query:>10.2f} {write_filtered:>10.2f} {background_rebuild:>10.0f}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--words", type=int, default=250)
+    parser.add_argument("--chunks-per-document", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--okapi-queries", type=int, default=20, help="BM25Okapi chậm nên chỉ đo trên ít câu hỏi hơn")
+    parser.add_argument("--query-words", type=int, default=6)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--write-batch", type=int, default=200, help="Số chunk ghi trước truy vấn trong trường hợp ghi-rồi-truy-vấn")
+    args = parser.parse_args()
+
+    tokenizer = create_tokenizer("vi")
+    print(f"Mỗi chunk {args.words} từ, câu hỏi {args.query_words} từ, top-{args.k} (thời gian tính bằng ms)")
+    print(
+        f"{'chunks':>8} {'okapi dựng':>12} {'okapi/câu':>12} {'csr dựng':>12} {'csr/câu':>10} {'csr lọc':>10} {'nhanh hơn':>9} "
+        f"{'dựng đồng bộ':>13} {'ghi+câu':>10} {'ghi+lọc':>10} {'dựng nền':>10}"
+    )
+    for size in args.sizes:
+        bench_size(size, args, tokenizer)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# backend/benchmarks/bench_keyword_memory.py
+"""
+Benchmark bộ nhớ của chỉ mục từ khóa BM25 khi nạp nhiều chunk.
+So sánh cách lưu cũ (mỗi chunk giữ nguyên nội dung + danh sách token trong RAM,
+postings dạng dict lồng nhau theo chuỗi) với cách lưu mới (KeywordIndex đánh số
+term/chunk bằng array, nội dung chunk nằm trong ChunkContentStore đọc qua mmap).
+Đo bằng tracemalloc (chỉ tính bộ nhớ cấp phát bởi Python), kèm thời gian nạp và truy vấn.
+
+Chạy từ thư mục backend:  python -m benchmarks.bench_keyword_memory [--chunks 20000]
+(tracemalloc làm chậm quá trình nạp nhiều lần, nên thời gian chỉ dùng để so sánh tương đối)
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+from app.services.content_store import ChunkContentStore
+from app.services.keyword_index import KeywordIndex
+from app.services.text_tokenizer import create_tokenizer
+from benchmarks.bench_tokenizer import FILLERS, SYLLABLES
+
+class LegacyKeywordIndex:
+    """Cấu trúc postings trước đây: {term: {document_id: {chunk_id: tf}}} (chỉ phần cần để đo)."""
+
+    def __init__(self):
+        self.postings = {}
+        self.doc_freqs = {}
+        self.chunk_lengths = {}
+        self.chunk_terms = {}
+        self.chunk_documents = {}
+        self.document_chunks = {}
+
+    def add_chunk(self, chunk_id, document_id, tokens):
+        term_freqs = Counter(tokens)
+        for term, tf in term_freqs.items():
+            self.postings.setdefault(term, {}).setdefault(document_id, {})[chunk_id] = tf
+            self.doc_freqs[term] = self.doc_freqs.get(term, 0) + 1
+        self.chunk_lengths[chunk_id] = len(tokens)
+        self.chunk_terms[chunk_id] = tuple(term_freqs)
+        self.chunk_documents[chunk_id] = document_id
+        self.document_chunks.setdefault(document_id, set()).add(chunk_id)
+
+def make_chunks(num_chunks: int, words_per_chunk: int, chunks_per_document: int, seed: int = 7):
+    rng = random.Random(seed)
+    vocabulary = SYLLABLES + [f"{rng.choice(SYLLABLES)}{i}" for i in range(5000)]
+    for index in range(num_chunks):
+        document_id = f"doc-{index // chunks_per_document:06d}"
+        words = [rng.choice(FILLERS) if rng.random() < 0.2 else rng.choice(vocabulary) for _ in range(words_per_chunk)]
+        yield f"{document_id}_{index % chunks_per_document}", document_id, " ".join(words)
+
+def measure(label: str, build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} {current / 2**20:>12.1f} {peak / 2**20:>12.1f} {elapsed:>9.1f}")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--words", type=int, default=250)
+    parser.add_argument("--chunks-per-document", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    tokenizer = create_tokenizer("vi")
+    workdir = tempfile.mkdtemp(prefix="bench_keyword_memory_")
+    print(f"{args.chunks} chunks x {args.words} từ ({args.chunks_per_document} chunks/tài liệu)")
+    print(f"{'cách lưu':<10} {'RAM (MB)':>12} {'đỉnh (MB)':>12} {'nạp (s)':>9}")
+
+    def build_legacy():
+        corpus, index = {}, LegacyKeywordIndex()
+        for chunk_id, document_id, content in make_chunks(args.chunks, args.words, args.chunks_per_document):
+            tokens = tokenizer.tokenize(content)
+            metadata = {"document_id": document_id, "source": f"{document_id}.pdf", "page": 0}
+            corpus[chunk_id] = {"content": content, "tokens": tokens, "metadata": metadata}
+            index.add_chunk(chunk_id, document_id, tokens)
+        return corpus, index
+
+    def build_compact():
+        store = ChunkContentStore(os.path.join(workdir, "content.dat"))
+        index, chunk_metadata, batch = KeywordIndex(), {}, {}
+        for chunk_id, document_id, content in make_chunks(args.chunks, args.words, args.chunks_per_document):
+            index.add_chunk_counts(chunk_id, document_id, Counter(tokenizer.tokenize(content)))
+            chunk_metadata[chunk_id] = {"document_id": document_id, "source": f"{document_id}.pdf", "page": 0}
+            batch[chunk_id] = content
+            if len(batch) >= 1000:
+                store.put_many(batch)
+                batch = {}
+        store.put_many(batch)
+        return store, index, chunk_metadata
+
+    legacy = measure("cũ", build_legacy)
+    del legacy
+    store, index, _chunk_metadata = measure("gọn", build_compact)
+
+    rng = random.Random(1)
+    queries = [tokenizer.tokenize(" ".join(rng.choice(SYLLABLES) for _ in range(4))) for _ in range(args.queries)]
+    start = time.perf_counter()
+    for tokens in queries:
+        for chunk_id, _score in index.search(tokens, k=10):
+            store.get(chunk_id)
+    elapsed = time.perf_counter() - start
+    print(f"Truy vấn (chỉ mục gọn + đọc nội dung top-10): {elapsed / len(queries) * 1000:.2f} ms/câu")
+    print(f"Kích thước file nội dung: {os.path.getsize(store.path) / 2**20:.1f} MB (nằm ngoài heap, do page cache quản lý)")
+
+if __name__ == "__main__":
+    main()
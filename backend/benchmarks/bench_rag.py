@@ -0,0 +1,284 @@
+# backend/benchmarks/bench_rag.py
+"""
+Bộ benchmark tái lập cho nạp tài liệu và truy hồi, chạy hoàn toàn offline:
+kho tài liệu tổng hợp đa ngôn ngữ (benchmarks.corpus), embedding tất định
+(benchmarks.stubs) và máy chủ LLM giả tương thích OpenAI (benchmarks.fake_llm).
+
+Với mỗi kích thước kho, đo:
+- parse: load_and_split_document (chunk/s, MB/s)
+- ingest: VectorStoreManager.add_document (tài liệu/s, chunk/s)
+- search: p50/p95/p99 của search() trên toàn kho, lọc một tài liệu và lọc nhiều tài liệu
+- chat: p50/p95/p99 của RAGPipeline.ask với LLM giả
+- memory: RSS hiện tại/đỉnh và dung lượng dữ liệu trên đĩa
+- startup: thời gian khởi động lại trên kho đã nạp (tới khi VectorStoreManager sẵn sàng)
+Mỗi kích thước chạy trong tiến trình con riêng (singleton và bộ nhớ không lẫn giữa các lần đo).
+Kết quả ghi ra JSON để so sánh giữa các commit (xem benchmarks.compare).
+
+Chạy từ thư mục backend:  python -m benchmarks.bench_rag [--chunks 1000 10000] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Sequence
+
+from benchmarks.corpus import write_corpus, make_queries
+from benchmarks.fake_llm import FakeLLMServer
+from benchmarks.stubs import configure_environment, install_stub_embedding
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+def percentiles(samples_ms: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99 (nearest-rank), trung bình và lớn nhất, tính bằng ms."""
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {}
+    def rank(p: float) -> float:
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 3),
+        "p50_ms": round(rank(50), 3),
+        "p95_ms": round(rank(95), 3),
+        "p99_ms": round(rank(99), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+def latencies(function: Callable[[Any], Any], inputs: Sequence[Any]) -> List[float]:
+    samples = []
+    for item in inputs:
+        start = time.perf_counter()
+        function(item)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def memory_usage() -> Dict[str, float]:
+    """RSS hiện tại (Linux: /proc/self/statm) và đỉnh (getrusage, KB trên Linux, byte trên macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+    current_mb = None
+    try:
+        with open("/proc/self/statm") as f:
+            current_mb = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        pass
+    return {"rss_mb": round(current_mb, 1) if current_mb is not None else None, "peak_rss_mb": round(peak_mb, 1)}
+
+def directory_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return round(total / 2**20, 2)
+
+# --- Các pha chạy trong tiến trình con ---
+def run_ingest_phase(args) -> Dict[str, Any]:
+    corpus_dir = os.path.join(args.workdir, "corpus")
+    documents = write_corpus(corpus_dir, args.chunks, args.chunks_per_document, args.paragraph_chars, seed=args.seed)
+    queries = make_queries(documents, args.queries, seed=args.seed)
+    document_ids = [document.document_id for document in documents]
+
+    import_start = time.perf_counter()
+    from app.services.document_parser import load_and_split_document
+    from app.services.rag_pipeline import RAGPipeline
+    from app.services.vector_store import VectorStoreManager
+    import_ms = (time.perf_counter() - import_start) * 1000
+
+    # 1. Đọc + chia chunk
+    start = time.perf_counter()
+    parsed_chunks = sum(len(load_and_split_document(document.path)) for document in documents)
+    parse_seconds = time.perf_counter() - start
+    corpus_mb = sum(document.size_bytes for document in documents) / 2**20
+
+    # 2. Nạp vào cả hai store (sao chép sang thư mục upload như khi tải lên qua API)
+    vsm = VectorStoreManager()
+    vsm.wait_until_ready()
+    os.makedirs(os.environ["UPLOAD_PATH"], exist_ok=True)
+    ingest_ms = []
+    for document in documents:
+        upload_path = os.path.join(os.environ["UPLOAD_PATH"], os.path.basename(document.path))
+        shutil.copyfile(document.path, upload_path)
+        start = time.perf_counter()
+        vsm.add_document(upload_path, document.document_id)
+        ingest_ms.append((time.perf_counter() - start) * 1000)
+    ingest_seconds = sum(ingest_ms) / 1000
+    indexed_chunks = len(vsm.chunk_metadata)
+
+    # 3. Tìm kiếm: truy vấn đầu tiên gồm cả việc dựng ma trận BM25 nên đo riêng
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    vsm.search(queries[0][0], k=args.k)
+    first_search_ms = (time.perf_counter() - start) * 1000
+    scope_size = min(args.scope_documents, len(document_ids))
+    search = {
+        "first_query_ms": round(first_search_ms, 3),
+        "unfiltered": percentiles(latencies(lambda q: vsm.search(q[0], k=args.k), queries)),
+        "filtered_document": percentiles(latencies(lambda q: vsm.search(q[0], k=args.k, document_ids=[q[1]]), queries)),
+        f"filtered_{scope_size}_documents": percentiles(latencies(
+            lambda q: vsm.search(q[0], k=args.k, document_ids=[q[1]] + rng.sample(document_ids, scope_size - 1)), queries
+        )),
+    }
+
+    # 4. Hỏi đáp đầu-cuối với LLM giả (cache câu trả lời đã tắt)
+    pipeline = RAGPipeline(vector_store_manager=vsm)
+    chat_queries = queries[:args.chat_queries]
+
+    async def chat_latencies() -> List[float]:
+        samples = []
+        for query, _ in chat_queries:
+            start = time.perf_counter()
+            await pipeline.ask(query)
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
+
+    chat = percentiles(asyncio.run(chat_latencies()))
+
+    return {
+        "documents": len(documents),
+        "corpus_mb": round(corpus_mb, 2),
+        "import_ms": round(import_ms, 1),
+        "parse": {
+            "chunks": parsed_chunks,
+            "seconds": round(parse_seconds, 3),
+            "chunks_per_second": round(parsed_chunks / parse_seconds, 1) if parse_seconds else None,
+            "mb_per_second": round(corpus_mb / parse_seconds, 2) if parse_seconds else None,
+        },
+        "ingest": {
+            "chunks": indexed_chunks,
+            "seconds": round(ingest_seconds, 3),
+            "documents_per_second": round(len(documents) / ingest_seconds, 2) if ingest_seconds else None,
+            "chunks_per_second": round(indexed_chunks / ingest_seconds, 1) if ingest_seconds else None,
+            "per_document": percentiles(ingest_ms),
+        },
+        "search": search,
+        "chat": chat,
+        "memory": {**memory_usage(), "data_mb": directory_size_mb(os.path.join(args.workdir, "data"))},
+    }
+
+def run_startup_phase(args) -> Dict[str, Any]:
+    start = time.perf_counter()
+    from app.services.vector_store import VectorStoreManager
+    imported = time.perf_counter()
+    vsm = VectorStoreManager()
+    constructed = time.perf_counter()
+    vsm.wait_until_ready()
+    ready = time.perf_counter()
+    components = vsm.warmup.status()["components"]
+    query_start = time.perf_counter()
+    vsm.search("dữ liệu hệ thống performance", k=args.k)
+    first_query = time.perf_counter()
+    return {
+        "import_ms": round((imported - start) * 1000, 1),
+        "construct_ms": round((constructed - imported) * 1000, 1),
+        "ready_ms": round((ready - start) * 1000, 1),
+        "first_query_ms": round((first_query - query_start) * 1000, 3),
+        "components_s": {name: status["seconds"] for name, status in components.items()},
+        "memory": memory_usage(),
+    }
+
+def run_phase(args):
+    """Điểm vào của tiến trình con: in kết quả JSON trên dòng cuối của stdout."""
+    with FakeLLMServer(completion_tokens=args.completion_tokens, latency_seconds=args.llm_latency_ms / 1000) as llm:
+        configure_environment(args.workdir, llm.base_url, ANSWER_CACHE_ENABLED="false", EMBEDDING_CACHE_ENABLED="false")
+        install_stub_embedding(args.dimensions)
+        result = run_ingest_phase(args) if args.phase == "ingest" else run_startup_phase(args)
+    print(json.dumps(result))
+
+# --- Tiến trình cha ---
+def spawn(phase: str, chunks: int, workdir: str, args) -> Dict[str, Any]:
+    command = [
+        sys.executable, "-m", "benchmarks.bench_rag", "--phase", phase, "--workdir", workdir,
+        "--chunks", str(chunks), "--chunks-per-document", str(args.chunks_per_document),
+        "--paragraph-chars", str(args.paragraph_chars), "--queries", str(args.queries),
+        "--chat-queries", str(args.chat_queries), "--scope-documents", str(args.scope_documents),
+        "-k", str(args.k), "--seed", str(args.seed), "--dimensions", str(args.dimensions),
+        "--completion-tokens", str(args.completion_tokens), "--llm-latency-ms", str(args.llm_latency_ms),
+    ]
+    completed = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stdout + completed.stderr)
+        raise RuntimeError(f"Pha '{phase}' với {chunks} chunks thất bại (mã {completed.returncode}).")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def git_revision() -> Dict[str, Any]:
+    def git(*arguments: str) -> str:
+        return subprocess.run(["git", *arguments], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1000, 10000], help="Các kích thước kho (1k–200k chunks)")
+    parser.add_argument("--chunks-per-document", type=int, default=50)
+    parser.add_argument("--paragraph-chars", type=int, default=1600, help="Độ dài mỗi đoạn (≈ một chunk với CHUNK_SIZE mặc định)")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--chat-queries", type=int, default=30)
+    parser.add_argument("--scope-documents", type=int, default=10, help="Số tài liệu trong bộ lọc nhiều tài liệu")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dimensions", type=int, default=384, help="Số chiều của embedding giả")
+    parser.add_argument("--completion-tokens", type=int, default=32)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", help=f"File JSON kết quả (mặc định: {os.path.relpath(RESULTS_DIR, BACKEND_DIR)}/<thời điểm>-<commit>.json)")
+    parser.add_argument("--keep", action="store_true", help="Giữ lại thư mục dữ liệu tạm")
+    parser.add_argument("--phase", choices=["ingest", "startup"], help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        args.chunks = args.chunks[0]
+        run_phase(args)
+        return
+
+    revision = git_revision()
+    report = {
+        "benchmark": "rag",
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": revision,
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "keep", "phase", "workdir")},
+        "results": [],
+    }
+    for chunks in args.chunks:
+        workdir = tempfile.mkdtemp(prefix=f"bench_rag_{chunks}_")
+        try:
+            print(f"--- {chunks} chunks ({workdir}) ---", flush=True)
+            result = {"chunks_requested": chunks, **spawn("ingest", chunks, workdir, args)}
+            result["startup"] = spawn("startup", chunks, workdir, args)
+            report["results"].append(result)
+            print(
+                f"nạp {result['ingest']['chunks_per_second']} chunk/s | "
+                f"search p50/p95/p99 {result['search']['unfiltered']['p50_ms']}/{result['search']['unfiltered']['p95_ms']}/"
+                f"{result['search']['unfiltered']['p99_ms']} ms | lọc p95 {result['search']['filtered_document']['p95_ms']} ms | "
+                f"chat p95 {result['chat']['p95_ms']} ms | khởi động {result['startup']['ready_ms']} ms | "
+                f"RSS đỉnh {result['memory']['peak_rss_mb']} MB",
+                flush=True,
+            )
+        finally:
+            if not args.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{(revision['commit'] or 'unknown')[:8]}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Đã ghi kết quả: {output}")
+
+if __name__ == "__main__":
+    main()
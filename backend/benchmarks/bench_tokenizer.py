@@ -0,0 +1,94 @@
+# backend/benchmarks/bench_tokenizer.py
+"""
+Benchmark bộ tách từ cho BM25 trên một kho văn bản tiếng Việt tổng hợp.
+- Tốc độ tách từ (MB/s, token/s) và kích thước từ vựng của từng bộ tách từ.
+- Độ chính xác truy hồi (hit@1) của KeywordIndex khi câu hỏi có dấu câu, chữ hoa
+  và dấu tổ hợp (NFD) khác với văn bản gốc.
+
+Chạy từ thư mục backend:  python -m benchmarks.bench_tokenizer [--docs 2000]
+"""
+import argparse
+import random
+import time
+import unicodedata
+
+from app.services.keyword_index import KeywordIndex
+from app.services.text_tokenizer import create_tokenizer
+
+SYLLABLES = (
+    "học sinh viên giáo dục trường đại lớp bài giảng kiểm tra thi cử điểm số môn toán văn lịch sử địa lý "
+    "vật hóa sinh thông tin máy tính dữ liệu mạng hệ thống phân tích thiết kế kinh tế xã hội văn hóa "
+    "chính trị pháp luật nhà nước quốc gia dân tộc chiến dịch điện biên phủ năm tháng ngày nghiên cứu khoa "
+    "phương pháp kết quả mô hình thuật toán tối ưu hiệu năng bộ nhớ truy vấn chỉ mục"
+).split()
+FILLERS = "và của là các có được cho với này những trong một để không thì mà đã".split()
+PUNCTUATION = [",", ".", ";", ":", "?", "!", "(", ")", "-"]
+
+def make_corpus(num_docs: int, words_per_doc: int, seed: int = 42):
+    rng = random.Random(seed)
+    docs, queries = [], []
+    for doc_index in range(num_docs):
+        # Mỗi tài liệu có một cụm từ đặc trưng, câu hỏi nhắm tới cụm đó
+        topic = [rng.choice(SYLLABLES) for _ in range(3)]
+        words = []
+        for _ in range(words_per_doc):
+            roll = rng.random()
+            if roll < 0.05:
+                words.extend(topic)
+            elif roll < 0.25:
+                words.append(rng.choice(FILLERS))
+            else:
+                words.append(rng.choice(SYLLABLES))
+            if rng.random() < 0.1:
+                words[-1] += rng.choice(PUNCTUATION)
+        docs.append((f"doc{doc_index}", " ".join(words)))
+        query = f"{' '.join(topic).capitalize()} là gì?"
+        queries.append((f"doc{doc_index}", unicodedata.normalize("NFD", query) if doc_index % 2 else query))
+    return docs, queries
+
+def bench_speed(tokenizer, docs, repeat: int):
+    total_bytes = sum(len(text.encode("utf-8")) for _, text in docs) * repeat
+    start = time.perf_counter()
+    total_tokens = 0
+    vocabulary = set()
+    for _ in range(repeat):
+        for _, text in docs:
+            tokens = tokenizer.tokenize(text)
+            total_tokens += len(tokens)
+            vocabulary.update(tokens)
+    elapsed = time.perf_counter() - start
+    return total_bytes / elapsed / 1e6, total_tokens / elapsed, len(vocabulary)
+
+def bench_quality(tokenizer, docs, queries):
+    index = KeywordIndex()
+    for doc_id, text in docs:
+        index.add_chunk(doc_id, doc_id, tokenizer.tokenize(text))
+    hits = 0
+    for doc_id, query in queries:
+        ranked = index.search(tokenizer.tokenize(query), k=1)
+        hits += bool(ranked) and ranked[0][0] == doc_id
+    return hits / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    docs, queries = make_corpus(args.docs, args.words)
+    tokenizers = {
+        "whitespace": create_tokenizer("whitespace"),
+        "vi": create_tokenizer("vi"),
+        "vi (không bigram)": create_tokenizer("vi", syllable_bigrams=False),
+        "vi (bỏ dấu)": create_tokenizer("vi", fold_diacritics=True),
+    }
+    print(f"Kho tổng hợp: {args.docs} tài liệu x {args.words} từ, {len(queries)} câu hỏi")
+    print(f"{'bộ tách từ':<20} {'MB/s':>8} {'token/s':>12} {'từ vựng':>9} {'hit@1':>7}")
+    for name, tokenizer in tokenizers.items():
+        mb_per_second, tokens_per_second, vocabulary = bench_speed(tokenizer, docs, args.repeat)
+        hit_rate = bench_quality(tokenizer, docs, queries)
+        print(f"{name:<20} {mb_per_second:>8.1f} {tokens_per_second:>12,.0f} {vocabulary:>9} {hit_rate:>7.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# backend/benchmarks/compare.py
+"""
+So sánh hai file kết quả của benchmarks.bench_rag (vd. trước và sau một commit):
+ghép theo kích thước kho và in các chỉ số số học thay đổi kèm phần trăm.
+Chỉ số thời gian/bộ nhớ tăng là xấu đi, chỉ số thông lượng (*_per_second) tăng là tốt lên.
+
+Chạy từ thư mục backend:  python -m benchmarks.compare base.json new.json [--threshold 5]
+"""
+import argparse
+import json
+from typing import Any, Dict
+
+def flatten(value: Any, prefix: str = "") -> Dict[str, float]:
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    return {}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=5.0, help="Chỉ in các chỉ số thay đổi ít nhất ngần này phần trăm")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"base: {base['git']['commit']} ({base['created_at']})")
+    print(f"new:  {new['git']['commit']} ({new['created_at']})")
+
+    base_results = {result["chunks_requested"]: result for result in base["results"]}
+    for result in new["results"]:
+        size = result["chunks_requested"]
+        if size not in base_results:
+            print(f"\n{size} chunks: không có trong base")
+            continue
+        print(f"\n{size} chunks")
+        before, after = flatten(base_results[size]), flatten(result)
+        for key in sorted(before.keys() & after.keys()):
+            if key.endswith("count") or before[key] == 0:
+                continue
+            change = (after[key] - before[key]) / before[key] * 100
+            if abs(change) < args.threshold:
+                continue
+            better = change > 0 if key.endswith("_per_second") else change < 0
+            print(f"  {key:<48} {before[key]:>12.2f} -> {after[key]:>12.2f} {change:>+8.1f}% {'tốt hơn' if better else 'xấu hơn'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# backend/benchmarks/corpus.py
+"""
+Sinh kho tài liệu tổng hợp đa ngôn ngữ (tiếng Việt, tiếng Anh và trộn lẫn) có tính tái lập:
+cùng seed và kích thước luôn cho cùng nội dung, cùng document_id và cùng bộ câu hỏi.
+Mỗi tài liệu là một file .txt gồm các đoạn văn dài xấp xỉ một chunk, nên số chunk
+sau khi chia (CHUNK_SIZE/CHUNK_OVERLAP mặc định) xấp xỉ số đoạn văn.
+"""
+import os
+import random
+import uuid
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from benchmarks.bench_tokenizer import FILLERS, SYLLABLES
+
+ENGLISH_WORDS = (
+    "student teacher school university lecture exam score history geography physics chemistry biology "
+    "information computer data network system analysis design economy society culture policy law state "
+    "nation campaign year month research science method result model algorithm optimization performance "
+    "memory query index retrieval ranking embedding vector cluster latency throughput storage pipeline"
+).split()
+ENGLISH_FILLERS = "the of and to in is for on with that by as are this from it be or".split()
+LANGUAGES = ("vi", "en", "mixed")
+
+@dataclass
+class SyntheticDocument:
+    document_id: str
+    path: str
+    language: str
+    topic: str # Cụm từ đặc trưng lặp lại trong tài liệu, dùng để tạo câu hỏi nhắm vào nó
+    paragraphs: int
+    size_bytes: int
+
+def _vocabulary(language: str) -> Tuple[List[str], List[str]]:
+    if language == "vi":
+        return SYLLABLES, FILLERS
+    if language == "en":
+        return ENGLISH_WORDS, ENGLISH_FILLERS
+    return SYLLABLES + ENGLISH_WORDS, FILLERS + ENGLISH_FILLERS
+
+def _paragraph(rng: random.Random, language: str, topic: List[str], target_chars: int) -> str:
+    words, fillers = _vocabulary(language)
+    sentences, length = [], 0
+    while length < target_chars:
+        sentence = []
+        for _ in range(rng.randint(8, 20)):
+            roll = rng.random()
+            if roll < 0.04:
+                sentence.extend(topic)
+            elif roll < 0.25:
+                sentence.append(rng.choice(fillers))
+            elif roll < 0.27:
+                sentence.append(str(rng.randint(1, 2030)))
+            else:
+                sentence.append(rng.choice(words))
+        text = " ".join(sentence)
+        text = text[0].upper() + text[1:] + rng.choice([".", ".", ".", "?", ";"])
+        sentences.append(text)
+        length += len(text) + 1
+    return " ".join(sentences)
+
+def write_corpus(
+    directory: str,
+    num_chunks: int,
+    chunks_per_document: int = 50,
+    paragraph_chars: int = 1600,
+    seed: int = 42,
+) -> List[SyntheticDocument]:
+    """
+    Ghi khoảng num_chunks đoạn văn (≈ số chunk) vào các file {document_id}_bench-{i}.txt
+    trong directory (cùng cách đặt tên với file tải lên), mỗi file chunks_per_document đoạn.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    documents = []
+    for index, start in enumerate(range(0, num_chunks, chunks_per_document)):
+        paragraphs = min(chunks_per_document, num_chunks - start)
+        language = LANGUAGES[index % len(LANGUAGES)]
+        words, _ = _vocabulary(language)
+        topic = [rng.choice(words) for _ in range(3)]
+        document_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        path = os.path.join(directory, f"{document_id}_bench-{index}.txt")
+        text = "\n\n".join(_paragraph(rng, language, topic, paragraph_chars) for _ in range(paragraphs))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        documents.append(SyntheticDocument(document_id, path, language, " ".join(topic), paragraphs, len(text.encode("utf-8"))))
+    return documents
+
+def make_queries(documents: List[SyntheticDocument], num_queries: int, seed: int = 7) -> List[Tuple[str, str]]:
+    """Câu hỏi (cụm từ đặc trưng của một tài liệu + vài từ ngẫu nhiên cùng ngôn ngữ) kèm document_id đích."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(num_queries):
+        document = rng.choice(documents)
+        words, _ = _vocabulary(document.language)
+        extra = " ".join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+        queries.append((f"{document.topic} {extra}", document.document_id))
+    return queries
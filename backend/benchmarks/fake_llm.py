@@ -0,0 +1,196 @@
+# backend/benchmarks/fake_llm.py
+"""
+Máy chủ LLM giả tương thích API OpenAI (POST /v1/chat/completions, GET /v1/models)
+để benchmark và kiểm thử tải không cần Ollama hay mạng. Câu trả lời là tất định
+(dựa trên độ dài prompt), hỗ trợ cả chế độ stream (SSE). Mô phỏng chi phí của mô hình:
+- prefill: thời gian xử lý prompt, tỉ lệ với số token prompt (ước lượng ~4 ký tự/token)
+- decode: thời gian sinh mỗi token của câu trả lời
+- parallel: số yêu cầu được xử lý cùng lúc (như OLLAMA_NUM_PARALLEL), các yêu cầu khác phải xếp hàng
+
+Dùng trong code qua FakeLLMServer, hoặc chạy độc lập rồi trỏ OLLAMA_BASE_URL vào nó:
+    python -m benchmarks.fake_llm --port 11434 --token-ms 20 --prefill-ms-per-1k 150 --parallel 1
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+CHARS_PER_TOKEN = 4
+
+def _prompt_text(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(str(message.get("content", "")) for message in messages)
+
+def _completion_words(prompt: str, max_tokens: int) -> List[str]:
+    words = f"Câu trả lời giả cho prompt dài {len(prompt)} ký tự.".split()
+    return (words * (max_tokens // len(words) + 1))[:max_tokens]
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeLLMHTTPServer"
+    protocol_version = "HTTP/1.1" # Giữ kết nối keep-alive như Ollama
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": self.server.model, "object": "model", "owned_by": "benchmark"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self.server.count_request()
+        prompt = _prompt_text(request.get("messages", []))
+        prompt_tokens = max(1, len(prompt) // CHARS_PER_TOKEN)
+        words = _completion_words(prompt, min(self.server.completion_tokens, request.get("max_tokens") or self.server.completion_tokens))
+        model = request.get("model", self.server.model)
+        created = int(time.time())
+        with self.server.slots:
+            self.server.simulate_prefill(prompt_tokens)
+            if not request.get("stream"):
+                time.sleep(self.server.token_seconds * len(words))
+                self._send_json(200, {
+                    "id": "chatcmpl-benchmark", "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words), "total_tokens": prompt_tokens + len(words)},
+                })
+                return
+            self._stream(words, model, created)
+
+    def _stream(self, words: List[str], model: str, created: int):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close") # Stream không có Content-Length: đóng kết nối để báo kết thúc
+        self.end_headers()
+        for i, word in enumerate(words):
+            time.sleep(self.server.token_seconds)
+            chunk = {
+                "id": "chatcmpl-benchmark", "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+class FakeLLMHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        model: str,
+        completion_tokens: int,
+        latency_seconds: float,
+        token_seconds: float,
+        prefill_seconds_per_1k: float,
+        parallel: Optional[int],
+    ):
+        super().__init__(address, _Handler)
+        self.model = model
+        self.completion_tokens = max(1, completion_tokens)
+        self.latency_seconds = latency_seconds
+        self.token_seconds = token_seconds
+        self.prefill_seconds_per_1k = prefill_seconds_per_1k
+        # Không giới hạn thì dùng semaphore rất lớn để code xử lý giống nhau
+        self.slots = threading.BoundedSemaphore(parallel if parallel else 1_000_000)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def simulate_prefill(self, prompt_tokens: int):
+        """Độ trễ cố định + thời gian xử lý prompt, trước khi có token đầu tiên."""
+        time.sleep(self.latency_seconds + self.prefill_seconds_per_1k * prompt_tokens / 1000)
+
+class FakeLLMServer:
+    """
+    Dùng như context manager:
+        with FakeLLMServer() as llm:
+            os.environ["OLLAMA_BASE_URL"] = llm.base_url
+    port=0 để hệ điều hành chọn cổng trống.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        model: str = "benchmark",
+        completion_tokens: int = 32,
+        latency_seconds: float = 0.0,
+        token_seconds: float = 0.0,
+        prefill_seconds_per_1k: float = 0.0,
+        parallel: Optional[int] = None,
+    ):
+        self.httpd = FakeLLMHTTPServer(
+            (host, port), model, completion_tokens, latency_seconds, token_seconds, prefill_seconds_per_1k, parallel
+        )
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-llm", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        """URL gốc (không có /v1), đúng định dạng của settings.OLLAMA_BASE_URL."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.requests
+
+    def start(self) -> "FakeLLMServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", default="benchmark")
+    parser.add_argument("--completion-tokens", type=int, default=64, help="Số token tối đa của mỗi câu trả lời")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Độ trễ cố định trước khi xử lý prompt")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="Thời gian sinh mỗi token")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=100.0, help="Thời gian xử lý mỗi 1000 token prompt")
+    parser.add_argument("--parallel", type=int, default=0, help="Số yêu cầu xử lý đồng thời (0 = không giới hạn)")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        args.host, args.port, args.model, args.completion_tokens, args.latency_ms / 1000,
+        args.token_ms / 1000, args.prefill_ms_per_1k / 1000, args.parallel or None,
+    )
+    print(f"LLM giả đang chạy tại {server.base_url} (đặt OLLAMA_BASE_URL={server.base_url}), Ctrl+C để dừng.")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+# backend/benchmarks/load_test.py
+"""
+Bộ sinh tải cho API: nhiều người dùng ảo đồng thời gọi /api/v1/chat (thường và stream),
+/api/v1/tasks/* và tải tài liệu lên, theo tỉ lệ cấu hình được. Báo cáo thông lượng,
+độ trễ p50/p95/p99 (và thời gian tới byte đầu tiên với stream), tỉ lệ lỗi và mã trạng thái
+theo từng loại yêu cầu. Dùng cùng benchmarks.serve (API + embedding tất định + LLM giả)
+để đo sức chịu tải của tầng FastAPI độc lập với tốc độ mô hình.
+
+Chạy từ thư mục backend:
+    python -m benchmarks.load_test --local --users 20 --duration 30
+    python -m benchmarks.load_test --base-url http://localhost:8000 --mix chat=5,summarize=1,upload=1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.bench_rag import BACKEND_DIR, percentiles
+from benchmarks.corpus import SyntheticDocument, make_queries, write_corpus
+
+DEFAULT_MIX = "chat=6,chat_stream=2,summarize=1,generate_questions=1,extract_keywords=1,upload=1"
+OPERATIONS = ("chat", "chat_stream", "summarize", "generate_questions", "extract_keywords", "upload")
+
+@dataclass
+class Sample:
+    operation: str
+    status: int # 0 khi lỗi kết nối/timeout
+    latency_ms: float
+    first_byte_ms: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300 and self.error is None
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Loại yêu cầu không hợp lệ: {name} (chọn trong {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+class LoadGenerator:
+    def __init__(self, client: httpx.AsyncClient, documents: List[SyntheticDocument], args):
+        self.client = client
+        self.args = args
+        self.documents = documents
+        self.document_ids: List[str] = [] # Tài liệu đã nạp xong, dùng cho chat/tác vụ
+        self.queries: List[Tuple[str, str]] = make_queries(documents, 1000, seed=args.seed)
+        self.samples: List[Sample] = []
+        self.operations, self.weights = zip(*args.mix.items())
+
+    async def _timed(self, operation: str, method: str, path: str, stream: bool = False, **kwargs) -> Sample:
+        start = time.perf_counter()
+        first_byte = None
+        try:
+            if stream:
+                async with self.client.stream(method, path, **kwargs) as response:
+                    async for _ in response.aiter_bytes():
+                        if first_byte is None:
+                            first_byte = time.perf_counter()
+                    status = response.status_code
+            else:
+                response = await self.client.request(method, path, **kwargs)
+                status = response.status_code
+            error = None
+        except httpx.HTTPError as e:
+            status, error = 0, f"{type(e).__name__}: {e}"
+        end = time.perf_counter()
+        return Sample(operation, status, (end - start) * 1000, (first_byte - start) * 1000 if first_byte else None, error)
+
+    async def upload(self, document: SyntheticDocument) -> Sample:
+        with open(document.path, "rb") as f:
+            content = f.read()
+        return await self._timed("upload", "POST", "/api/v1/documents", files={"file": (os.path.basename(document.path), content, "text/plain")})
+
+    async def run_operation(self, rng: random.Random, session_id: str) -> Sample:
+        operation = rng.choices(self.operations, self.weights)[0]
+        headers = {"X-Session-ID": session_id}
+        if operation == "upload" or not self.document_ids:
+            return await self.upload(rng.choice(self.documents))
+        query, _ = rng.choice(self.queries)
+        document_id = rng.choice(self.document_ids)
+        # Thêm số ngẫu nhiên để câu hỏi không trùng và không trúng cache câu trả lời
+        body = {"query": f"{query} {rng.randint(0, 10**6)}", "document_id": document_id}
+        if operation == "chat":
+            return await self._timed(operation, "POST", "/api/v1/chat", json=body, headers=headers)
+        if operation == "chat_stream":
+            return await self._timed(operation, "POST", "/api/v1/chat/stream", stream=True, json=body, headers=headers)
+        body = {"document_id": document_id}
+        if operation == "generate_questions":
+            body["num_questions"] = rng.randint(3, 8)
+        return await self._timed(operation, "POST", f"/api/v1/tasks/{operation.replace('_', '-')}", json=body, headers=headers)
+
+    async def seed(self):
+        """Tải lên các tài liệu ban đầu và chờ nạp xong để chat/tác vụ có dữ liệu."""
+        uploaded = []
+        for document in self.documents[:self.args.seed_documents]:
+            with open(document.path, "rb") as f:
+                response = await self.client.post("/api/v1/documents", files={"file": (os.path.basename(document.path), f.read(), "text/plain")})
+            response.raise_for_status()
+            uploaded.append(response.json()["document_id"])
+        deadline = time.monotonic() + self.args.seed_timeout
+        pending = set(uploaded)
+        while pending and time.monotonic() < deadline:
+            for document_id in list(pending):
+                status = (await self.client.get(f"/api/v1/documents/{document_id}/status")).json()
+                if status["status"] in ("completed", "failed"):
+                    pending.discard(document_id)
+            await asyncio.sleep(0.2)
+        self.document_ids = [document_id for document_id in uploaded if document_id not in pending]
+        print(f"Đã nạp {len(self.document_ids)}/{len(uploaded)} tài liệu ban đầu.", flush=True)
+
+    async def user(self, index: int, deadline: float, remaining: List[int]):
+        rng = random.Random(self.args.seed * 1000 + index)
+        session_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        while time.monotonic() < deadline:
+            if remaining[0] is not None:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            self.samples.append(await self.run_operation(rng, session_id))
+            if self.args.think_ms:
+                await asyncio.sleep(rng.expovariate(1000 / self.args.think_ms))
+
+    async def run(self) -> float:
+        deadline = time.monotonic() + self.args.duration
+        remaining = [self.args.requests]
+        start = time.perf_counter()
+        await asyncio.gather(*(self.user(i, deadline, remaining) for i in range(self.args.users)))
+        return time.perf_counter() - start
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, dict]:
+    groups: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        groups[sample.operation].append(sample)
+    groups["all"] = samples
+    report = {}
+    for operation, group in groups.items():
+        ok = [sample for sample in group if sample.ok]
+        first_bytes = [sample.first_byte_ms for sample in ok if sample.first_byte_ms is not None]
+        report[operation] = {
+            "requests": len(group),
+            "throughput_rps": round(len(group) / elapsed, 2) if elapsed else None,
+            "error_rate": round(1 - len(ok) / len(group), 4) if group else 0.0,
+            "status": dict(Counter(str(sample.status) for sample in group)),
+            "latency": percentiles([sample.latency_ms for sample in ok]),
+            **({"first_byte": percentiles(first_bytes)} if first_bytes else {}),
+            "errors": sorted({sample.error for sample in group if sample.error})[:5],
+        }
+    return report
+
+def print_report(report: Dict[str, dict], elapsed: float, users: int):
+    print(f"\n{users} người dùng ảo, {elapsed:.1f}s")
+    print(f"{'loại':<20} {'yêu cầu':>8} {'req/s':>8} {'lỗi %':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'ttfb p95':>9}  trạng thái")
+    for operation, stats in sorted(report.items(), key=lambda item: item[0] == "all"):
+        latency = stats["latency"]
+        first_byte = stats.get("first_byte", {}).get("p95_ms")
+        print(
+            f"{operation:<20} {stats['requests']:>8} {stats['throughput_rps']:>8} {stats['error_rate'] * 100:>7.1f} "
+            f"{latency.get('p50_ms', '-'):>9} {latency.get('p95_ms', '-'):>9} {latency.get('p99_ms', '-'):>9} "
+            f"{first_byte if first_byte is not None else '-':>9}  {stats['status']}"
+        )
+
+def start_local_server(args) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "benchmarks.serve", "--port", str(args.local_port),
+        "--token-ms", str(args.token_ms), "--prefill-ms-per-1k", str(args.prefill_ms_per_1k), "--parallel", str(args.parallel),
+    ]
+    if args.no_cache:
+        command.append("--no-cache")
+    return subprocess.Popen(command, cwd=BACKEND_DIR, start_new_session=True)
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("API không sẵn sàng sau thời gian chờ.")
+
+async def run(args):
+    corpus_dir = tempfile.mkdtemp(prefix="load_test_corpus_")
+    documents = write_corpus(corpus_dir, args.corpus_chunks, args.chunks_per_document, seed=args.seed)
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        await wait_until_ready(client, args.ready_timeout)
+        generator = LoadGenerator(client, documents, args)
+        await generator.seed()
+        elapsed = await generator.run()
+        try:
+            metrics = (await client.get("/metrics")).text
+        except httpx.HTTPError:
+            metrics = None
+    report = summarize(generator.samples, elapsed)
+    print_report(report, elapsed, args.users)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "base_url": args.base_url, "users": args.users, "elapsed_seconds": round(elapsed, 3),
+                "mix": args.mix, "operations": report,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"Đã ghi kết quả: {args.output}")
+    if metrics and args.show_metrics:
+        print("\n" + "\n".join(line for line in metrics.splitlines() if line.startswith(("rag_stage_duration_seconds_sum", "rag_stage_duration_seconds_count"))))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--local", action="store_true", help="Tự chạy benchmarks.serve (API + LLM giả) cho lần đo này")
+    parser.add_argument("--local-port", type=int, default=8765)
+    parser.add_argument("--users", type=int, default=10, help="Số người dùng ảo đồng thời")
+    parser.add_argument("--duration", type=float, default=30.0, help="Thời gian chạy (giây)")
+    parser.add_argument("--requests", type=int, help="Dừng sau ngần này yêu cầu (tùy chọn)")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Thời gian nghỉ trung bình giữa hai yêu cầu của một người dùng")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Tỉ lệ các loại yêu cầu (mặc định: {DEFAULT_MIX})")
+    parser.add_argument("--seed-documents", type=int, default=5, help="Số tài liệu tải lên trước khi đo")
+    parser.add_argument("--seed-timeout", type=float, default=120.0)
+    parser.add_argument("--corpus-chunks", type=int, default=400, help="Kích thước kho tài liệu tổng hợp dùng để tải lên")
+    parser.add_argument("--chunks-per-document", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Timeout của mỗi yêu cầu (giây)")
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Ghi kết quả ra file JSON")
+    parser.add_argument("--show-metrics", action="store_true", help="In tổng thời gian các giai đoạn từ /metrics sau khi chạy")
+    # Tham số của LLM giả khi dùng --local
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=100.0)
+    parser.add_argument("--parallel", type=int, default=2)
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    server = None
+    if args.local:
+        args.base_url = f"http://127.0.0.1:{args.local_port}"
+        server = start_local_server(args)
+    try:
+        asyncio.run(run(args))
+    finally:
+        if server is not None:
+            os.killpg(server.pid, signal.SIGINT)
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                os.killpg(server.pid, signal.SIGKILL)
+
+if __name__ == "__main__":
+    main()
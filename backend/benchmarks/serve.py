@@ -0,0 +1,58 @@
+# backend/benchmarks/serve.py
+"""
+Chạy API thật (app.main) trên dữ liệu tạm, với embedding tất định và LLM giả,
+để kiểm thử tải tầng FastAPI mà không phụ thuộc tốc độ mô hình.
+Mặc định LLM giả chạy cùng tiến trình; dùng --llm-url để trỏ tới một LLM giả/thật khác.
+
+Chạy từ thư mục backend:  python -m benchmarks.serve [--port 8000] [--token-ms 20] [--parallel 1]
+"""
+import argparse
+import shutil
+import tempfile
+
+import uvicorn
+
+from benchmarks.fake_llm import FakeLLMServer
+from benchmarks.stubs import configure_environment, install_stub_embedding
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workdir", help="Thư mục dữ liệu (mặc định: thư mục tạm, xóa khi dừng)")
+    parser.add_argument("--llm-url", help="Dùng LLM có sẵn thay vì LLM giả cùng tiến trình")
+    parser.add_argument("--completion-tokens", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=100.0)
+    parser.add_argument("--parallel", type=int, default=0, help="Số yêu cầu LLM giả xử lý đồng thời (0 = không giới hạn)")
+    parser.add_argument("--no-cache", action="store_true", help="Tắt cache câu trả lời (kết quả tác vụ vẫn được cache theo tài liệu)")
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_serve_")
+    llm = None
+    if not args.llm_url:
+        llm = FakeLLMServer(
+            completion_tokens=args.completion_tokens, latency_seconds=args.latency_ms / 1000, token_seconds=args.token_ms / 1000,
+            prefill_seconds_per_1k=args.prefill_ms_per_1k / 1000, parallel=args.parallel or None,
+        ).start()
+    overrides = {"LOG_LEVEL": args.log_level}
+    if args.no_cache:
+        overrides["ANSWER_CACHE_ENABLED"] = "false"
+    configure_environment(workdir, args.llm_url or llm.base_url, **overrides)
+    install_stub_embedding(args.dimensions)
+    print(f"API: http://{args.host}:{args.port} | dữ liệu: {workdir} | LLM: {args.llm_url or llm.base_url}", flush=True)
+
+    from app.main import app
+    try:
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    finally:
+        if llm is not None:
+            llm.stop()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
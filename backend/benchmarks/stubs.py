@@ -0,0 +1,72 @@
+# backend/benchmarks/stubs.py
+"""
+Thay thế các phụ thuộc nặng/cần mạng khi chạy benchmark:
+- HashEmbeddingFunction: embedding tất định (băm từ vào vector) thay cho SentenceTransformer,
+  không cần tải mô hình và cho cùng kết quả ở mọi lần chạy.
+- configure_environment: trỏ mọi đường dẫn dữ liệu vào một thư mục tạm và LLM vào máy chủ giả.
+Cả hai phải được gọi TRƯỚC khi import app (settings được đọc một lần khi import).
+"""
+import hashlib
+import os
+import re
+from typing import Any, Dict, List
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+from chromadb.utils import embedding_functions
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+class HashEmbeddingFunction(EmbeddingFunction):
+    """Mỗi từ (chữ thường) được băm vào một chiều với dấu ±1; vector được chuẩn hóa L2."""
+    dimensions = 384
+
+    def __init__(self, model_name: str = "benchmark-hash", **kwargs: Any):
+        self.model_name = model_name
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        vectors = []
+        for text in input:
+            vector = np.zeros(self.dimensions, dtype=np.float32)
+            for word in _WORD_RE.findall(text.lower()):
+                digest = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+                vector[digest % self.dimensions] += 1.0 if digest & (1 << 63) else -1.0
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "benchmark-hash"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "HashEmbeddingFunction":
+        return HashEmbeddingFunction(config.get("model_name", "benchmark-hash"))
+
+def install_stub_embedding(dimensions: int = 384):
+    """Để VectorStoreManager dùng HashEmbeddingFunction thay cho SentenceTransformer."""
+    HashEmbeddingFunction.dimensions = dimensions
+    embedding_functions.SentenceTransformerEmbeddingFunction = HashEmbeddingFunction
+
+def configure_environment(workdir: str, llm_base_url: str, **overrides: Any):
+    """Đặt các biến môi trường cấu hình để toàn bộ dữ liệu nằm trong workdir."""
+    data = os.path.join(workdir, "data")
+    values = {
+        "PROJECT_ROOT": workdir,
+        "VECTOR_STORE_PATH": os.path.join(data, "vector_store"),
+        "UPLOAD_PATH": os.path.join(data, "uploaded_docs"),
+        "KEYWORD_STORE_PATH": os.path.join(data, "keyword_store"),
+        "SUMMARY_CACHE_PATH": os.path.join(data, "summary_cache.sqlite3"),
+        "ARTIFACT_CACHE_PATH": os.path.join(data, "artifact_cache.sqlite3"),
+        "EMBEDDING_CACHE_PATH": os.path.join(data, "embedding_cache.sqlite3"),
+        "DOCUMENT_REGISTRY_PATH": os.path.join(data, "document_registry.sqlite3"),
+        "INGESTION_QUEUE_PATH": os.path.join(data, "ingestion_queue.sqlite3"),
+        "OLLAMA_BASE_URL": llm_base_url,
+        "ARTIFACT_WARMUP_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+    }
+    values.update({key: str(value) for key, value in overrides.items()})
+    os.environ.update(values)
@@ -0,0 +1,16 @@
+# backend/tests/conftest.py
+import pytest
+
+from app.services.document_registry import DocumentRegistry
+from app.services.ingestion_queue import IngestionQueue
+
+@pytest.fixture
+def registry(tmp_path):
+    return DocumentRegistry(str(tmp_path / "registry.sqlite3"))
+
+@pytest.fixture
+def queue(tmp_path):
+    # IngestionQueue là singleton: tạo instance riêng cho mỗi kiểm thử
+    queue = object.__new__(IngestionQueue)
+    queue._init_queue(str(tmp_path / "queue.sqlite3"), num_workers=1, max_attempts=1, retry_delay_seconds=0)
+    return queue
@@ -0,0 +1,105 @@
+# backend/tests/test_bm25_matrix.py
+import math
+import random
+
+import pytest
+from rank_bm25 import BM25Okapi
+
+from app.services.keyword_index import KeywordIndex
+
+VOCABULARY = [f"w{i}" for i in range(60)]
+
+class LuceneIdfOkapi(BM25Okapi):
+    """BM25Okapi với IDF dạng Lucene (luôn dương) như BM25Matrix, để so sánh điểm trực tiếp."""
+
+    def _calc_idf(self, nd):
+        self.idf = {word: math.log((self.corpus_size - freq + 0.5) / (freq + 0.5) + 1.0) for word, freq in nd.items()}
+
+def make_corpus(num_chunks: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        (f"c{i}", f"d{i % 5}", [rng.choice(VOCABULARY[:rng.randint(5, len(VOCABULARY))]) for _ in range(rng.randint(1, 40))])
+        for i in range(num_chunks)
+    ]
+
+def make_queries(num_queries: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [[rng.choice(VOCABULARY) for _ in range(rng.randint(1, 5))] for _ in range(num_queries)]
+
+def build_index(corpus) -> KeywordIndex:
+    # Tắt dựng lại ở nền để kiểm thử quyết định được ma trận nào đang dùng
+    index = KeywordIndex(rebuild_delay_seconds=3600)
+    for chunk_id, document_id, tokens in corpus:
+        index.add_chunk(chunk_id, document_id, tokens)
+    return index
+
+def assert_same_ranking(results, reference_scores, k):
+    """Cùng điểm top-k với bản tham chiếu (các chunk đồng điểm có thể đổi chỗ cho nhau)."""
+    expected = sorted((score for score in reference_scores.values() if score > 0), reverse=True)[:k]
+    assert [score for _, score in results] == pytest.approx(expected, rel=1e-5)
+    for chunk_id, score in results:
+        assert score == pytest.approx(reference_scores[chunk_id], rel=1e-5)
+
+def okapi_scores(corpus, query):
+    okapi = LuceneIdfOkapi([tokens for _, _, tokens in corpus])
+    return dict(zip((chunk_id for chunk_id, _, _ in corpus), okapi.get_scores(query)))
+
+def test_matches_bm25_okapi():
+    corpus = make_corpus(200)
+    index = build_index(corpus)
+    for query in make_queries(50):
+        assert_same_ranking(index.search(query, 10), okapi_scores(corpus, query), 10)
+
+def test_single_term_ranking_matches_stock_bm25_okapi():
+    # Với một từ, thứ hạng không phụ thuộc dạng IDF nên so được với BM25Okapi gốc
+    corpus = make_corpus(100)
+    index = build_index(corpus)
+    okapi = BM25Okapi([tokens for _, _, tokens in corpus])
+    for term in VOCABULARY[:10]:
+        scores = okapi.get_scores([term])
+        expected = {chunk_id for (chunk_id, _, _), score in zip(corpus, scores) if score == max(scores) and score != 0}
+        results = index.search([term], 1)
+        assert not expected or results[0][0] in expected
+
+def test_document_filter_matches_bm25_over_filtered_chunks():
+    corpus = make_corpus(200)
+    index = build_index(corpus)
+    subset = [chunk for chunk in corpus if chunk[1] in ("d1", "d3")]
+    for query in make_queries(30):
+        assert_same_ranking(index.search(query, 5, ["d1", "d3", "missing"]), okapi_scores(subset, query), 5)
+    assert index.search(["w1"], 5, ["missing"]) == []
+
+def test_stale_matrix_with_delta_matches_rebuilt_matrix():
+    corpus = make_corpus(200)
+    index = build_index(corpus)
+    index.matrix()
+    rng = random.Random(2)
+    for chunk_id, _, _ in rng.sample(corpus, 40):
+        index.remove_chunk(chunk_id)
+    index.remove_document("d2")
+    for chunk_id, document_id, tokens in make_corpus(30, seed=3):
+        index.add_chunk(f"new-{chunk_id}", document_id, tokens)
+    # Ghi đè một chunk cũ bằng nội dung mới
+    index.add_chunk("c1", "d1", ["w1", "w1", "w2"])
+    assert index.pending_changes > 0
+
+    live = set(index.chunk_slots)
+    queries = make_queries(40)
+    stale = [index.search(query, 10) for query in queries]
+    stale_filtered = [index.search(query, 10, ["d1", "d4"]) for query in queries]
+    index.rebuild_matrix()
+    assert index.pending_changes == 0
+    for query, results, filtered in zip(queries, stale, stale_filtered):
+        fresh = dict(index.search(query, len(live)))
+        assert_same_ranking(results, fresh, 10)
+        assert all(chunk_id in live for chunk_id, _ in results)
+        assert_same_ranking(filtered, dict(index.search(query, len(live), ["d1", "d4"])), 10)
+
+def test_clear_discards_matrix_and_delta():
+    index = build_index(make_corpus(50))
+    index.matrix()
+    index.add_chunk("extra", "d9", ["w1"])
+    index.clear()
+    assert index.search(["w1"], 5) == []
+    index.add_chunk("after", "d9", ["w1"])
+    assert [chunk_id for chunk_id, _ in index.search(["w1"], 5)] == ["after"]
@@ -0,0 +1,64 @@
+# backend/tests/test_document_registry.py
+import types
+
+import pytest
+
+from app.core.config import settings
+from app.services.document_registry import DocumentRegistry
+from app.services.keyword_index import KeywordIndex
+from app.services.vector_store import REGISTRY_BACKFILL_KEY, VectorStoreManager
+
+def test_set_chunks_marks_document_ready(registry, tmp_path):
+    file_path = tmp_path / "a.txt"
+    file_path.write_text("xin chào", encoding="utf-8")
+    registry.register("doc", "a.txt", str(file_path), status="indexing")
+    assert registry.set_chunks("doc", [(1, "doc_1"), (0, "doc_0")])
+    document = registry.get("doc")
+    assert document["status"] == "ready" and document["chunk_count"] == 2
+    assert document["size_bytes"] == file_path.stat().st_size
+    assert registry.get_chunk_ids("doc") == ["doc_0", "doc_1"]
+
+def test_set_chunks_after_delete_leaves_no_orphans(registry):
+    registry.register("doc", "a.txt", "", status="indexing")
+    registry.remove("doc")
+    assert not registry.set_chunks("doc", [(0, "doc_0")])
+    assert registry.get("doc") is None
+    assert registry.get_chunk_ids("doc") == []
+
+def test_remove_drops_collection_membership(registry):
+    registry.register("a", "a.txt", "")
+    registry.register("b", "b.txt", "")
+    registry.create_collection("col", "Môn học", ["a", "b"])
+    registry.remove("a")
+    assert registry.get_collection_document_ids("col") == ["b"]
+    assert registry.get_collection_document_ids("missing") is None
+
+def test_meta_survives_reopen_and_clear(tmp_path):
+    registry = DocumentRegistry(str(tmp_path / "registry.sqlite3"))
+    assert registry.get_meta("flag") is None
+    registry.set_meta("flag", "1")
+    registry.clear()
+    assert DocumentRegistry(str(tmp_path / "registry.sqlite3")).get_meta("flag") == "1"
+
+def make_manager(registry):
+    index = KeywordIndex(rebuild_delay_seconds=3600)
+    for i in range(3):
+        index.add_chunk(f"legacy_{i}", "legacy", ["từ"])
+    return types.SimpleNamespace(document_registry=registry, keyword_index=index)
+
+def test_backfill_runs_once_and_keeps_registered_documents(registry, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_PATH", str(tmp_path / "uploads"))
+    manager = make_manager(registry)
+    manager.keyword_index.add_chunk("new_0", "new", ["từ"])
+    # Tài liệu tải lên trong lúc khởi động đã có trong sổ: không được ghi đè, cũng không được làm bỏ qua backfill
+    registry.register("new", "new.txt", "", status="indexing")
+
+    VectorStoreManager._backfill_document_registry(manager)
+    assert registry.get("legacy")["status"] == "ready"
+    assert registry.get_chunk_ids("legacy") == ["legacy_0", "legacy_1", "legacy_2"]
+    assert registry.get("new")["status"] == "indexing"
+    assert registry.get_meta(REGISTRY_BACKFILL_KEY)
+
+    registry.remove("legacy")
+    VectorStoreManager._backfill_document_registry(manager)
+    assert registry.get("legacy") is None
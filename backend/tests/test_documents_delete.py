@@ -0,0 +1,52 @@
+# backend/tests/test_documents_delete.py
+import types
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import documents
+
+@pytest.fixture
+def deleted():
+    return []
+
+@pytest.fixture
+def client(registry, queue, deleted):
+    vsm = types.SimpleNamespace(document_registry=registry, delete_document=deleted.append)
+    app = FastAPI()
+    app.include_router(documents.router)
+    app.dependency_overrides[documents.get_ready_vsm] = lambda: vsm
+    app.dependency_overrides[documents.get_ingestion_queue] = lambda: queue
+    return TestClient(app)
+
+@pytest.fixture
+def uploaded(tmp_path, registry):
+    file_path = tmp_path / "doc_a.txt"
+    file_path.write_text("nội dung", encoding="utf-8")
+    registry.register("doc", "a.txt", str(file_path), status="ready")
+    return file_path
+
+def test_delete_removes_document_and_file(client, uploaded, deleted):
+    response = client.delete("/documents/doc")
+    assert response.status_code == 200
+    assert deleted == ["doc"]
+    assert not uploaded.exists()
+
+def test_delete_while_indexing_returns_409(client, registry, uploaded, deleted):
+    registry.set_status("doc", "indexing")
+    response = client.delete("/documents/doc")
+    assert response.status_code == 409
+    assert deleted == [] and uploaded.exists()
+
+def test_delete_while_job_running_returns_409(client, queue, uploaded, deleted):
+    queue.enqueue("doc", str(uploaded))
+    queue._conn.execute("UPDATE jobs SET status = 'running' WHERE document_id = 'doc'")
+    response = client.delete("/documents/doc")
+    assert response.status_code == 409
+    assert deleted == [] and queue.get_status("doc") is not None
+
+def test_delete_cancels_queued_job(client, queue, uploaded, deleted):
+    queue.enqueue("doc", str(uploaded))
+    assert client.delete("/documents/doc").status_code == 200
+    assert queue.get_status("doc") is None and deleted == ["doc"]
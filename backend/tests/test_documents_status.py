@@ -0,0 +1,37 @@
+# backend/tests/test_documents_status.py
+import types
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import documents
+
+@pytest.fixture
+def client(registry, queue):
+    vsm = types.SimpleNamespace(document_registry=registry)
+    app = FastAPI()
+    app.include_router(documents.router)
+    app.dependency_overrides[documents.get_vsm] = lambda: vsm
+    app.dependency_overrides[documents.get_ingestion_queue] = lambda: queue
+    return TestClient(app)
+
+def test_status_from_job(client, registry, queue):
+    registry.register("doc", "a.txt", "")
+    queue.enqueue("doc", "a.txt")
+    body = client.get("/documents/doc/status").json()
+    assert body["status"] == "queued" and not body["searchable"]
+
+def test_status_falls_back_to_registry_without_job(client, registry):
+    # Ví dụ tài liệu được đăng ký bù từ dữ liệu nạp trước khi có sổ đăng ký
+    registry.register("doc", "a.txt", "", status="ready")
+    registry.set_chunks("doc", [(0, "doc_0"), (1, "doc_1")])
+    body = client.get("/documents/doc/status").json()
+    assert body["status"] == "completed" and body["searchable"] and body["processed_chunks"] == 2
+
+    registry.set_status("doc", "failed", "lỗi đọc file")
+    body = client.get("/documents/doc/status").json()
+    assert body["status"] == "failed" and body["error"] == "lỗi đọc file" and not body["searchable"]
+
+def test_status_unknown_document_returns_404(client):
+    assert client.get("/documents/missing/status").status_code == 404
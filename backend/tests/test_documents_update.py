@@ -0,0 +1,62 @@
+# backend/tests/test_documents_update.py
+import types
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import documents
+from app.core.config import settings
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    monkeypatch.setattr(settings, "UPLOAD_PATH", str(upload_dir))
+    return upload_dir
+
+@pytest.fixture
+def client(registry, queue, upload_dir):
+    vsm = types.SimpleNamespace(document_registry=registry)
+    app = FastAPI()
+    app.include_router(documents.router)
+    app.dependency_overrides[documents.get_vsm] = lambda: vsm
+    app.dependency_overrides[documents.get_ingestion_queue] = lambda: queue
+    return TestClient(app)
+
+@pytest.fixture
+def uploaded(upload_dir, registry, queue):
+    file_path = upload_dir / "doc_a.txt"
+    file_path.write_text("bản cũ", encoding="utf-8")
+    registry.register("doc", "a.txt", str(file_path), status="ready")
+    queue.enqueue("doc", str(file_path))
+    queue._update("doc", status="completed")
+    return file_path
+
+def put(client, content: str):
+    return client.put("/documents/doc", files={"file": ("b.txt", content.encode("utf-8"), "text/plain")})
+
+def test_update_replaces_file_and_requeues(client, registry, queue, uploaded, upload_dir):
+    assert put(client, "bản mới").status_code == 202
+    new_path = upload_dir / "doc_b.txt"
+    assert not uploaded.exists() and new_path.read_text(encoding="utf-8") == "bản mới"
+    assert registry.get("doc")["filename"] == "b.txt"
+    job = queue.get_status("doc")
+    assert job["status"] == "queued" and job["file_path"] == str(new_path)
+
+def test_update_unknown_document_returns_404(client, upload_dir):
+    assert put(client, "x").status_code == 404
+
+def test_update_while_indexing_returns_409(client, registry, uploaded):
+    registry.set_status("doc", "indexing")
+    assert put(client, "bản mới").status_code == 409
+    assert uploaded.read_text(encoding="utf-8") == "bản cũ"
+
+def test_update_while_job_claimed_returns_409(client, registry, queue, uploaded, upload_dir):
+    # Worker đã nhận job nhưng chưa đặt trạng thái indexing trong sổ
+    queue._update("doc", status="running")
+    assert put(client, "bản mới").status_code == 409
+    assert uploaded.read_text(encoding="utf-8") == "bản cũ"
+    assert sorted(path.name for path in upload_dir.iterdir()) == ["doc_a.txt"]
+    assert queue.get_status("doc")["status"] == "running"
+    assert registry.get("doc")["filename"] == "a.txt"
@@ -0,0 +1,76 @@
+# backend/tests/test_keyword_store.py
+import json
+import os
+
+import pytest
+
+from app.services.keyword_store import JSON_MIGRATION_KEY, KeywordSegmentStore
+
+def make_records(count: int):
+    return {f"c{i}": {"document_id": f"d{i % 3}", "terms": {"w": i + 1}} for i in range(count)}
+
+@pytest.fixture
+def legacy_json(tmp_path):
+    path = tmp_path / "keyword_index.json"
+    path.write_text(json.dumps(make_records(100)), encoding="utf-8")
+    return str(path)
+
+def test_put_patch_delete_survive_reopen(tmp_path):
+    store = KeywordSegmentStore(str(tmp_path / "store"))
+    store.put_many(make_records(5))
+    store.patch_many({"c1": {"document_id": "moved"}})
+    store.delete_many(["c2"])
+    records = KeywordSegmentStore(str(tmp_path / "store")).load()
+    assert sorted(records) == ["c0", "c1", "c3", "c4"]
+    assert records["c1"]["document_id"] == "moved"
+
+def test_truncates_partial_record_after_crash(tmp_path):
+    store = KeywordSegmentStore(str(tmp_path / "store"))
+    store.put_many(make_records(3))
+    with open(os.path.join(store.store_path, store._manifest["segments"][-1]), "ab") as f:
+        f.write(b'{"op": "put", "id": "half')
+    reopened = KeywordSegmentStore(str(tmp_path / "store"))
+    assert sorted(reopened.load()) == ["c0", "c1", "c2"]
+    reopened.put_many({"c9": {"document_id": "d9"}})
+    assert "c9" in KeywordSegmentStore(str(tmp_path / "store")).load()
+
+def test_compaction_keeps_live_records(tmp_path):
+    store = KeywordSegmentStore(str(tmp_path / "store"), segment_max_bytes=1, compaction_min_segments=100)
+    for i in range(6):
+        store.put_many({f"c{i}": {"document_id": "d"}})
+    store.delete_many(["c0", "c3"])
+    store.compact()
+    assert len(store._manifest["segments"]) == 2
+    assert sorted(KeywordSegmentStore(str(tmp_path / "store")).load()) == ["c1", "c2", "c4", "c5"]
+
+def test_migrate_from_json(tmp_path, legacy_json):
+    store = KeywordSegmentStore(str(tmp_path / "store"))
+    assert store.migrate_from_json(legacy_json) == (True, 100)
+    assert not os.path.exists(legacy_json) and os.path.exists(legacy_json + ".migrated")
+    assert store.load() == make_records(100)
+    assert JSON_MIGRATION_KEY not in store._manifest
+
+def test_migration_restarts_after_crash_midway(tmp_path, legacy_json, monkeypatch):
+    store = KeywordSegmentStore(str(tmp_path / "store"))
+    real_put_many = store.put_many
+
+    def crash_after_half(records):
+        real_put_many(dict(list(records.items())[:50]))
+        raise KeyboardInterrupt("tiến trình bị dừng")
+    monkeypatch.setattr(store, "put_many", crash_after_half)
+    with pytest.raises(KeyboardInterrupt):
+        store.migrate_from_json(legacy_json)
+
+    # Lần khởi động sau: kho đã tồn tại nhưng còn dấu đang chuyển, nên phải chuyển lại toàn bộ
+    restarted = KeywordSegmentStore(str(tmp_path / "store"))
+    assert restarted.exists() and len(restarted.load()) == 50
+    assert restarted.migrate_from_json(legacy_json) == (True, 100)
+    assert KeywordSegmentStore(str(tmp_path / "store")).load() == make_records(100)
+    assert os.path.exists(legacy_json + ".migrated")
+
+def test_migration_skipped_when_store_already_exists(tmp_path, legacy_json):
+    store = KeywordSegmentStore(str(tmp_path / "store"))
+    store.put_many({"c0": {"document_id": "kept"}})
+    assert store.migrate_from_json(legacy_json) == (False, 0)
+    assert store.load() == {"c0": {"document_id": "kept"}}
+    assert os.path.exists(legacy_json)
@@ -0,0 +1,28 @@
+# backend/tests/test_session_store.py
+from app.services.session_store import SessionStore
+
+def test_scope_survives_restart(tmp_path):
+    SessionStore(str(tmp_path / "sessions.sqlite3")).set("s1", document_id="doc")
+    state = SessionStore(str(tmp_path / "sessions.sqlite3")).get("s1")
+    assert state.document_id == "doc" and state.collection_id is None
+
+def test_forget_document_and_collection(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite3"))
+    store.set("s1", document_id="doc")
+    store.set("s2", collection_id="col")
+    store.forget_document("doc")
+    store.forget_collection("col")
+    assert store.get("s1").document_id is None
+    assert store.get("s2").collection_id is None
+    assert store.get(None) is None and store.get("missing") is None
+
+def test_expired_and_least_recently_used_sessions_are_dropped(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite3"), ttl_seconds=3600, max_sessions=2)
+    store.set("old", document_id="a")
+    store.set("s2", document_id="b")
+    store.get("old")
+    store.set("s3", document_id="c")
+    assert store.get("s2") is None and len(store) == 2
+
+    expired = SessionStore(str(tmp_path / "sessions.sqlite3"), ttl_seconds=-1)
+    assert expired.get("old") is None and len(expired) == 1
@@ -2,13 +2,28 @@ import axios from 'axios';
 
 const API_BASE_URL = 'http://localhost:8000/api/v1';
 
+// Mỗi tab trình duyệt là một phiên riêng: tài liệu/bộ sưu tập mặc định không bị tab khác ghi đè
+const getSessionId = () => {
+  let sessionId = sessionStorage.getItem('sessionId');
+  if (!sessionId) {
+    sessionId = crypto.randomUUID();
+    sessionStorage.setItem('sessionId', sessionId);
+  }
+  return sessionId;
+};
+
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
   headers: {
     'Content-Type': 'application/json',
+    'X-Session-ID': getSessionId(),
   },
 });
 
+export const listDocuments = (limit = 100, offset = 0) => {
+  return apiClient.get('/documents', { params: { limit, offset } });
+};
+
 export const uploadDocument = (file, onUploadProgress) => {
   const formData = new FormData();
   formData.append('file', file);
@@ -20,6 +35,17 @@ export const uploadDocument = (file, onUploadProgress) => {
   });
 };
 
+export const updateDocument = (documentId, file, onUploadProgress) => {
+  const formData = new FormData();
+  formData.append('file', file);
+  return apiClient.put(`/documents/${documentId}`, formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+    onUploadProgress,
+  });
+};
+
 export const deleteDocument = (documentId) => {
   return apiClient.delete(`/documents/${documentId}`);
 };
@@ -28,8 +54,37 @@ export const clearAllData = () => {
   return apiClient.delete('/clear-all');
 };
 
-export const postChatMessage = (query, documentId) => {
-  return apiClient.post('/chat', { query, document_id: documentId });
+export const postChatMessage = (query, documentId, { documentIds, collectionId } = {}) => {
+  return apiClient.post('/chat', {
+    query,
+    document_id: documentId,
+    document_ids: documentIds,
+    collection_id: collectionId,
+  });
+};
+
+export const listCollections = () => {
+  return apiClient.get('/collections');
+};
+
+export const createCollection = (name, documentIds = []) => {
+  return apiClient.post('/collections', { name, document_ids: documentIds });
+};
+
+export const addDocumentsToCollection = (collectionId, documentIds) => {
+  return apiClient.post(`/collections/${collectionId}/documents`, { document_ids: documentIds });
+};
+
+export const removeDocumentFromCollection = (collectionId, documentId) => {
+  return apiClient.delete(`/collections/${collectionId}/documents/${documentId}`);
+};
+
+export const deleteCollection = (collectionId) => {
+  return apiClient.delete(`/collections/${collectionId}`);
+};
+
+export const setSessionScope = ({ documentId, collectionId } = {}) => {
+  return apiClient.put('/session', { document_id: documentId, collection_id: collectionId });
 };
 
 export const summarizeDocument = (documentId) => {
@@ -46,3 +101,7 @@ export const generateQuestions = (documentId, numQuestions) => {
 export const extractKeywords = (documentId) => {
   return apiClient.post('/tasks/extract-keywords', { document_id: documentId });
 };
+
+export const getDocumentStatus = (documentId) => {
+  return apiClient.get(`/documents/${documentId}/status`);
+};